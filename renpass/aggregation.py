@@ -0,0 +1,465 @@
+# -*- coding: utf-8 -*-
+
+""" This module contains functions to aggregate the time index of an energy
+system to typical periods (e.g. typical days or weeks) before the model is
+built. Periods of the time index are clustered based on the normalized
+sequences of the energy system and each cluster is represented by one typical
+period, weighted with the number of periods it represents.
+
+Storages are linked between the typical periods based on the
+superposition of inter- and intra-period storage levels described in:
+
+Kotzur, L., Markewitz, P., Robinius, M. and Stolten, D. (2018) 'Time series
+aggregation for energy system design: Modeling seasonal storage'. *Applied
+Energy*, 213, pp. 123-135, doi: 10.1016/j.apenergy.2018.01.023
+
+Results of the typical periods are mapped back to the original periods (see
+:func:`expand_results`), storage levels are the absolute levels, i.e. the sum
+of the inter- and intra-period levels. Duals are not mapped and refer to the
+timesteps of the typical periods.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+from pyomo.environ import (Block, Constraint, NonNegativeReals, Reals, Set,
+                           Var)
+
+from . import horizon
+
+METHODS = ('kmedoids', 'kmeans')
+
+
+def _distances(X):
+    """ Returns the matrix of squared euclidean distances between all rows of
+    `X`.
+    """
+    sq = (X ** 2).sum(axis=1)
+    return np.maximum(sq[:, None] + sq[None, :] - 2 * X.dot(X.T), 0)
+
+
+def kmedoids(X, k, iterations=100):
+    """ Clusters the rows of `X` into `k` clusters with the k-medoids
+    algorithm (greedy initialization and alternating medoid updates).
+
+    Returns
+    -------
+    Tuple of an array with the row indices of the medoids and an array with
+    the cluster label (index of the medoid) of every row.
+    """
+    D = _distances(X)
+
+    # greedy initialization, every step adds the medoid reducing total
+    # distance the most
+    medoids = [int(D.sum(axis=1).argmin())]
+    while len(medoids) < k:
+        nearest = D[:, medoids].min(axis=1)
+        gain = np.maximum(nearest[None, :] - D, 0).sum(axis=1)
+        gain[medoids] = -1
+        medoids.append(int(gain.argmax()))
+    medoids = np.array(medoids)
+
+    for _ in range(iterations):
+        labels = D[:, medoids].argmin(axis=1)
+        new = medoids.copy()
+        for j in range(k):
+            members = np.flatnonzero(labels == j)
+            if not members.size:
+                continue
+            new[j] = members[D[np.ix_(members, members)].sum(axis=1).argmin()]
+        if (new == medoids).all():
+            break
+        medoids = new
+
+    return medoids, D[:, medoids].argmin(axis=1)
+
+
+def kmeans(X, k, iterations=100):
+    """ Clusters the rows of `X` into `k` clusters with the k-means algorithm
+    initialized with the result of :func:`kmedoids`.
+
+    Returns
+    -------
+    Array with the cluster label of every row.
+    """
+    labels = kmedoids(X, k)[1]
+
+    for _ in range(iterations):
+        centroids = np.array([X[labels == j].mean(axis=0) for j in range(k)])
+        new = _distances(np.vstack([X, centroids]))[:len(X), len(X):]\
+            .argmin(axis=1)
+        # keep empty clusters alive with their previous members
+        if len(np.unique(new)) < k or (new == labels).all():
+            break
+        labels = new
+
+    return labels
+
+
+def _profiles(es, periods, length):
+    """ Returns the matrix of normalized sequences of the energy system with
+    one row per period.
+    """
+    n = periods * length
+    columns = []
+    seen = set()
+    for obj, attr, key in horizon.sequence_holders(es):
+        value = getattr(obj, attr) if key is None else getattr(obj, attr)[key]
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
+        a = np.nan_to_num(np.asarray(value[:n], dtype=float))
+        span = a.max() - a.min()
+        columns.append((a - a.min()) / span if span > 0 else np.zeros(n))
+
+    if not columns:
+        raise ValueError("Energy system does not contain any sequences to "
+                         "aggregate.")
+
+    return np.hstack([c.reshape(periods, length) for c in columns])
+
+
+def aggregate(es, typical_periods, length=24, method='kmedoids'):
+    """ Aggregates the time index of the energy system to typical periods.
+
+    The sequences of all flows and nodes, `es.timeindex` and `es.temporal`
+    are replaced. The time index of the aggregated energy system is a regular
+    index with `typical_periods * length` timesteps starting at the first
+    timestep of the original index; `es.temporal` holds the objective
+    `weighting`, the typical `period` and the original `timestamp` of every
+    timestep.
+
+    Parameters
+    ----------
+    es : :class:`oemof.solph.network.EnergySystem` object
+    typical_periods : int
+        Number of typical periods
+    length : int
+        Number of timesteps of one period, e.g. 24 for typical days of an
+        hourly time index
+    method : str
+        Clustering method, `kmedoids` (typical periods are real periods) or
+        `kmeans` (typical periods are the means of their clusters)
+    """
+    if method not in METHODS:
+        raise ValueError("Unknown aggregation method `{}`, use one of {}."
+                         .format(method, ', '.join(METHODS)))
+
+    timeindex = es.timeindex
+    if len(timeindex) % length:
+        raise ValueError(
+            ("Number of timesteps ({}) must be a multiple of the period " +
+             "length ({}).").format(len(timeindex), length))
+
+    periods = len(timeindex) // length
+    if not 0 < typical_periods <= periods:
+        raise ValueError(
+            "Number of typical periods must be between 1 and {}.".format(
+                periods))
+
+    X = _profiles(es, periods, length)
+
+    if method == 'kmedoids':
+        medoids, labels = kmedoids(X, typical_periods)
+    else:
+        labels = kmeans(X, typical_periods)
+
+    # number clusters by first occurrence
+    first = sorted(np.unique(labels), key=lambda j: np.argmax(labels == j))
+    order = np.array([first.index(j) for j in labels])
+    k = len(first)
+
+    if method == 'kmedoids':
+        representatives = [medoids[j] for j in first]
+        W = np.zeros((k, periods))
+        W[range(k), representatives] = 1
+    else:
+        representatives = [int(np.argmax(labels == j)) for j in first]
+        W = np.zeros((k, periods))
+        W[order, range(periods)] = 1
+        W = W / W.sum(axis=1, keepdims=True)
+
+    def _aggregate(value):
+        a = np.asarray(value[:periods * length], dtype=float)
+        return list(W.dot(a.reshape(periods, length)).ravel())
+
+    horizon.replace_sequences(es, _aggregate)
+
+    if es.temporal is not None:
+        weighting = es.temporal['weighting'].values[:periods * length]
+    else:
+        weighting = np.ones(periods * length)
+    weighting = np.array([
+        weighting.reshape(periods, length)[order == j].sum(axis=0)
+        for j in range(k)]).ravel()
+
+    es.timeindex = pd.date_range(
+        timeindex[0], periods=k * length,
+        freq=timeindex.freq or pd.infer_freq(timeindex))
+
+    es.temporal = pd.DataFrame({
+        'weighting': weighting,
+        'period': np.repeat(range(k), length),
+        'timestamp': np.concatenate([
+            timeindex[p * length:(p + 1) * length]
+            for p in representatives])},
+        index=es.timeindex)
+
+    es._typical_periods = {'length': length,
+                           'order': [int(o) for o in order],
+                           'timeindex': timeindex[:periods * length]}
+
+    logging.info(
+        "Aggregated {} periods of {} timesteps to {} typical periods.".format(
+            periods, length, k))
+
+    return es
+
+
+def _storage_blocks(m):
+    """ Yields tuples of (block, storages, capacity) for all storage blocks of
+    the model, where `capacity(n)` returns the (nominal or invested) capacity
+    of storage `n`. Constraints of the blocks which refer to the level of the
+    whole time index are deactivated.
+    """
+    block = getattr(m, 'GenericStorageBlock', None)
+    if block is not None and hasattr(block, 'STORAGES'):
+        yield block, list(block.STORAGES), lambda n: n.nominal_capacity
+
+    block = getattr(m, 'GenericInvestmentStorageBlock', None)
+    if block is not None and hasattr(block, 'INVESTSTORAGES'):
+        for c in ('max_capacity', 'min_capacity', 'init_capacity',
+                  'initial_capacity'):
+            if hasattr(block, c):
+                getattr(block, c).deactivate()
+        yield block, list(block.INVESTSTORAGES), lambda n: block.invest[n]
+
+
+def link_storages(m):
+    """ Links the storage levels of the typical periods of an aggregated
+    energy system (see :func:`aggregate`).
+
+    The storage level variables of the model are interpreted as levels
+    relative to the start of the typical period (intra-period levels). An
+    additional inter-period level is added for every original period, which
+    is updated with the intra-period level at the end of the respective
+    typical period. Bounds of the storage level are applied to the sum of both
+    levels based on the minimal and maximal intra-period level. The initial
+    level of a storage (`initial_capacity`) is the inter-period level of the
+    first and (cyclic) of the last period.
+
+    Parameters
+    ----------
+    m : :class:`oemof.solph.models.Model` object
+        Model of an energy system aggregated with :func:`aggregate`
+    """
+    info = getattr(m.es, '_typical_periods', None)
+    if info is None:
+        return m
+
+    length = info['length']
+    order = info['order']
+    k = max(order) + 1
+
+    b = Block()
+    m.add_component('TypicalPeriodStorageBlock', b)
+
+    b.TYPICAL_PERIODS = Set(initialize=range(k))
+    b.PERIODS = Set(initialize=range(len(order) + 1))
+
+    # intra- and inter-period level variables of all storages
+    b.levels = {}
+
+    for i, (block, storages, capacity) in enumerate(_storage_blocks(m)):
+        if not storages:
+            continue
+
+        level = block.capacity
+
+        def _intra_start_rule(_, n, j):
+            t = j * length
+            expr = 0
+            expr += level[n, t]
+            expr += (- m.flow[list(n.inputs)[0], n, t] *
+                     n.inflow_conversion_factor[t]) * m.timeincrement[t]
+            expr += (m.flow[n, list(n.outputs)[0], t] /
+                     n.outflow_conversion_factor[t]) * m.timeincrement[t]
+            return expr == 0
+
+        for n in storages:
+            for t in m.TIMESTEPS:
+                level[n, t].unfix()
+                level[n, t].domain = Reals
+                level[n, t].setlb(None)
+                level[n, t].setub(None)
+            for j in range(k):
+                block.balance[n, j * length].deactivate()
+
+        b.add_component('intra_start_' + str(i), Constraint(
+            storages, b.TYPICAL_PERIODS, rule=_intra_start_rule))
+
+        intra_max = Var(storages, b.TYPICAL_PERIODS)
+        intra_min = Var(storages, b.TYPICAL_PERIODS)
+        inter = Var(storages, b.PERIODS, within=NonNegativeReals)
+        b.add_component('intra_max_' + str(i), intra_max)
+        b.add_component('intra_min_' + str(i), intra_min)
+        b.add_component('inter_' + str(i), inter)
+        b.levels.update({n: (level, inter) for n in storages})
+
+        def _intra_max_rule(_, n, t):
+            return intra_max[n, t // length] >= level[n, t]
+
+        def _intra_min_rule(_, n, t):
+            return intra_min[n, t // length] <= level[n, t]
+
+        b.add_component('intra_max_bound_' + str(i), Constraint(
+            storages, m.TIMESTEPS, rule=_intra_max_rule))
+        b.add_component('intra_min_bound_' + str(i), Constraint(
+            storages, m.TIMESTEPS, rule=_intra_min_rule))
+
+        def _inter_balance_rule(_, n, p):
+            if p == len(order):
+                return inter[n, p] == inter[n, 0]
+            end = order[p] * length + length - 1
+            return inter[n, p + 1] == (
+                inter[n, p] * (1 - n.capacity_loss[0]) ** length +
+                level[n, end])
+
+        b.add_component('inter_balance_' + str(i), Constraint(
+            storages, b.PERIODS, rule=_inter_balance_rule))
+
+        def _initial_rule(_, n):
+            if getattr(n, 'initial_capacity', None) is None:
+                return Constraint.Skip
+            return inter[n, 0] == n.initial_capacity * capacity(n)
+
+        b.add_component('initial_' + str(i), Constraint(
+            storages, rule=_initial_rule))
+
+        def _upper_rule(_, n, p):
+            if p == len(order):
+                return Constraint.Skip
+            return inter[n, p] + intra_max[n, order[p]] <= \
+                capacity(n) * n.capacity_max[0]
+
+        def _lower_rule(_, n, p):
+            if p == len(order):
+                return Constraint.Skip
+            return inter[n, p] + intra_min[n, order[p]] >= \
+                capacity(n) * n.capacity_min[0]
+
+        b.add_component('upper_bound_' + str(i), Constraint(
+            storages, b.PERIODS, rule=_upper_rule))
+        b.add_component('lower_bound_' + str(i), Constraint(
+            storages, b.PERIODS, rule=_lower_rule))
+
+    return m
+
+
+def positions(es):
+    """ Returns the positions of the timesteps of the typical periods for all
+    timesteps of the original time index of the energy system aggregated with
+    :func:`aggregate`.
+    """
+    info = es._typical_periods
+    length = info['length']
+    return (np.array(info['order'])[:, None] * length +
+            np.arange(length)).ravel()
+
+
+def storage_levels(m):
+    """ Returns a dictionary with the absolute storage levels of all linked
+    storages of the solved model `m` (see :func:`link_storages`) for the
+    timesteps of the original time index, i.e. the inter-period level of the
+    period (with losses) plus the intra-period level of its typical period.
+    """
+    info = m.es._typical_periods
+    length = info['length']
+    index = positions(m.es)
+
+    levels = {}
+    for n, (level, inter) in m.TypicalPeriodStorageBlock.levels.items():
+        intra = np.array([level[n, t].value for t in m.TIMESTEPS],
+                         dtype=float)
+        start = np.array([inter[n, p].value
+                          for p in range(len(info['order']))], dtype=float)
+        decay = (1 - n.capacity_loss[0]) ** np.arange(1, length + 1)
+        levels[n] = (start[:, None] * decay).ravel() + intra[index]
+
+    return levels
+
+
+def expand_results(m, results):
+    """ Maps the results (see :func:`oemof.outputlib.processing.results`) of
+    the solved model `m` of an aggregated energy system from the typical
+    periods to the original time index. Storage levels are replaced by the
+    absolute levels (see :func:`storage_levels`). Results of other models are
+    returned unchanged.
+    """
+    info = getattr(m.es, '_typical_periods', None)
+    if info is None:
+        return results
+
+    index = positions(m.es)
+    levels = storage_levels(m) if hasattr(
+        m, 'TypicalPeriodStorageBlock') else {}
+
+    expanded = {}
+    for k, v in results.items():
+        sequences = v['sequences']
+        if len(sequences) == len(m.TIMESTEPS):
+            sequences = sequences.iloc[index].copy()
+            sequences.index = info['timeindex']
+            if k[1] is None and k[0] in levels and 'capacity' in sequences:
+                sequences['capacity'] = levels[k[0]]
+        expanded[k] = dict(v, sequences=sequences)
+
+    return expanded
+
+
+def expand_dataframe(m, df):
+    """ Maps the dataframe of all results (see
+    :func:`oemof.outputlib.processing.create_dataframe`) of the solved model
+    `m` of an aggregated energy system from the typical periods to the
+    original time index like :func:`expand_results`. Variables of the storage
+    linking are not mapped. Dataframes of other models are returned
+    unchanged.
+    """
+    info = getattr(m.es, '_typical_periods', None)
+    if info is None:
+        return df
+
+    keys = ['oemof_tuple', 'variable_name', 'timestep']
+    index = positions(m.es)
+
+    df = df.reset_index()
+    groups = df.groupby(keys[:2], sort=False)
+    df['group'] = groups.ngroup()
+
+    linking = set()
+    levels = {}
+    if hasattr(m, 'TypicalPeriodStorageBlock'):
+        linking = {c.local_name for c in
+                   m.TypicalPeriodStorageBlock.component_objects(Var)}
+        levels = storage_levels(m)
+
+    mapped = (groups['timestep'].transform('size') == len(m.TIMESTEPS)) & \
+        ~df['variable_name'].isin(linking)
+
+    sequences = df[mapped].merge(pd.DataFrame({
+        'timestep': index, 'original': np.arange(len(index))}),
+        on='timestep')
+    sequences['timestep'] = sequences.pop('original')
+    sequences = sequences.sort_values(['group', 'timestep'])
+
+    capacity = sequences['variable_name'] == 'capacity'
+    for n, values in levels.items():
+        rows = capacity & sequences['oemof_tuple'].map(lambda k: k[0] is n)
+        sequences.loc[rows, 'value'] = values[
+            sequences.loc[rows, 'timestep'].values]
+
+    return pd.concat([df[~mapped], sequences])\
+        .sort_values('group', kind='mergesort')\
+        .drop(columns='group').set_index(keys)
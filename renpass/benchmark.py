@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+""" renpass-benchmark
+
+Generates synthetic datapackages of different sizes, runs renpass on them
+and reports how the phases of a run scale with the problem size. With
+`--memory`, only the energy systems are created and the memory used by their
+Python objects is reported. With `--baseline`, the memory of the energy
+systems created by another renpass source tree (e.g. a checkout of a previous
+version) is reported for comparison.
+
+Usage:
+  renpass-benchmark [options]
+  renpass-benchmark -h | --help | --version
+
+Examples:
+
+  renpass-benchmark --buses 10,100 --timesteps 24,168 -o glpk
+  renpass-benchmark --memory --buses 1000,10000 --timesteps 24
+  renpass-benchmark --memory --baseline ../renpass-0.3 --buses 1000
+
+Options:
+
+  -h --help                  Show this screen and exit.
+  -o --solver=SOLVER         Solver to be used. [default: cbc]
+     --buses=BUSES           Comma-separated numbers of buses. [default: 10,50,100]
+     --timesteps=TIMESTEPS   Comma-separated numbers of timesteps.
+                             [default: 24,168]
+     --meshing=MESHING       Additional connections per bus. [default: 0.5]
+     --lopf                  If set, electrical buses and lines are used
+                             instead of buses and connections
+     --memory                If set, the memory of the energy systems is
+                             measured instead of running renpass
+     --baseline=PATH         Source tree of renpass whose memory is measured
+                             for comparison (with `--memory`)
+     --output-directory=DIR  Directory to write datapackages, results and
+                             the benchmark report to. [default: benchmark]
+     --version               Show version.
+"""
+
+import itertools
+import json
+import logging
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+from oemof.tools import logger
+
+from . import generator
+
+try:
+    from docopt import docopt
+except ImportError:
+    print("Unable to load docopt. Is docopt installed?")
+
+###############################################################################
+
+
+def run(datapackage, output_directory, solver='cbc'):
+    """ Runs renpass with profiling on the datapackage in a separate process
+    (such that the peak memory usage is not affected by previous runs) and
+    returns a dictionary with the wall time and peak memory usage of every
+    phase and the problem size.
+    """
+    subprocess.run(
+        [sys.executable, '-m', 'renpass.renpass', '--profile',
+         '--solver', solver, '--output-directory', output_directory,
+         datapackage],
+        check=True)
+
+    with open(datapackage) as f:
+        name = json.load(f)['name'].replace(' ', '_')
+    path = os.path.join(output_directory, name)
+
+    with open(os.path.join(path, 'profile.json')) as f:
+        profile = json.load(f)
+    problem = pd.read_csv(os.path.join(path, 'problem.csv'), index_col=0)
+
+    record = {'constraints': problem['constraints'].iloc[0],
+              'variables': problem['variables'].iloc[0],
+              'solver_time': problem['solver_time'].iloc[0]}
+    for phase in profile['phases']:
+        record[phase['phase'] + ' time'] = phase['wall_time']
+    record['peak_rss'] = max(p['max_rss'] or 0 for p in profile['phases'])
+    record['peak_rss_solver'] = max(
+        p['max_rss_children'] or 0 for p in profile['phases'])
+
+    return record
+
+
+# creates the energy system of a datapackage and prints the memory allocated
+# for it, runs with the renpass of any source tree (without this module)
+_MEMORY = """
+import gc, json, sys, tracemalloc
+from oemof.solph import EnergySystem
+from renpass import facades, options
+gc.collect()
+tracemalloc.start()
+es = EnergySystem.from_datapackage(sys.argv[1], attributemap={},
+                                   typemap=options.typemap)
+gc.collect()
+size, peak = tracemalloc.get_traced_memory()
+print(json.dumps({
+    'nodes': len(es.nodes),
+    'facades': len([n for n in es.nodes if isinstance(n, facades.Facade)]),
+    'memory': size, 'peak_memory': peak}))
+"""
+
+
+def memory(datapackage, path=None):
+    """ Creates the energy system of the datapackage in a separate process
+    and returns a dictionary with the number of nodes and the memory
+    allocated for the energy system (as traced by :mod:`tracemalloc`) in
+    total and per node.
+
+    Parameters
+    ----------
+    datapackage: str
+        path to datapackage metadata file in JSON format
+    path: str (optional)
+        Source tree of the renpass version to measure, default is this one
+    """
+    path = path or os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [os.path.abspath(path)] +
+        [p for p in os.environ.get('PYTHONPATH', '').split(os.pathsep)
+         if p]))
+
+    output = subprocess.run(
+        [sys.executable, '-c', _MEMORY, os.path.abspath(datapackage)],
+        check=True, env=env, cwd=os.path.abspath(path),
+        stdout=subprocess.PIPE).stdout
+    record = json.loads(output.decode().strip().splitlines()[-1])
+    record['memory_per_node'] = record['memory'] / record['nodes']
+
+    return record
+
+
+def scaling(report, by='variables'):
+    """ Returns the scaling exponents of all time and memory columns of the
+    `report` with respect to the column `by`, i.e. the slope of a linear fit
+    in log-log space. An exponent of 1 means linear scaling.
+    """
+    x = np.log(report[by].astype(float))
+    exponents = {}
+    for c in report.columns:
+        if c.endswith('time') or c.startswith('peak_rss') or \
+                c in ('memory', 'peak_memory'):
+            y = report[c].astype(float)
+            valid = (y > 0) & np.isfinite(x)
+            if valid.sum() > 1 and x[valid].nunique() > 1:
+                exponents[c] = np.polyfit(x[valid], np.log(y[valid]), 1)[0]
+    return pd.Series(exponents, name='exponent')
+
+
+def main(**arguments):
+    """
+    """
+    logging.info('Starting renpass benchmark!')
+
+    directory = arguments['--output-directory']
+
+    sizes = itertools.product(
+        [int(b) for b in arguments['--buses'].split(',')],
+        [int(t) for t in arguments['--timesteps'].split(',')])
+
+    records = []
+    for buses, timesteps in sizes:
+        logging.info('Benchmarking {} buses with {} timesteps.'.format(
+            buses, timesteps))
+
+        datapackage = generator.generate(
+            os.path.join(directory, 'datapackages',
+                         '{}-{}'.format(buses, timesteps)),
+            buses=buses, timesteps=timesteps,
+            meshing=float(arguments['--meshing']),
+            lopf=arguments['--lopf'])
+
+        if arguments['--memory']:
+            record = memory(datapackage)
+            if arguments.get('--baseline'):
+                baseline = memory(datapackage, arguments['--baseline'])
+                record.update({
+                    'baseline_memory': baseline['memory'],
+                    'baseline_memory_per_node': baseline['memory_per_node'],
+                    'memory_ratio': record['memory'] / baseline['memory']})
+        else:
+            record = run(datapackage, os.path.join(directory, 'results'),
+                         solver=arguments['--solver'])
+        record.update({'buses': buses, 'timesteps': timesteps})
+        records.append(record)
+
+    report = pd.DataFrame(records).set_index(['buses', 'timesteps'])
+
+    report_path = os.path.join(directory, 'benchmark.csv')
+    logging.info('Exporting benchmark report to {}'.format(
+        os.path.abspath(report_path)))
+    report.to_csv(report_path)
+
+    by = 'nodes' if arguments['--memory'] else 'variables'
+    exponents = scaling(report, by=by)
+    exponents.to_csv(os.path.join(directory, 'scaling.csv'), header=True)
+
+    logging.info('Results:\n{}'.format(report.to_string()))
+    logging.info('Scaling exponents w.r.t. number of {}:\n{}'.format(
+        by, exponents.to_string()))
+
+    return report
+
+###############################################################################
+
+if __name__ == '__main__':
+    arguments = docopt(__doc__, version='renpass v0.3.1')
+
+    logger.define_logging()
+
+    main(**arguments)
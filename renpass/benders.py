@@ -0,0 +1,515 @@
+# -*- coding: utf-8 -*-
+
+""" This module contains a Benders decomposition of investment models.
+
+The time index is split into slices. A master problem holds the investment
+variables of all investment flows and storages and the storage levels at the
+boundaries of the slices. For every slice a dispatch subproblem is solved in
+a worker process with these complicating variables fixed to the values of the
+master problem. Optimality cuts built from the duals of the fixing
+constraints are added to the master problem until the relative gap between
+the lower bound (master problem) and the upper bound (best solution found)
+falls below the given tolerance.
+
+The fixing constraints are elastic, i.e. deviations are allowed at a high
+penalty. This keeps every subproblem feasible for any master solution (e.g.
+the initial solution without any investment), such that no feasibility cuts
+are required. The decomposed problem is exact: at the optimum, all
+deviations are zero and the results equal those of the monolithic model.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from pyomo.environ import (Block, ConcreteModel, Constraint, ConstraintList,
+                           NonNegativeReals, Objective, Param, Reals, Var,
+                           SolverFactory)
+
+from oemof.solph import Model
+from oemof.solph.components import GenericStorage
+from oemof.outputlib import processing
+
+from . import cache, duals, horizon, persistent, presolve
+
+# penalty per unit of deviation from the values of the master problem
+PENALTY = 1e6
+
+# state of a worker process: the energy system and the subproblems built
+_worker = {}
+
+
+def _label(n):
+    return None if n is None else str(n)
+
+
+def _slices(timesteps, slices):
+    """ Returns a list of (start, end) tuples splitting `timesteps` into
+    `slices` slices of (almost) equal length.
+    """
+    if not 0 < slices <= timesteps:
+        raise ValueError(
+            "Number of slices must be between 1 and {}.".format(timesteps))
+    bounds = np.linspace(0, timesteps, slices + 1).round().astype(int)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _storage_blocks(m):
+    """ Yields tuples of (block, storage) for all storages of the model.
+    """
+    for name, storages in (('GenericStorageBlock', 'STORAGES'),
+                           ('GenericInvestmentStorageBlock',
+                            'INVESTSTORAGES')):
+        block = getattr(m, name, None)
+        if block is not None and hasattr(block, storages):
+            for n in getattr(block, storages):
+                yield block, n
+
+
+def _investments(es):
+    """ Returns a dictionary of all investments of the energy system with
+    keys ('flow', from, to) for flows and ('storage', storage, '') for
+    storages and :class:`oemof.solph.options.Investment` objects as values.
+    """
+    investments = {}
+    for (o, i), f in es.flows().items():
+        if f.investment is not None:
+            investments[('flow', str(o), str(i))] = f.investment
+    for n in es.nodes:
+        if isinstance(n, GenericStorage) and \
+                getattr(n, 'investment', None) is not None:
+            investments[('storage', str(n), '')] = n.investment
+    return investments
+
+
+def _keys(es):
+    """ Returns the keys of all complicating variables of a subproblem: the
+    investments and the storage levels at the start and end of the slice.
+    """
+    keys = list(_investments(es))
+    for n in es.nodes:
+        if isinstance(n, GenericStorage):
+            keys.extend([('start', str(n), ''), ('end', str(n), '')])
+    return keys
+
+
+def _check(es):
+    """ Raises an error if the energy system can not be decomposed.
+    """
+    if not _investments(es):
+        raise ValueError("Benders decomposition requires an investment "
+                         "model, but the energy system does not contain "
+                         "any investment.")
+
+    for (o, i), f in es.flows().items():
+        if getattr(f, 'summed_max', None) is not None or \
+                getattr(f, 'summed_min', None) is not None:
+            raise ValueError(
+                ("Flow ({}, {}) with `summed_max` or `summed_min` couples " +
+                 "all timesteps and can not be decomposed.").format(o, i))
+        costs = f.variable_costs
+        costs = costs if horizon._is_timeseries(costs) else [costs[0]]
+        if min(c or 0 for c in costs) < 0:
+            raise ValueError(
+                ("Benders decomposition requires non-negative variable " +
+                 "costs, but flow ({}, {}) has negative costs.").format(o, i))
+
+
+def _init_worker(path, size):
+    """ Sets up the energy system of the worker process from the cache file
+    `path` and removes the investment costs, which are part of the master
+    problem. At most `size` subproblems are kept by the worker.
+    """
+    es = cache.load(path)
+    if es is None:
+        raise ValueError(
+            "Energy system of the subproblems could not be restored.")
+    for investment in _investments(es).values():
+        investment.ep_costs = 0
+    _worker.clear()
+    _worker.update({'es': es, 'timeindex': es.timeindex,
+                    'models': OrderedDict(), 'size': size})
+
+
+def _build(k, start, end, penalty):
+    """ Builds the subproblem of slice `k` of the energy system of the worker
+    process with elastic fixing constraints for all complicating variables.
+    """
+    es, timeindex = _worker['es'], _worker['timeindex']
+
+    es.timeindex = timeindex[start:end]
+    originals = horizon.slice_sequences(es, start, end)
+
+    try:
+        if es.temporal is not None:
+            m = Model(es, objective_weighting=es.temporal['weighting']
+                      [start:end].reset_index(drop=True))
+        else:
+            m = Model(es)
+        presolve.add_injections(m)
+    finally:
+        horizon.restore_sequences(originals)
+        es.timeindex = timeindex
+
+    variables = {}
+
+    block = getattr(m, 'InvestmentFlow', None)
+    if block is not None:
+        for o, i in block.INVESTFLOWS:
+            variables[('flow', str(o), str(i))] = block.invest[o, i]
+
+    b = Block()
+    m.add_component('BendersBlock', b)
+
+    storages = list(_storage_blocks(m))
+    b.STORAGES = [str(n) for _, n in storages]
+    b.start_level = Var(b.STORAGES, within=Reals)
+
+    t, last = 0, len(m.TIMESTEPS) - 1
+
+    for block, n in storages:
+        if hasattr(block, 'invest'):
+            variables[('storage', str(n), '')] = block.invest[n]
+
+        # the level at the end of the slice is a complicating variable, the
+        # initial level of (cyclic) monolithic models is set in the master
+        block.capacity[n, last].unfix()
+        variables[('end', str(n), '')] = block.capacity[n, last]
+        variables[('start', str(n), '')] = b.start_level[str(n)]
+
+        block.balance[n, t].deactivate()
+
+    for name in ('initial_capacity', 'initial_capacity_constraint'):
+        if hasattr(m, 'GenericInvestmentStorageBlock') and \
+                hasattr(m.GenericInvestmentStorageBlock, name):
+            getattr(m.GenericInvestmentStorageBlock, name).deactivate()
+
+    def _initial_balance_rule(b, s):
+        block, n = storages[b.STORAGES.index(s)]
+        expr = 0
+        expr += block.capacity[n, t]
+        # sequences of the nodes are not sliced anymore
+        expr += - b.start_level[s] * (1 - n.capacity_loss[start])
+        expr += (- m.flow[list(n.inputs)[0], n, t] *
+                 n.inflow_conversion_factor[start]) * m.timeincrement[t]
+        expr += (m.flow[n, list(n.outputs)[0], t] /
+                 n.outflow_conversion_factor[start]) * m.timeincrement[t]
+        return expr == 0
+
+    b.initial_balance = Constraint(b.STORAGES, rule=_initial_balance_rule)
+
+    b.KEYS = list(variables)
+    b.value = Param(b.KEYS, mutable=True, initialize=0)
+    b.over = Var(b.KEYS, within=NonNegativeReals)
+    b.under = Var(b.KEYS, within=NonNegativeReals)
+
+    def _fixing_rule(b, *key):
+        return variables[key] - b.over[key] + b.under[key] == b.value[key]
+
+    b.fixing = Constraint(b.KEYS, rule=_fixing_rule)
+
+    persistent.extend_objective(m, penalty * sum(
+        b.over[key] + b.under[key] for key in b.KEYS))
+
+    return m
+
+
+def _results(m, start, end, dataframe=False):
+    """ Returns the results of the subproblem `m` with node labels instead of
+    nodes as keys and the time index of the slice.
+    """
+    index = _worker['timeindex'][start:end]
+
+    # variables of the decomposition are not indexed by nodes
+    m.del_component(m.BendersBlock)
+
+    results = {}
+    for k, v in processing.results(m).items():
+        sequences = v['sequences'].copy()
+        sequences.index = index[:len(sequences)]
+        results[tuple(_label(n) for n in k)] = {
+            'sequences': sequences, 'scalars': v.get('scalars')}
+
+    df = None
+    if dataframe:
+        df = processing.create_dataframe(m).reset_index()
+        df['oemof_tuple'] = [tuple(_label(n) for n in k)
+                             for k in df['oemof_tuple']]
+        df['timestep'] += start
+
+    return results, df
+
+
+def solve_slice(k, start, end, values, solver, penalty=PENALTY,
+                results=False, dataframe=False):
+    """ Solves the subproblem of slice `k` in a worker process with the
+    complicating variables fixed to `values`.
+
+    Returns
+    -------
+    Dictionary with the `objective`, the `duals` of the fixing constraints
+    (derivatives of the objective with respect to the fixed values), the
+    total `deviation` from the fixed values and the `meta` results and, if
+    `results` is True, the `results` and `dataframe` of the subproblem.
+    """
+    # the subproblems solved last are kept to be solved again with the next
+    # values of the master problem
+    models = _worker['models']
+    if k in models:
+        models.move_to_end(k)
+    else:
+        while len(models) >= _worker['size']:
+            models.popitem(last=False)
+        models[k] = _build(k, start, end, penalty)
+    m = models[k]
+    b = m.BendersBlock
+
+    for key in b.KEYS:
+        b.value[key] = values[key]
+
+    m.solve(solver=solver, solve_kwargs=duals.solve_kwargs([b.fixing]))
+    values, = duals.load(m, [b.fixing])
+
+    solution = {
+        'objective': m.objective(),
+        'duals': dict(zip(b.fixing.keys(), values)),
+        'deviation': sum(b.over[key].value + b.under[key].value
+                         for key in b.KEYS),
+        'meta': processing.meta_results(m)}
+
+    if results:
+        solution['results'], solution['dataframe'] = _results(
+            models.pop(k), start, end, dataframe=dataframe)
+
+    return solution
+
+
+def _master(es, investments, slices):
+    """ Builds the master problem with the investment variables, the storage
+    levels at the end of every slice and one cost variable per slice.
+    """
+    master = ConcreteModel()
+
+    master.INVESTMENTS = list(investments)
+    master.SLICES = range(len(slices))
+
+    def _bounds(master, *key):
+        investment = investments[key]
+        maximum = getattr(investment, 'maximum', float('inf'))
+        return (getattr(investment, 'minimum', 0) or 0,
+                None if maximum == float('inf') else maximum)
+
+    master.invest = Var(master.INVESTMENTS, bounds=_bounds)
+
+    storages = [n for n in es.nodes if isinstance(n, GenericStorage)]
+    master.STORAGES = [str(n) for n in storages]
+    master.level = Var(master.STORAGES, master.SLICES, within=Reals)
+
+    master.theta = Var(master.SLICES, within=NonNegativeReals)
+
+    master.constraints = ConstraintList()
+    for n in storages:
+        s = str(n)
+        invest = master.invest[('storage', s, '')] \
+            if ('storage', s, '') in investments else None
+        capacity = n.nominal_capacity if invest is None else invest
+
+        for k, (_, end) in enumerate(slices):
+            master.constraints.add(
+                master.level[s, k] <= capacity * n.capacity_max[end - 1])
+            master.constraints.add(
+                master.level[s, k] >= capacity * n.capacity_min[end - 1])
+
+        if getattr(n, 'initial_capacity', None) is not None:
+            master.constraints.add(
+                master.level[s, len(slices) - 1] ==
+                capacity * n.initial_capacity)
+
+        if invest is None:
+            continue
+
+        # relations of the storage and its flows, which are time independent
+        i, o = list(n.inputs)[0], list(n.outputs)[0]
+        fi = master.invest[('flow', str(i), s)] \
+            if ('flow', str(i), s) in investments else None
+        fo = master.invest[('flow', s, str(o))] \
+            if ('flow', s, str(o)) in investments else None
+        relations = (
+            (fi, invest, 'invest_relation_input_capacity'),
+            (fo, invest, 'invest_relation_output_capacity'),
+            (fi, fo, 'invest_relation_input_output'))
+        for a, b, attr in relations:
+            ratio = getattr(n, attr, None)
+            if ratio is not None and a is not None and b is not None:
+                master.constraints.add(a == b * ratio)
+
+    master.cuts = ConstraintList()
+
+    master.objective = Objective(expr=sum(
+        (investments[key].ep_costs or 0) * master.invest[key]
+        for key in master.INVESTMENTS) + sum(
+            master.theta[k] for k in master.SLICES))
+
+    return master
+
+
+def _master_variable(master, key, k):
+    """ Returns the variable of the master problem fixed by the complicating
+    variable `key` of the subproblem of slice `k`.
+    """
+    kind, a, b = key
+    if kind == 'start':
+        return master.level[a, (k - 1) % len(master.SLICES)]
+    if kind == 'end':
+        return master.level[a, k]
+    return master.invest[key]
+
+
+def _values(master, keys, k):
+    return {key: _master_variable(master, key, k).value or 0 for key in keys}
+
+
+def _join(solutions, es):
+    """ Joins the results of all slices and replaces labels by nodes.
+    """
+    nodes = {str(n): n for n in es.nodes}
+
+    def _key(k):
+        return tuple(None if l is None else nodes[l] for l in k)
+
+    results = {}
+    for solution in solutions:
+        for k, v in solution['results'].items():
+            if k in results:
+                results[k]['sequences'].append(v['sequences'])
+            else:
+                results[k] = {'sequences': [v['sequences']],
+                              'scalars': v['scalars']}
+
+    joined = {
+        'main': {_key(k): {'sequences': pd.concat(v['sequences']),
+                           'scalars': v['scalars']}
+                 for k, v in results.items()},
+        'meta': horizon._meta_results([s['meta'] for s in solutions])}
+
+    dataframes = [s['dataframe'] for s in solutions
+                  if s.get('dataframe') is not None]
+    if dataframes:
+        df = pd.concat(dataframes)
+        df['oemof_tuple'] = [_key(k) for k in df['oemof_tuple']]
+        joined['dataframe'] = df.set_index(
+            ['oemof_tuple', 'variable_name', 'timestep'])
+
+    return joined
+
+
+def decompose(es, **arguments):
+    """ Solves the investment model of the energy system by Benders
+    decomposition and stores the results in `es._results`.
+
+    Parameters
+    ----------
+    es : :class:`oemof.solph.network.EnergySystem` object
+        Energy system holding nodes, grouping functions and other important
+        information.
+    **arguments : key word arguments
+        Arguments passed from command line
+
+    Returns
+    -------
+    The solved master problem.
+    """
+    _check(es)
+
+    solver = arguments['--solver']
+    gap = float(arguments.get('--benders-gap') or 1e-4)
+    iterations = int(arguments.get('--benders-iterations') or 100)
+    workers = arguments.get('--workers')
+    workers = int(workers) if workers else os.cpu_count()
+
+    slices = _slices(len(es.timeindex), int(arguments['--benders']))
+    investments = _investments(es)
+    keys = _keys(es)
+
+    master = _master(es, investments, slices)
+    optimizer = SolverFactory(solver)
+
+    # workers are spawned (forking copies the threads of the parent process,
+    # e.g. of the exporter, in an undefined state) and restore the energy
+    # system from a cache file, every worker keeps the subproblems of its
+    # share of the slices
+    workers = min(workers, len(slices))
+    size = -(-len(slices) // workers)
+    context = multiprocessing.get_context('spawn')
+    tmp = tempfile.mkdtemp()
+    path = cache.dump(es, os.path.join(tmp, 'es.pkl'))
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker,
+                                 initargs=(path, size)) as executor:
+
+            def _solve_slices(values, **kwargs):
+                futures = [
+                    executor.submit(solve_slice, k, start, end, values[k],
+                                    solver, **kwargs)
+                    for k, (start, end) in enumerate(slices)]
+                return [f.result() for f in futures]
+
+            best, upper = None, float('inf')
+
+            for iteration in range(iterations):
+                optimizer.solve(master)
+                lower = master.objective()
+
+                values = [_values(master, keys, k) for k in master.SLICES]
+                solutions = _solve_slices(values)
+
+                costs = sum((investments[key].ep_costs or 0) * value
+                            for key, value in values[0].items()
+                            if key in investments)
+                objective = costs + sum(s['objective'] for s in solutions)
+                if objective < upper:
+                    upper, best = objective, values
+
+                logging.info(
+                    ("Benders iteration {}: lower bound {:.6g}, upper " +
+                     "bound {:.6g}.").format(iteration + 1, lower, upper))
+
+                if upper - lower <= gap * max(abs(upper), 1e-9):
+                    break
+
+                for k, s in enumerate(solutions):
+                    master.cuts.add(master.theta[k] >= s['objective'] + sum(
+                        s['duals'][key] *
+                        (_master_variable(master, key, k) -
+                         values[k][key]) for key in keys))
+            else:
+                logging.warning(
+                    "Benders decomposition did not converge within {} "
+                    "iterations, gap: {:.6g}.".format(
+                        iterations, (upper - lower) / max(abs(upper), 1e-9)))
+
+            solutions = _solve_slices(
+                best, results=True,
+                dataframe=arguments.get('--output-orient') == 'default')
+    finally:
+        shutil.rmtree(tmp)
+
+    deviation = sum(s['deviation'] for s in solutions)
+    if deviation > 1e-6:
+        logging.warning(
+            ("Complicating variables deviate from the master problem by " +
+             "{:.6g} in total, results are penalized.").format(deviation))
+
+    es._results = _join(solutions, es)
+    es._results['meta']['objective'] = upper
+
+    return master
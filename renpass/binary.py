@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+
+""" This module contains functions to read datapackages with sequences
+resources stored as binary NumPy (.npy) files. The files are memory-mapped
+and the sequences are handed to the components as read-only views of the
+columns without copying them.
+
+A binary sequences resource holds a float array with one row per timestep
+and one column per field of its schema (except `timeindex`). As the array
+does not contain the time index, the resource descriptor has a `timeindex`
+entry with the `start`, the number of `periods` and the `freq` of the
+(regular) time index, e.g.:
+
+    {"name": "load-profiles",
+     "path": "data/sequences/load-profiles.npy",
+     "format": "npy",
+     "timeindex": {"start": "2030-01-01T00:00:00",
+                   "periods": 8760,
+                   "freq": "0 days 01:00:00"},
+     "schema": {"fields": [...]}}
+
+If only a time window of the datapackage is needed, only the rows of the
+window are read from every (binary or CSV) sequences resource and from the
+`temporal` resource. Datapackages may mix binary and CSV sequences
+resources, if all of them have the same number of periods.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+from itertools import chain, islice
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from oemof.solph import EnergySystem
+
+# placeholders of binary sequences are SENTINEL - 0, SENTINEL - 1, ...
+SENTINEL = -10 ** 15
+
+
+def is_binary(resource):
+    """ Returns True if the resource (descriptor) is a binary sequences
+    resource.
+    """
+    return resource.get('format') == 'npy'
+
+
+def timeindex(resource):
+    """ Returns the time index of a binary sequences resource.
+    """
+    ti = resource['timeindex']
+    return pd.date_range(ti['start'], periods=int(ti['periods']),
+                         freq=pd.Timedelta(ti['freq']))
+
+
+def load(base, resource):
+    """ Returns the memory-mapped array and the column names of the binary
+    sequences resource of the datapackage in the directory `base`.
+    """
+    array = np.load(os.path.join(base, resource['path']), mmap_mode='r')
+    columns = [f['name'] for f in resource['schema']['fields']
+               if f['name'] != 'timeindex']
+
+    if array.ndim != 2 or array.shape[1] != len(columns) or \
+            array.shape[0] != int(resource['timeindex']['periods']):
+        raise ValueError(
+            ("Shape {} of binary resource `{}` does not match its {} " +
+             "fields and {} periods.").format(
+                 array.shape, resource['name'], len(columns),
+                 resource['timeindex']['periods']))
+
+    return array, columns
+
+
+def is_sequences(resource):
+    """ Returns True if the resource (descriptor) is a sequences resource.
+    """
+    return 'sequences' in resource['path'].split('/')
+
+
+def is_temporal(resource):
+    """ Returns True if the resource (descriptor) is the `temporal` resource
+    holding the time index and weighting of the timesteps.
+    """
+    return resource.get('name') == 'temporal'
+
+
+def window(t_start, t_end, periods):
+    """ Returns the slice of the timesteps `t_start` to `t_end` (inclusive)
+    of a time index with `periods` timesteps. Negative timesteps count from
+    the end, i.e. `t_end=-1` is the last timestep.
+    """
+    start, stop, _ = slice(int(t_start), int(t_end) + 1 or None).indices(
+        periods)
+    if stop <= start:
+        raise ValueError(
+            "Time window {} to {} of {} timesteps is empty.".format(
+                t_start, t_end, periods))
+    return slice(start, stop)
+
+
+def _periods(path):
+    """ Returns the number of data rows (without header and blank lines, e.g.
+    trailing line breaks) of a CSV-file without parsing it.
+    """
+    with open(path, 'rb') as f:
+        return sum(1 for line in f if line.strip()) - 1
+
+
+def _attributes(obj):
+    """ Returns (name, value) tuples of all instance attributes of `obj`, i.e.
+    of its `__dict__` and of the slots of its classes (e.g. of oemof nodes).
+    """
+    attributes = list(getattr(obj, '__dict__', {}).items())
+    for cls in type(obj).__mro__:
+        slots = cls.__dict__.get('__slots__', ())
+        for name in [slots] if isinstance(slots, str) else slots:
+            if name not in ('__dict__', '__weakref__') and \
+                    hasattr(obj, name):
+                attributes.append((name, getattr(obj, name)))
+    return attributes
+
+
+def _resolve(es, views):
+    """ Replaces the placeholders of binary sequences in all attributes of
+    nodes and flows by the respective views.
+    """
+    def _view(value):
+        if isinstance(value, (str, dict)) or not hasattr(value, '__len__') \
+                or len(value) != 1:
+            return None
+        try:
+            return views.get(float(value[0]))
+        except (TypeError, ValueError):
+            return None
+
+    resolved = 0
+    for obj in chain(es.nodes, es.flows().values()):
+        for attr, value in _attributes(obj):
+            if isinstance(value, dict):
+                for k, v in value.items():
+                    view = _view(v)
+                    if view is not None:
+                        value[k] = view
+                        resolved += 1
+            else:
+                view = _view(value)
+                if view is not None:
+                    setattr(obj, attr, view)
+                    resolved += 1
+    return resolved
+
+
+def _link(source, target):
+    """ Makes the file `source` available at `target` (symbolic link or copy).
+    """
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        os.symlink(source, target)
+    except (AttributeError, NotImplementedError, OSError):
+        shutil.copyfile(source, target)
+
+
+def _sep(path):
+    with open(path) as f:
+        return ';' if ';' in f.readline() else ','
+
+
+def from_datapackage(datapackage, t_start=0, t_end=-1, **kwargs):
+    """ Creates an energy system from a datapackage like
+    :meth:`oemof.solph.EnergySystem.from_datapackage`, but also supports
+    binary sequences resources and reads only the rows of the time window
+    `t_start` to `t_end` of all sequences resources and of the `temporal`
+    resource.
+
+    The datapackage reader of oemof only reads complete tabular resources.
+    Therefore, a copy of the descriptor is read from a temporary directory, in
+    which the resources are linked to the original files, except for
+    temporal and sequences resources of a time window, which are replaced by
+    CSV-files with the rows of the window. If the datapackage contains binary
+    resources, every sequences resource (binary or CSV) is replaced by a
+    CSV-file with one row of placeholders, which are replaced by the
+    (memory-mapped) columns of the window afterwards.
+
+    Parameters
+    ----------
+    datapackage: str
+        path to datapackage metadata file in JSON format
+    t_start: int
+        First timestep of the window
+    t_end: int
+        Last timestep of the window, -1 is the last timestep of the
+        datapackage
+    **kwargs : key word arguments
+        Passed to :meth:`oemof.solph.EnergySystem.from_datapackage`
+    """
+    with open(datapackage) as f:
+        descriptor = json.load(f)
+
+    windowed = (int(t_start), int(t_end)) != (0, -1)
+
+    binary = [r for r in descriptor['resources'] if is_binary(r)]
+    csv = [r for r in descriptor['resources']
+           if (windowed or binary) and not is_binary(r) and
+           (is_sequences(r) or is_temporal(r))]
+    if not binary and not csv:
+        es = EnergySystem.from_datapackage(datapackage, **kwargs)
+        if windowed and es.timeindex is not None:
+            # no sequences, only the time index has to be sliced
+            es.timeindex = es.timeindex[
+                window(t_start, t_end, len(es.timeindex))]
+        return es
+
+    base = os.path.dirname(os.path.abspath(datapackage))
+    directory = tempfile.mkdtemp(prefix='renpass-')
+
+    views = {}
+    index = None
+
+    def _placeholders(r, columns, arrays):
+        """ Registers the columns and writes the CSV-file with one row of
+        placeholders of resource `r`.
+        """
+        row = {}
+        for c, array in zip(columns, arrays):
+            key = SENTINEL - len(views)
+            views[key] = array
+            row[c] = key
+
+        path = os.path.splitext(r['path'])[0] + '.csv'
+        os.makedirs(os.path.dirname(os.path.join(directory, path)),
+                    exist_ok=True)
+        pd.DataFrame(
+            [row], columns=columns,
+            index=pd.Index([index[0].strftime('%Y-%m-%dT%H:%M:%SZ')],
+                           name='timeindex')).to_csv(
+                               os.path.join(directory, path))
+
+        r.update({'path': path, 'format': 'csv', 'mediatype': 'text/csv'})
+
+    try:
+        for r in binary:
+            array, columns = load(base, r)
+            rows = window(t_start, t_end, array.shape[0])
+
+            if index is None:
+                index = timeindex(r)[rows]
+                name = r['name']
+            elif rows.stop - rows.start != len(index):
+                raise ValueError(
+                    ("Binary resource `{}` has another number of periods " +
+                     "than binary resource `{}`.").format(r['name'], name))
+
+            _placeholders(r, columns,
+                          [array[rows, j] for j in range(len(columns))])
+
+        for r in csv:
+            source = os.path.join(base, r['path'])
+            rows = window(t_start, t_end, _periods(source))
+
+            if binary and is_sequences(r):
+                # sequences of mixed datapackages are placeholders as well,
+                # such that all sequences resources have the same time index
+                if rows.stop - rows.start != len(index):
+                    raise ValueError(
+                        ("CSV sequences resource `{}` has another number of " +
+                         "periods than binary resource `{}`.").format(
+                             r['name'], name))
+                columns = [f['name'] for f in r['schema']['fields']
+                           if f['name'] != 'timeindex']
+                df = pd.read_csv(source, sep=_sep(source),
+                                 index_col='timeindex',
+                                 skiprows=range(1, rows.start + 1),
+                                 nrows=rows.stop - rows.start)
+                _placeholders(r, columns,
+                              [df[c].values.astype(float) for c in columns])
+                continue
+
+            target = os.path.join(directory, r['path'])
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(source) as f, open(target, 'w') as out:
+                out.write(f.readline())
+                out.writelines(islice(f, rows.start, rows.stop))
+
+        # all other resources are linked to the original files
+        replaced = set(map(id, binary + csv))
+        for r in descriptor['resources']:
+            if id(r) in replaced:
+                continue
+            paths = r['path'] if isinstance(r['path'], list) else [r['path']]
+            for path in paths:
+                if '://' not in path:
+                    _link(os.path.join(base, path),
+                          os.path.join(directory, path))
+
+        path = os.path.join(directory, os.path.basename(datapackage))
+        with open(path, 'w') as f:
+            json.dump(descriptor, f)
+
+        es = EnergySystem.from_datapackage(path, **kwargs)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    if windowed:
+        logging.info('Read timesteps {} to {} of {} resources.'.format(
+            t_start, t_end, len(csv) + len(binary)))
+
+    if not binary:
+        return es
+
+    logging.info('Mapped {} binary sequences.'.format(_resolve(es, views)))
+
+    if es.timeindex is None or len(es.timeindex) <= 1:
+        es.timeindex = index
+    elif len(es.timeindex) != len(index):
+        raise ValueError(
+            ("Time index of binary resource `{}` ({} periods) does not " +
+             "match the time index of the datapackage ({} periods).").format(
+                 name, len(index), len(es.timeindex)))
+
+    return es
+
+
+def convert(datapackage, remove_csv=False):
+    """ Converts all CSV sequences resources of a datapackage to binary
+    sequences resources and updates the descriptor in place.
+
+    Parameters
+    ----------
+    datapackage: str
+        path to datapackage metadata file in JSON format
+    remove_csv: boolean
+        If True, the converted CSV-files are removed
+
+    Returns
+    -------
+    List of the names of the converted resources.
+    """
+    with open(datapackage) as f:
+        descriptor = json.load(f)
+
+    base = os.path.dirname(os.path.abspath(datapackage))
+
+    converted = []
+    for r in descriptor['resources']:
+        if is_binary(r) or not is_sequences(r):
+            continue
+
+        path = os.path.join(base, r['path'])
+        with open(path) as f:
+            sep = ';' if ';' in f.readline() else ','
+        df = pd.read_csv(path, sep=sep, index_col='timeindex')
+        index = pd.DatetimeIndex(pd.to_datetime(df.index))
+
+        steps = np.unique(np.diff(index.values))
+        if len(steps) > 1:
+            raise ValueError(
+                ("Time index of resource `{}` is not regular and can not be " +
+                 "converted.").format(r['name']))
+
+        columns = [f['name'] for f in r['schema']['fields']
+                   if f['name'] != 'timeindex']
+        array = np.asfortranarray(df[columns].values, dtype='float64')
+
+        binary_path = os.path.splitext(r['path'])[0] + '.npy'
+        np.save(os.path.join(base, binary_path), array)
+
+        r.update({
+            'path': binary_path,
+            'format': 'npy',
+            'mediatype': 'application/octet-stream',
+            'timeindex': {
+                'start': index[0].isoformat(),
+                'periods': len(index),
+                'freq': str(pd.Timedelta(steps[0] if len(steps) else
+                                         np.timedelta64(1, 'h')))}})
+        r.pop('encoding', None)
+
+        if remove_csv:
+            os.remove(path)
+
+        converted.append(r['name'])
+
+    with open(datapackage, 'w') as f:
+        json.dump(descriptor, f, indent=4)
+
+    return converted
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+
+""" This module contains functions to cache energy systems created from
+datapackages on disk. Cached energy systems are identified by a hash of the
+content of the datapackage metadata file and of all its resource files, of
+the source code of renpass and of the classes the datapackage is read with
+and of the options the energy system is created with (e.g. the time window),
+i.e. the cache is invalidated automatically if any of these changes.
+
+Nodes can not be pickled directly, as oemof only pickles the arguments a node
+was created with (e.g. no flows or attributes added by facades afterwards).
+Therefore, every node is stored as its class, label, instance attributes and
+outputs, where references to nodes (e.g. in attributes or as keys of the
+outputs) are stored as the position of the node. Loading creates all nodes
+without calling their constructors and restores their attributes and edges.
+A signature of the nodes, attributes and flows is stored with the energy
+system and checked after loading.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+from collections import deque
+from numbers import Number
+import hashlib
+import io
+import json
+import logging
+import os
+import sys
+
+import dill as pickle
+
+from oemof.network import Node
+from oemof.solph import EnergySystem
+
+from .binary import _attributes
+
+# bump this version if the layout of cached objects changes
+CACHE_VERSION = '2'
+
+# attributes of nodes holding the label and the edges, restored by the
+# constructor of :class:`oemof.network.Node`
+_NODE_INTERNALS = {'_label', '_inputs', '_outputs', '_in_edges', '_state',
+                   '__weakref__'} | set(getattr(Node, '__slots__', ()))
+
+# attributes of the energy system restored by its constructor or rebuilt
+_ES_INTERNALS = {'entities', '_groups', '_groupings', '_topology', 'results'}
+
+
+def checksum(datapackage):
+    """ Returns the SHA-256 hex digest of the datapackage metadata file and
+    all local resource files referenced in it.
+
+    Parameters
+    ----------
+    datapackage: str
+        path to datapackage metadata file in JSON format
+    """
+    sha = hashlib.sha256(CACHE_VERSION.encode())
+
+    with open(datapackage, 'rb') as f:
+        content = f.read()
+    sha.update(content)
+
+    base = os.path.dirname(os.path.abspath(datapackage))
+
+    for r in json.loads(content.decode('utf-8'))['resources']:
+        paths = r['path'] if isinstance(r['path'], list) else [r['path']]
+        for path in paths:
+            if '://' in path:
+                # remote resources can not be checked, never cache them
+                raise ValueError(
+                    "Can not cache datapackage with remote resource "
+                    "{}.".format(path))
+            sha.update(path.encode('utf-8'))
+            with open(os.path.join(base, path), 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    sha.update(chunk)
+
+    return sha.hexdigest()
+
+
+def _sources(typemap):
+    """ Returns the paths of the source files of renpass and of the modules of
+    the classes of the `typemap`.
+    """
+    base = os.path.dirname(os.path.abspath(__file__))
+    paths = {os.path.join(root, name)
+             for root, _, names in os.walk(base)
+             for name in names if name.endswith('.py')}
+    for cls in typemap.values():
+        source = getattr(sys.modules.get(cls.__module__), '__file__', None)
+        if source:
+            paths.add(os.path.abspath(source))
+    return sorted(paths)
+
+
+def path(datapackage, directory, typemap=None, t_start=0, t_end=-1,
+         **options):
+    """ Returns the path of the cache file of the datapackage in `directory`.
+
+    Parameters
+    ----------
+    datapackage: str
+        path to datapackage metadata file in JSON format
+    directory: str
+        cache directory
+    typemap: dict (optional)
+        Classes of the types of the datapackage
+    t_start, t_end: int
+        Time window of the energy system
+    **options: key word arguments
+        Further options the energy system is created with, e.g. command line
+        arguments
+    """
+    sha = hashlib.sha256(checksum(datapackage).encode())
+
+    for source in _sources(typemap or {}):
+        with open(source, 'rb') as f:
+            sha.update(f.read())
+
+    sha.update(json.dumps(dict(options, t_start=int(t_start),
+                               t_end=int(t_end)),
+                          sort_keys=True, default=str).encode())
+
+    return os.path.join(directory, sha.hexdigest() + '.pkl')
+
+
+def _references(value):
+    """ Returns the nodes referenced by the attribute `value` (directly or in
+    lists, tuples, sets and dictionaries).
+    """
+    if isinstance(value, Node):
+        return [value]
+    if isinstance(value, dict):
+        return [n for k, v in value.items()
+                for n in _references(k) + _references(v)]
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [n for v in value for n in _references(v)]
+    return []
+
+
+def _nodes(es):
+    """ Returns the nodes of the energy system followed by all nodes only
+    reachable by edges or attributes (e.g. subnodes of facades).
+    """
+    nodes = list(es.nodes)
+    seen = set(map(id, nodes))
+    queue = deque(nodes)
+    while queue:
+        n = queue.popleft()
+        neighbours = list(n.inputs) + list(n.outputs)
+        for attr, value in _attributes(n):
+            if attr not in _NODE_INTERNALS:
+                neighbours.extend(_references(value))
+        for m in neighbours:
+            if id(m) not in seen:
+                seen.add(id(m))
+                nodes.append(m)
+                queue.append(m)
+    return nodes
+
+
+def _state(n):
+    return {attr: value for attr, value in _attributes(n)
+            if attr not in _NODE_INTERNALS}
+
+
+def _summary(value):
+    if value is None or isinstance(value, (Number, str)):
+        return repr(value)
+    if isinstance(value, Node):
+        return 'node:' + str(value)
+    if hasattr(value, '__len__'):
+        try:
+            return '{}[{}]'.format(type(value).__name__, len(value))
+        except TypeError:
+            pass
+    return type(value).__name__
+
+
+def signature(es):
+    """ Returns the SHA-256 hex digest of the nodes of the energy system, their
+    attributes and the attributes of all flows (scalar values and the lengths
+    of sequences), e.g. to check that a restored energy system is complete.
+    """
+    sha = hashlib.sha256()
+    for n in es.nodes:
+        sha.update(repr((str(n), type(n).__name__, sorted(
+            (a, _summary(v)) for a, v in _state(n).items()))).encode())
+    for (i, o), flow in sorted(es.flows().items(),
+                               key=lambda f: (str(f[0][0]), str(f[0][1]))):
+        sha.update(repr((str(i), str(o), sorted(
+            (a, _summary(v)) for a, v in _attributes(flow)))).encode())
+    return sha.hexdigest()
+
+
+class _Pickler(pickle.Pickler):
+    """ Pickler storing references to nodes as their position.
+    """
+    def __init__(self, file, positions):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.positions = positions
+
+    def persistent_id(self, obj):
+        if isinstance(obj, Node):
+            return self.positions[id(obj)]
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+    """ Unpickler resolving positions of nodes, see :class:`_Pickler`.
+    """
+    def __init__(self, file, nodes):
+        super().__init__(file)
+        self.nodes = nodes
+
+    def persistent_load(self, pid):
+        return self.nodes[pid]
+
+
+def _write(es, f):
+    nodes = _nodes(es)
+    positions = {id(n): k for k, n in enumerate(nodes)}
+
+    # classes and labels first, such that all nodes exist before their
+    # attributes referencing other nodes are loaded
+    pickle.dump({'version': CACHE_VERSION,
+                 'signature': signature(es),
+                 'nodes': [(type(n), getattr(n, '_label', None))
+                           for n in nodes]},
+                f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    _Pickler(f, positions).dump({
+        'energysystem': len(es.nodes),
+        'attributes': {k: v for k, v in es.__dict__.items()
+                       if k not in _ES_INTERNALS},
+        'states': [_state(n) for n in nodes],
+        'outputs': [dict(n.outputs) for n in nodes]})
+
+
+def _read(f):
+    header = pickle.load(f)
+    if header.get('version') != CACHE_VERSION:
+        return None, None
+
+    nodes = []
+    for cls, label in header['nodes']:
+        n = cls.__new__(cls)
+        if label is None:
+            Node.__init__(n)
+        else:
+            Node.__init__(n, label=label)
+        nodes.append(n)
+
+    content = _Unpickler(f, nodes).load()
+
+    for n, state, outputs in zip(nodes, content['states'],
+                                 content['outputs']):
+        for attr, value in state.items():
+            setattr(n, attr, value)
+        for o, flow in outputs.items():
+            n.outputs[o] = flow
+
+    es = EnergySystem()
+    es.__dict__.update(content['attributes'])
+    es.add(*nodes[:content['energysystem']])
+
+    return es, header['signature']
+
+
+def copy(es):
+    """ Returns a copy of the energy system with copies of all nodes, flows
+    and attributes (unlike :func:`copy.deepcopy`, which only copies the
+    arguments the nodes were created with).
+    """
+    with io.BytesIO() as f:
+        _write(es, f)
+        f.seek(0)
+        result, _ = _read(f)
+    return result
+
+
+def load(path):
+    """ Returns the cached energy system stored at `path` or None if the
+    cache file does not exist or is not valid.
+    """
+    if not os.path.exists(path):
+        return None
+
+    logging.info('Restoring energy system from cache {}.'.format(path))
+
+    with open(path, 'rb') as f:
+        es, expected = _read(f)
+
+    if es is None:
+        logging.info('Cache file {} was written by another version.'.format(
+            path))
+        return None
+
+    if signature(es) != expected:
+        logging.warning(
+            ('Energy system restored from cache {} differs from the cached ' +
+             'one, the cache is not used.').format(path))
+        return None
+
+    return es
+
+
+def dump(es, path):
+    """ Writes the energy system to the cache file `path`.
+    """
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    logging.info('Writing energy system to cache {}.'.format(path))
+
+    # write to a temporary file first, such that concurrent runs never read
+    # incomplete cache files
+    tmp = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp, 'wb') as f:
+        _write(es, f)
+    os.replace(tmp, path)
+
+    return path
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+
+""" This module contains functions to checkpoint the solution of a model
+right after solving, before any of it is processed, and to resume writing
+results from a checkpoint without solving the model again.
+
+The checkpoint of a pyomo model holds the values of all its variables, the
+duals and the meta results of the solver. On resume, the model is built again
+(without solving it), the values are loaded into its variables and the
+results are processed as after solving. Rolling horizon, Benders
+decomposition and the matrix backend join their results while solving, these
+results are checkpointed instead.
+
+Nodes are stored by label, such that a checkpoint can be restored into the
+energy system created again from the same datapackage with the same options.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+import logging
+import os
+
+import dill as pickle
+from pyomo.environ import Var
+
+from oemof.network import Node
+from oemof.outputlib import processing
+
+from . import cache
+
+# bump this version if the layout of checkpoints changes
+CHECKPOINT_VERSION = '2'
+
+
+def _checksum(datapackage):
+    try:
+        return cache.checksum(datapackage)
+    except ValueError:
+        # datapackages with remote resources can not be checked
+        return None
+
+
+def _missing(n):
+    # pandas turns None into NaN in tuples of index levels
+    return n is None or n != n
+
+
+def _labels(key):
+    return tuple(None if _missing(n) else str(n) for n in key)
+
+
+def _index_labels(index):
+    # nodes of variable indices are replaced by their labels
+    if isinstance(index, tuple):
+        return tuple(str(i) if isinstance(i, Node) else i for i in index)
+    return str(index) if isinstance(index, Node) else index
+
+
+def _index(index, nodes):
+    if isinstance(index, tuple):
+        return tuple(nodes.get(i, i) if isinstance(i, str) else i
+                     for i in index)
+    return nodes.get(index, index) if isinstance(index, str) else index
+
+
+def _nodes(key, nodes):
+    try:
+        return tuple(None if _missing(l) else nodes[l] for l in key)
+    except KeyError as e:
+        raise ValueError(
+            ("Node {} of the checkpoint is not part of the energy system. " +
+             "Is it created with the same options?").format(e))
+
+
+def save(es, m, path, datapackage):
+    """ Writes the solution of the solved model `m` (or the results joined
+    while solving in `es._results`) to the checkpoint file `path`.
+
+    Parameters
+    ----------
+    es : :class:`oemof.solph.network.EnergySystem` object
+    m : :class:`oemof.solph.models.Model` object
+        Solved model
+    path : str
+        Path of the checkpoint file
+    datapackage: str
+        path to datapackage metadata file in JSON format
+    """
+    results = getattr(es, '_results', {})
+
+    checkpoint = {
+        'version': CHECKPOINT_VERSION,
+        'checksum': _checksum(datapackage),
+        'duals': results.get('duals'),
+        'portfolio': getattr(es, '_portfolio', None)}
+
+    if results.get('main'):
+        checkpoint['main'] = {
+            _labels(k): v for k, v in results['main'].items()}
+        checkpoint['meta'] = results['meta']
+        dataframe = results.get('dataframe')
+        if dataframe is not None:
+            dataframe = dataframe.rename(index=_labels, level='oemof_tuple')
+        checkpoint['dataframe'] = dataframe
+    else:
+        checkpoint['variables'] = {
+            v.name: [(_index_labels(i), d.value) for i, d in v.items()]
+            for v in m.component_objects(Var)}
+        checkpoint['meta'] = processing.meta_results(m)
+
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    logging.info('Writing checkpoint to {}.'.format(path))
+
+    # write to a temporary file first, such that an interrupted run never
+    # leaves an incomplete checkpoint
+    tmp = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp, 'wb') as f:
+        pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+    return path
+
+
+def load(path, es, datapackage, orient=None, build=None):
+    """ Restores the solution of the checkpoint file `path`.
+
+    Parameters
+    ----------
+    path : str
+        Path of the checkpoint file
+    es : :class:`oemof.solph.network.EnergySystem` object
+        Energy system created from `datapackage` with the same options as
+        the checkpointed one
+    datapackage: str
+        path to datapackage metadata file in JSON format
+    orient : str (optional)
+        Output orientation the results are written with
+    build : callable (optional)
+        Returns the (unsolved) model of the energy system, required for
+        checkpoints of pyomo models
+
+    Returns
+    -------
+    The model holding the restored solution or None if the results are
+    restored into `es._results` directly.
+    """
+    logging.info('Restoring results from checkpoint {}.'.format(path))
+
+    with open(path, 'rb') as f:
+        checkpoint = pickle.load(f)
+
+    if checkpoint.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(
+            "Checkpoint {} was written by another version of renpass."
+            .format(path))
+
+    checksum = _checksum(datapackage)
+    if None not in (checksum, checkpoint['checksum']) and \
+            checksum != checkpoint['checksum']:
+        raise ValueError(
+            "Datapackage {} changed since checkpoint {} was written.".format(
+                datapackage, path))
+
+    nodes = {str(n): n for n in es.nodes}
+
+    es._results = {'meta': checkpoint['meta']}
+
+    if checkpoint['duals']:
+        es._results['duals'] = checkpoint['duals']
+
+    if checkpoint['portfolio'] is not None:
+        es._portfolio = checkpoint['portfolio']
+
+    if 'variables' in checkpoint:
+        if build is None:
+            raise ValueError(
+                "Checkpoint {} holds the solution of a model, which has to "
+                "be built to restore it.".format(path))
+        m = build()
+        for name, values in checkpoint['variables'].items():
+            variable = m.find_component(name)
+            if variable is None:
+                raise ValueError(
+                    ("Variable {} of the checkpoint is not part of the " +
+                     "model. Is it created with the same options?").format(
+                         name))
+            for index, value in values:
+                variable[_index(index, nodes)].value = value
+        return m
+
+    if orient == 'default' and checkpoint['dataframe'] is None:
+        raise ValueError(
+            ("Checkpoint {} does not contain the results for output " +
+             "orientation `default`, write it with this orientation.").format(
+                 path))
+
+    es._results['main'] = {
+        _nodes(k, nodes): v for k, v in checkpoint['main'].items()}
+
+    if checkpoint['dataframe'] is not None:
+        es._results['dataframe'] = checkpoint['dataframe'].rename(
+            index=lambda k: _nodes(k, nodes), level='oemof_tuple')
+
+    return None
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+
+""" This module contains clustered unit commitment of commitable facades.
+
+Instead of one binary status variable per unit (as with
+:class:`oemof.solph.NonConvex` flows), identical units are grouped into
+clusters with one integer variable per cluster and timestep counting the
+units online. Facades are identical if they are of the same type, connected
+to the same bus and have the same unit capacity (`capacity / units`),
+minimal load, minimal up and down times, start-up and marginal costs.
+
+For every cluster of :math:`N` units with unit capacity :math:`P` and
+timestep :math:`t` the following constraints are added, where :math:`P_t` is
+the summed output of all facades of the cluster, :math:`u_t` the number of
+units online, :math:`s_t` the number of start-ups and :math:`d_t` the number
+of shut-downs:
+
+.. math::
+    p_{min} \\cdot P \\cdot u_t \\leq P_t \\leq P \\cdot u_t, \\quad
+    0 \\leq u_t \\leq N
+
+    s_t \\geq u_t - u_{t-1}, \\quad d_t \\geq u_{t-1} - u_t
+
+    \\sum_{\\tau = t - T_{up} + 1}^{t} s_\\tau \\leq u_t, \\quad
+    \\sum_{\\tau = t - T_{down} + 1}^{t} d_\\tau \\leq N - u_t
+
+The number of units online in the first timestep is free, i.e. it does not
+cause start-ups, unless the state of the previous timesteps is given as
+`history` (see :func:`history`), e.g. by the previous window of a rolling
+horizon. Then :math:`u_{-1}` and the start-ups and shut-downs before the
+first timestep are constants. The weighted start-up costs are added to the
+objective. In the relaxed mode, :math:`u_t` is continuous, which yields the
+LP-relaxation of the clustered unit commitment.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+from collections import OrderedDict
+import logging
+
+from pyomo.environ import (Block, Constraint, NonNegativeIntegers,
+                           NonNegativeReals, Set, Var)
+
+from .facades import Facade
+from .persistent import extend_objective
+
+# unit commitment modes of the command line option
+MODES = ('off', 'mip', 'lp')
+
+
+def _value(value, default):
+    """ Returns `value` or `default` if the value is missing (None or NaN).
+    """
+    return default if value is None or value != value else value
+
+
+def _committed_flow(n):
+    """ Returns the (from, to) tuple of the committed (electrical) output of
+    facade `n`.
+    """
+    for attr in ('electricity_bus', 'to_bus', 'bus'):
+        bus = getattr(n, attr, None)
+        if bus is not None and bus in n.outputs:
+            return (n, bus)
+    raise ValueError("Facade {} has no output to commit.".format(n.label))
+
+
+def clusters(es):
+    """ Returns the clusters of identical commitable facades of the energy
+    system.
+
+    Returns
+    -------
+    Ordered dictionary with a dictionary with the `flows` of its facades, the
+    number of `units`, the unit `capacity`, `pmin`, `min_up`, `min_down` and
+    `start_up_cost` for every cluster, keyed by the first facade of the
+    cluster.
+    """
+    groups = OrderedDict()
+    for n in es.nodes:
+        if not isinstance(n, Facade) or not _value(
+                getattr(n, 'commitable', False), False):
+            continue
+
+        flow = _committed_flow(n)
+        if n.outputs[flow[1]].investment is not None or n.capacity is None:
+            raise ValueError(
+                ("Unit commitment of facade {} requires a fixed " +
+                 "capacity.").format(n.label))
+
+        units = int(_value(n.units, 1))
+        properties = (
+            type(n), flow[1], n.capacity / units,
+            _value(n.pmin, 0), int(_value(n.min_up, 1)),
+            int(_value(n.min_down, 1)), _value(n.start_up_cost, 0),
+            _value(getattr(n, 'marginal_cost', 0), 0))
+
+        if properties not in groups:
+            groups[properties] = {
+                'flows': [], 'units': 0, 'capacity': properties[2],
+                'pmin': properties[3], 'min_up': properties[4],
+                'min_down': properties[5], 'start_up_cost': properties[6]}
+        groups[properties]['flows'].append(flow)
+        groups[properties]['units'] += units
+
+    return OrderedDict((c['flows'][0][0], c) for c in groups.values())
+
+
+def history(m, keep, previous=None):
+    """ Returns the state of the unit commitment of the solved model `m` at
+    its timestep `keep - 1`, i.e. the units `online` and the `startup` and
+    `shutdown` values of the preceding timesteps that the minimal up and down
+    times of the next model refer to.
+
+    Parameters
+    ----------
+    m : :class:`oemof.solph.models.Model` object
+    keep : int
+        Number of timesteps of the model that are kept
+    previous : dict (optional)
+        History the model was built with, it completes the values of models
+        that are shorter than the minimal up and down times
+    """
+    b = getattr(m, 'ClusteredUnitCommitmentBlock', None)
+    if b is None:
+        return None
+
+    cluster = clusters(m.es)
+    state = {}
+    for c in b.CLUSTERS:
+        length = max(cluster[c]['min_up'], cluster[c]['min_down']) - 1
+        before = (previous or {}).get(c, {})
+        state[c] = {'online': b.online[c, keep - 1].value or 0}
+        for attr in ('startup', 'shutdown'):
+            values = before.get(attr, []) + [
+                getattr(b, attr)[c, t].value or 0 for t in range(keep)]
+            state[c][attr] = values[max(len(values) - length, 0):] \
+                if length else []
+
+    return state
+
+
+def add_unit_commitment(m, relaxed=False, history=None):
+    """ Adds clustered unit commitment of all commitable facades to the model
+    (see module docstring).
+
+    Parameters
+    ----------
+    m : :class:`oemof.solph.models.Model` object
+    relaxed : boolean
+        If True, the number of units online is continuous (LP-relaxation)
+    history : dict (optional)
+        State of the unit commitment before the first timestep (see
+        :func:`history`), by default the first timestep is free
+    """
+    cluster = clusters(m.es)
+    if not cluster:
+        return m
+
+    history = history or {}
+
+    b = Block()
+    m.add_component('ClusteredUnitCommitmentBlock', b)
+
+    b.CLUSTERS = Set(initialize=list(cluster))
+
+    b.online = Var(
+        b.CLUSTERS, m.TIMESTEPS,
+        within=NonNegativeReals if relaxed else NonNegativeIntegers,
+        bounds=lambda b, c, t: (0, cluster[c]['units']))
+    b.startup = Var(b.CLUSTERS, m.TIMESTEPS, within=NonNegativeReals)
+    b.shutdown = Var(b.CLUSTERS, m.TIMESTEPS, within=NonNegativeReals)
+
+    def _output(c, t):
+        return sum(m.flow[i, o, t] for i, o in cluster[c]['flows'])
+
+    def _max_rule(b, c, t):
+        return _output(c, t) <= cluster[c]['capacity'] * b.online[c, t]
+
+    def _min_rule(b, c, t):
+        if not cluster[c]['pmin']:
+            return Constraint.Skip
+        return _output(c, t) >= (cluster[c]['pmin'] * cluster[c]['capacity'] *
+                                 b.online[c, t])
+
+    def _previous(c, t):
+        if t != m.TIMESTEPS.first():
+            return b.online[c, t - 1]
+        if c in history:
+            return history[c]['online']
+        return None
+
+    def _before(c, attr, t, length):
+        # sum of the values of the timesteps of the `length` timesteps up to
+        # t which are before the first timestep
+        count = length - 1 - t
+        if count <= 0:
+            return 0
+        values = history.get(c, {}).get(attr, [])
+        return sum(values[max(len(values) - count, 0):])
+
+    def _startup_rule(b, c, t):
+        if _previous(c, t) is None:
+            return Constraint.Skip
+        return b.startup[c, t] >= b.online[c, t] - _previous(c, t)
+
+    def _shutdown_rule(b, c, t):
+        if _previous(c, t) is None:
+            return Constraint.Skip
+        return b.shutdown[c, t] >= _previous(c, t) - b.online[c, t]
+
+    def _min_up_rule(b, c, t):
+        if cluster[c]['min_up'] <= 1:
+            return Constraint.Skip
+        return _before(c, 'startup', t, cluster[c]['min_up']) + sum(
+            b.startup[c, tau] for tau in
+            range(max(0, t - cluster[c]['min_up'] + 1), t + 1)) <= \
+            b.online[c, t]
+
+    def _min_down_rule(b, c, t):
+        if cluster[c]['min_down'] <= 1:
+            return Constraint.Skip
+        return _before(c, 'shutdown', t, cluster[c]['min_down']) + sum(
+            b.shutdown[c, tau] for tau in
+            range(max(0, t - cluster[c]['min_down'] + 1), t + 1)) <= \
+            cluster[c]['units'] - b.online[c, t]
+
+    b.max = Constraint(b.CLUSTERS, m.TIMESTEPS, rule=_max_rule)
+    b.min = Constraint(b.CLUSTERS, m.TIMESTEPS, rule=_min_rule)
+    b.startups = Constraint(b.CLUSTERS, m.TIMESTEPS, rule=_startup_rule)
+    b.shutdowns = Constraint(b.CLUSTERS, m.TIMESTEPS, rule=_shutdown_rule)
+    b.min_up = Constraint(b.CLUSTERS, m.TIMESTEPS, rule=_min_up_rule)
+    b.min_down = Constraint(b.CLUSTERS, m.TIMESTEPS, rule=_min_down_rule)
+
+    costs = [cluster[c]['start_up_cost'] * m.objective_weighting[t] *
+             b.startup[c, t]
+             for c in cluster if cluster[c]['start_up_cost']
+             for t in m.TIMESTEPS]
+    if costs:
+        extend_objective(m, sum(costs))
+
+    logging.info(
+        "Added {} unit commitment of {} facades in {} clusters.".format(
+            'relaxed' if relaxed else 'clustered',
+            sum(len(c['flows']) for c in cluster.values()), len(cluster)))
+
+    return m
@@ -6,16 +6,35 @@ application and work with the oemof datapackage - reader functionality
 
 SPDX-License-Identifier: GPL-3.0-or-later
 """
+from collections import UserList
 import logging
 
+import numpy as np
 from pyomo.core.base.block import SimpleBlock
-from pyomo.environ import Var, Constraint, Set, BuildAction
+from pyomo.environ import Var, Constraint, Set
 
 from oemof.network import Node, Edge, Transformer
 from oemof.solph import Flow, Bus
-from oemof.solph.plumbing import sequence
 
-from renpass.facades import Facade
+from renpass.facades import Facade, shared_sequence
+
+try:
+    from pyomo.core.expr.numeric_expr import LinearExpression
+except ImportError:
+    try:
+        from pyomo.core.expr.current import LinearExpression
+    except ImportError:
+        LinearExpression = None
+
+
+def _linear(coefficients, variables):
+    """ Returns the linear expression of `coefficients` and `variables`,
+    built without the operator overloading of pyomo if possible.
+    """
+    if LinearExpression is not None:
+        return LinearExpression(constant=0, linear_coefs=coefficients,
+                                linear_vars=variables)
+    return sum(c * v for c, v in zip(coefficients, variables))
 
 class ElectricalBus(Bus):
     """
@@ -60,7 +79,7 @@ class Line(Facade, Flow):
 
         self.to_bus = kwargs.get('to_bus')
 
-        self.reactance = sequence(kwargs.get('reactance', 0.00001))
+        self.reactance = shared_sequence(kwargs.get('reactance', 0.00001))
 
         self.capacity = kwargs.get('capacity')
 
@@ -75,7 +94,7 @@ class Line(Facade, Flow):
 
         self.nominal_value = self.capacity
 
-        self.min = sequence(-1)
+        self.min = shared_sequence(-1)
 
         self.investment = self._investment()
 
@@ -118,23 +137,49 @@ class ElectricalLineConstraints(SimpleBlock):
                     bus.label))
             bus.slack = True
 
-        def _voltage_angle_relation(block):
-            for t in m.TIMESTEPS:
-                for n in group:
-                    if n.input.slack is True:
-                        self.voltage_angle[n.output, t].value = 0
-                        self.voltage_angle[n.output, t].fix()
-                    try:
-                        lhs = m.flow[n.input, n.output, t]
-                        rhs = 1 / n.reactance[t] * (
-                            self.voltage_angle[n.input, t] -
-                            self.voltage_angle[n.output, t])
-                    except:
-                        raise ValueError("Error in constraint creation",
-                                         "of node {}".format(n.label))
-                    block.electrical_flow.add((n, t), (lhs == rhs))
-
-        self.electrical_flow = Constraint(group, m.TIMESTEPS, noruleinit=True)
-
-        self.electrical_flow_build = BuildAction(
-                                         rule=_voltage_angle_relation)
+        # the angle of the slack bus(es) is the reference (zero) angle. Before,
+        # the angles of the buses connected to the slack bus were fixed
+        # instead, which forced the flows of lines between these buses to zero
+        for b in self.ELECTRICAL_BUSES:
+            if b.slack is True:
+                for t in m.TIMESTEPS:
+                    self.voltage_angle[b, t].fix(0)
+
+        lines = list(group)
+        timesteps = list(m.TIMESTEPS)
+
+        # susceptances of all lines (rows) and timesteps (columns) at once
+        reactance = np.vstack([
+            np.broadcast_to(
+                n.reactance.default if isinstance(n.reactance, UserList)
+                else np.asarray(n.reactance, dtype=float)[:len(timesteps)],
+                (len(timesteps),))
+            for n in lines]).astype(float)
+        zero = (reactance == 0).any(axis=1)
+        if zero.any():
+            raise ValueError("Reactance of line {} must not be zero.".format(
+                lines[int(np.argmax(zero))].label))
+        susceptance = 1 / reactance
+
+        # incidence matrix of the lines (rows) and buses (columns) with 1 in
+        # the column of the input and -1 in the column of the output bus of a
+        # line, stored as the column indices of both per line
+        buses = list(self.ELECTRICAL_BUSES)
+        column = {b: k for k, b in enumerate(buses)}
+        incidence = [(column[n.input], column[n.output]) for n in lines]
+
+        # flows of all lines of timestep t: f_t = diag(b_t) * A * angles_t,
+        # i.e. the coefficients of (f, angle_in, angle_out) are (1, -b, b)
+        ones = np.ones(len(lines))
+        relations = {}
+        for k, t in enumerate(timesteps):
+            angles = [self.voltage_angle[b, t] for b in buses]
+            coefficients = np.column_stack(
+                [ones, -susceptance[:, k], susceptance[:, k]]).tolist()
+            for n, (i, o), c in zip(lines, incidence, coefficients):
+                relations[n, t] = (0, _linear(
+                    c, [m.flow[n.input, n.output, t], angles[i], angles[o]]),
+                    0)
+
+        self.electrical_flow = Constraint(
+            group, m.TIMESTEPS, rule=lambda block, n, t: relations[n, t])
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+""" renpass-convert
+
+Converts the CSV sequences resources of a datapackage to memory-mapped binary
+(.npy) sequences resources. The datapackage descriptor is updated in place.
+
+Usage:
+  renpass-convert [options] DATAPACKAGE
+  renpass-convert -h | --help | --version
+
+Examples:
+
+  renpass-convert path/to/datapackage.json
+
+Arguments:
+
+  DATAPACKAGE                valid datapackage with input data
+
+Options:
+
+  -h --help                  Show this screen and exit.
+     --remove-csv            If set, converted CSV-files are removed
+     --version               Show version.
+"""
+
+import logging
+
+from oemof.tools import logger
+
+from . import binary
+
+try:
+    from docopt import docopt
+except ImportError:
+    print("Unable to load docopt. Is docopt installed?")
+
+###############################################################################
+
+
+def main(**arguments):
+    """
+    """
+    logging.info('Converting sequences of {}.'.format(arguments['DATAPACKAGE']))
+
+    converted = binary.convert(arguments['DATAPACKAGE'],
+                               remove_csv=arguments['--remove-csv'])
+
+    logging.info('Converted {} sequences resources: {}'.format(
+        len(converted), ', '.join(converted)))
+
+    return converted
+
+###############################################################################
+
+if __name__ == '__main__':
+    arguments = docopt(__doc__, version='renpass v0.3.1')
+
+    logger.define_logging()
+
+    main(**arguments)
@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+""" renpass-diff
+
+Compares two result directories written by renpass (problem.csv, scalars and
+sequences). Sequences and the results of the default output orientation are
+compared in chunks of rows, such that result sets of any size can be compared
+without loading them completely. Wall and solver times are not compared.
+Exits with status 1 if the results differ.
+
+Usage:
+  renpass-diff [options] LEFT RIGHT
+  renpass-diff -h | --help | --version
+
+Examples:
+
+  renpass-diff results/yesterday/model results/today/model
+
+Arguments:
+
+  LEFT                       results directory of one model
+  RIGHT                      results directory of the model to compare with
+
+Options:
+
+  -h --help                  Show this screen and exit.
+     --rtol=RTOL             Relative tolerance [default: 1e-6]
+     --atol=ATOL             Absolute tolerance [default: 1e-6]
+     --chunksize=ROWS        Number of rows of sequences compared at once
+                             [default: 10000]
+     --top=N                 Number of largest deviations reported
+                             [default: 10]
+     --report=FILE           If set, the deviations of all columns are
+                             written to FILE (CSV)
+     --version               Show version.
+"""
+
+from itertools import zip_longest
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from oemof.tools import logger
+
+try:
+    from docopt import docopt
+except ImportError:
+    print("Unable to load docopt. Is docopt installed?")
+
+# columns of the report
+COLUMNS = ['file', 'column', 'status', 'max_abs_diff', 'max_rel_diff',
+           'violations', 'left_sum', 'right_sum']
+
+# timing columns of tables (e.g. problem.csv, portfolio.csv), which differ
+# between identical runs
+TIMING = ('solver_time', 'time')
+
+###############################################################################
+
+
+def _files(directory):
+    """ Returns the paths of all result files in `directory` relative to it.
+    """
+    files = set()
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if os.path.splitext(name)[1] in ('.csv', '.parquet', '.feather') \
+                    and name not in ('profile.json', 'bus-mapping.csv',
+                                     'line-mapping.csv'):
+                files.add(os.path.relpath(os.path.join(root, name),
+                                          directory))
+    return files
+
+
+def _label(column):
+    if isinstance(column, tuple):
+        return '|'.join(str(c) for c in column)
+    return str(column)
+
+
+def _chunks(path, chunksize):
+    """ Yields the sequences file `path` in chunks of `chunksize` rows. CSV
+    files are read chunk by chunk, columnar files at once.
+    """
+    ext = os.path.splitext(path)[1]
+    if ext == '.csv':
+        for chunk in pd.read_csv(path, sep=';', header=[0, 1, 2],
+                                 index_col=0, chunksize=chunksize):
+            yield chunk
+    elif ext == '.parquet':
+        yield pd.read_parquet(path)
+    else:
+        yield pd.read_feather(path).set_index('index')
+
+
+def _rows(path, chunksize):
+    """ Yields the long table `path` (results of the default orientation) in
+    chunks of `chunksize` rows with a default index. CSV files are read chunk
+    by chunk, columnar files at once.
+    """
+    ext = os.path.splitext(path)[1]
+    if ext == '.csv':
+        for chunk in pd.read_csv(path, sep=';', chunksize=chunksize):
+            yield chunk
+    elif ext == '.parquet':
+        yield pd.read_parquet(path).reset_index()
+    else:
+        yield pd.read_feather(path)
+
+
+def _table(path):
+    """ Returns the (small) table `path` as series of its numeric values with
+    all non-numeric columns as index. Timing columns are dropped.
+    """
+    ext = os.path.splitext(path)[1]
+    if ext == '.csv':
+        sep = ';' if os.path.basename(path) not in (
+            'problem.csv', 'portfolio.csv', 'portfolio-winners.csv') else ','
+        df = pd.read_csv(path, sep=sep)
+    elif ext == '.parquet':
+        df = pd.read_parquet(path).reset_index()
+    else:
+        df = pd.read_feather(path)
+
+    df = df.drop(columns=[c for c in TIMING if c in df.columns])
+
+    keys = [c for c in df.columns if not pd.api.types.is_numeric_dtype(df[c])]
+    if keys:
+        df = df.set_index(keys)
+    return df.stack()
+
+
+def _elementwise(left, right, rtol, atol):
+    """ Returns absolute and relative deviations of the aligned arrays `left`
+    and `right` and whether they exceed the tolerances. Missing values are
+    equal to missing values only.
+    """
+    missing = np.isnan(left) != np.isnan(right)
+    diff = np.abs(np.nan_to_num(left) - np.nan_to_num(right))
+    diff[missing] = np.inf
+
+    scale = np.abs(np.nan_to_num(right))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rel = np.where(diff > 0, diff / scale, 0)
+
+    return diff, rel, diff > atol + rtol * scale
+
+
+def _deviations(left, right, rtol, atol):
+    """ Returns absolute and relative deviations and the number of values
+    exceeding the tolerances of the aligned arrays `left` and `right` by
+    column (see :func:`_elementwise`).
+    """
+    diff, rel, exceeded = _elementwise(left, right, rtol, atol)
+    return diff.max(axis=0), rel.max(axis=0), exceeded.sum(axis=0)
+
+
+def compare_sequences(left, right, rtol=1e-6, atol=1e-6, chunksize=10000):
+    """ Compares two sequences files chunk by chunk.
+
+    Returns
+    -------
+    Report as :class:`pandas.DataFrame` with one row per column.
+    """
+    columns, stats = None, None
+    status = None
+
+    for l, r in zip_longest(_chunks(left, chunksize),
+                            _chunks(right, chunksize)):
+        if l is None or r is None or len(l) != len(r):
+            status = 'rows differ'
+            break
+
+        if columns is None:
+            common = l.columns.intersection(r.columns, sort=False)
+            columns = {
+                'changed': list(common),
+                'only left': list(l.columns.difference(r.columns)),
+                'only right': list(r.columns.difference(l.columns))}
+            stats = {k: np.zeros(len(common)) for k in
+                     ('max_abs_diff', 'max_rel_diff', 'violations',
+                      'left_sum', 'right_sum')}
+
+        a = l[columns['changed']].values.astype(float)
+        b = r[columns['changed']].values.astype(float)
+        diff, rel, violations = _deviations(a, b, rtol, atol)
+
+        stats['max_abs_diff'] = np.maximum(stats['max_abs_diff'], diff)
+        stats['max_rel_diff'] = np.maximum(stats['max_rel_diff'], rel)
+        stats['violations'] += violations
+        stats['left_sum'] += np.nansum(a, axis=0)
+        stats['right_sum'] += np.nansum(b, axis=0)
+
+    if status is not None:
+        return pd.DataFrame([{'column': '', 'status': status}],
+                            columns=COLUMNS[1:])
+
+    report = pd.DataFrame(stats)
+    report['column'] = [_label(c) for c in columns['changed']]
+    report['status'] = np.where(report['violations'] > 0, 'changed',
+                                'equal')
+
+    return pd.concat(
+        [report] + [pd.DataFrame({'column': [_label(c) for c in cols],
+                                  'status': k})
+                    for k, cols in columns.items() if k != 'changed' and cols],
+        sort=False).reindex(columns=COLUMNS[1:])
+
+
+def compare_rows(left, right, rtol=1e-6, atol=1e-6, chunksize=10000):
+    """ Compares two long tables (results of the default orientation with
+    one row per variable and timestep) chunk by chunk. Rows of both tables
+    must have the same order.
+
+    Returns
+    -------
+    Report as :class:`pandas.DataFrame` with one row per variable (all key
+    columns except the timestep) and value column.
+    """
+    stats = []
+
+    for l, r in zip_longest(_rows(left, chunksize), _rows(right, chunksize)):
+        if l is None or r is None or len(l) != len(r) or \
+                list(l.columns) != list(r.columns):
+            return pd.DataFrame([{'column': '', 'status': 'rows differ'}],
+                                columns=COLUMNS[1:])
+
+        keys = [c for c in l.columns
+                if not pd.api.types.is_numeric_dtype(l[c])]
+        values = [c for c in l.columns if c not in keys and c != 'timestep']
+
+        if not (l[keys].astype(str).values ==
+                r[keys].astype(str).values).all():
+            return pd.DataFrame([{'column': '', 'status': 'rows differ'}],
+                                columns=COLUMNS[1:])
+
+        label = l[keys].astype(str).agg('|'.join, axis=1) if keys else \
+            pd.Series('', index=l.index)
+
+        for c in values:
+            a = l[c].values.astype(float)
+            b = r[c].values.astype(float)
+            diff, rel, exceeded = _elementwise(a, b, rtol, atol)
+            stats.append(pd.DataFrame({
+                'column': (label + '|' + c).values if keys else c,
+                'max_abs_diff': diff, 'max_rel_diff': rel,
+                'violations': exceeded.astype(int),
+                'left_sum': np.nan_to_num(a), 'right_sum': np.nan_to_num(b)})
+                .groupby('column', sort=False).agg({
+                    'max_abs_diff': 'max', 'max_rel_diff': 'max',
+                    'violations': 'sum', 'left_sum': 'sum',
+                    'right_sum': 'sum'}))
+
+    if not stats:
+        return pd.DataFrame(columns=COLUMNS[1:])
+
+    report = pd.concat(stats).groupby(level=0, sort=False).agg({
+        'max_abs_diff': 'max', 'max_rel_diff': 'max', 'violations': 'sum',
+        'left_sum': 'sum', 'right_sum': 'sum'}).reset_index()
+    report['status'] = np.where(report['violations'] > 0, 'changed',
+                                'equal')
+
+    return report.reindex(columns=COLUMNS[1:])
+
+
+def compare_table(left, right, rtol=1e-6, atol=1e-6):
+    """ Compares two tables of scalars (e.g. problem.csv) value by value.
+
+    Returns
+    -------
+    Report as :class:`pandas.DataFrame` with one row per value.
+    """
+    l, r = _table(left), _table(right)
+    l, r = l.align(r)
+
+    diff, rel, violations = _deviations(
+        l.values.astype(float)[None, :], r.values.astype(float)[None, :],
+        rtol, atol)
+
+    report = pd.DataFrame({
+        'column': [_label(i) for i in l.index],
+        'max_abs_diff': diff, 'max_rel_diff': rel, 'violations': violations,
+        'left_sum': l.values, 'right_sum': r.values})
+    report['status'] = np.where(
+        l.isnull().values & r.notnull().values, 'only right', np.where(
+            r.isnull().values & l.notnull().values, 'only left', np.where(
+                violations > 0, 'changed', 'equal')))
+
+    return report.reindex(columns=COLUMNS[1:])
+
+
+def compare(left, right, rtol=1e-6, atol=1e-6, chunksize=10000):
+    """ Compares the result directories `left` and `right`.
+
+    Returns
+    -------
+    Report as :class:`pandas.DataFrame` with one row per compared column
+    (sequences), variable (results of the default orientation) or value
+    (problem.csv and scalars) of every file.
+    """
+    lfiles, rfiles = _files(left), _files(right)
+
+    reports = []
+    for f in sorted(lfiles | rfiles):
+        if f not in rfiles or f not in lfiles:
+            report = pd.DataFrame([{
+                'column': '',
+                'status': 'only left' if f in lfiles else 'only right'}])
+        elif f.split(os.sep)[0] == 'sequences':
+            report = compare_sequences(
+                os.path.join(left, f), os.path.join(right, f),
+                rtol=rtol, atol=atol, chunksize=chunksize)
+        elif os.path.splitext(f)[0] == 'results':
+            report = compare_rows(
+                os.path.join(left, f), os.path.join(right, f),
+                rtol=rtol, atol=atol, chunksize=chunksize)
+        else:
+            report = compare_table(os.path.join(left, f),
+                                   os.path.join(right, f),
+                                   rtol=rtol, atol=atol)
+        report.insert(0, 'file', f)
+        reports.append(report)
+
+    if not reports:
+        return pd.DataFrame(columns=COLUMNS)
+
+    return pd.concat(reports, sort=False, ignore_index=True)\
+        .reindex(columns=COLUMNS)
+
+
+def energy_deltas(report):
+    """ Returns the sums of all flows of both result sets and their
+    difference by sequences file (e.g. component type).
+    """
+    flows = report[report['file'].str.startswith('sequences') &
+                   report['column'].str.endswith('|flow')]
+    deltas = flows.groupby('file')[['left_sum', 'right_sum']].sum()
+    deltas['delta'] = deltas['right_sum'] - deltas['left_sum']
+    return deltas
+
+###############################################################################
+
+
+def main(**arguments):
+    """
+    """
+    logging.info('Comparing {} with {}.'.format(arguments['LEFT'],
+                                                 arguments['RIGHT']))
+
+    report = compare(arguments['LEFT'], arguments['RIGHT'],
+                     rtol=float(arguments['--rtol']),
+                     atol=float(arguments['--atol']),
+                     chunksize=int(arguments['--chunksize']))
+
+    if arguments.get('--report'):
+        report.to_csv(arguments['--report'], index=False)
+
+    differing = report[report['status'] != 'equal']
+
+    logging.info('{} of {} compared values or columns differ.'.format(
+        len(differing), len(report)))
+
+    if not differing.empty:
+        logging.info('Differing files:\n{}'.format(
+            differing.groupby(['file', 'status']).size().to_string()))
+
+        top = differing.sort_values('max_abs_diff', ascending=False)\
+            .head(int(arguments['--top']))
+        logging.info('Largest deviations:\n{}'.format(top[[
+            'file', 'column', 'max_abs_diff', 'max_rel_diff']].to_string(
+                index=False)))
+
+    deltas = energy_deltas(report)
+    if not deltas.empty:
+        logging.info('Energy (sum of flows) by file:\n{}'.format(
+            deltas.to_string()))
+
+    return report
+
+###############################################################################
+
+if __name__ == '__main__':
+    arguments = docopt(__doc__, version='renpass v0.3.1')
+
+    logger.define_logging()
+
+    report = main(**arguments)
+
+    if (report['status'] != 'equal').any():
+        raise SystemExit(1)
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+""" This module contains functions to extract the duals of selected
+constraint families (e.g. the marginal prices of the bus balances) of a
+solved model as time series.
+
+Duals are only requested from the solver if at least one family is selected
+(see :func:`solve_kwargs`). The model does not import them into a dual
+suffix, which would hold the duals of all constraints, instead the duals of
+the selected families are read from the solver results before the solution
+is loaded into the model (see :func:`load`). The duals of a family are
+assembled into one array of timesteps and nodes from the index of the
+constraint.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+import numpy as np
+import pandas as pd
+
+# block and constraint of every family, constraints are indexed by node (or
+# tuple of nodes) and timestep
+FAMILIES = {
+    'bus': ('Bus', 'balance'),
+    'line': ('ElectricalLineConstraints', 'electrical_flow'),
+    'storage': ('GenericStorageBlock', 'balance')}
+
+
+def families(value):
+    """ Returns the list of families given as comma-separated string, e.g.
+    `bus,line`.
+    """
+    if not value:
+        return []
+
+    selected = [f.strip() for f in value.split(',') if f.strip()]
+    unknown = [f for f in selected if f not in FAMILIES]
+    if unknown:
+        raise ValueError("Unknown dual families {}, use any of {}.".format(
+            ', '.join(unknown), ', '.join(FAMILIES)))
+
+    return selected
+
+
+def solve_kwargs(families, **kwargs):
+    """ Returns the keyword arguments `kwargs` of the solver extended such
+    that the solver returns duals, if any `families` (or constraints, see
+    :func:`load`) are selected, which are not loaded into the model.
+    """
+    if families:
+        kwargs.update(suffixes=['dual'], load_solutions=False)
+    return kwargs
+
+
+def load(m, constraints):
+    """ Loads the solution of the model `m` solved with :func:`solve_kwargs`
+    into the model and returns the duals of the indexed `constraints` only.
+
+    Returns
+    -------
+    List with an array of the duals (in the order of
+    :meth:`constraint.values`) of every constraint. Duals not reported by the
+    solver are NaN.
+    """
+    results = m.solver_results
+
+    positions = {}
+    for j, constraint in enumerate(constraints):
+        for i, c in enumerate(constraint.values()):
+            positions[id(c)] = (j, i)
+    values = [np.full(len(c), np.nan) for c in constraints]
+
+    if not len(results.solution):
+        return values
+
+    solution = results.solution(0)
+    symbol_map = getattr(results, '_smap', None)
+    if symbol_map is None:
+        symbol_map = m.solutions.symbol_map[results._smap_id]
+
+    for symbol, entry in solution.constraint.items():
+        position = positions.get(id(symbol_map.getObject(symbol)))
+        if position is not None and 'Dual' in entry:
+            values[position[0]][position[1]] = entry['Dual']
+
+    # the duals of all other constraints are not loaded into the model
+    solution.constraint.clear()
+    m.solutions.load_from(results)
+
+    return values
+
+
+def extract(m, families, timeindex=None):
+    """ Loads the solution of the model `m` (see :func:`load`) and returns the
+    duals of the constraint `families`.
+
+    Parameters
+    ----------
+    m : :class:`oemof.solph.Model` object
+        Model solved with :func:`solve_kwargs`
+    families : list
+        Keys of :attr:`FAMILIES`
+    timeindex : pandas.DatetimeIndex (optional)
+        Index of the returned time series, default is the time index of the
+        energy system of the model
+
+    Returns
+    -------
+    Dictionary with a dataframe (timesteps, nodes) for every family. Families
+    without constraints in the model are omitted.
+    """
+    timeindex = m.es.timeindex if timeindex is None else timeindex
+
+    constraints = {}
+    for family in families:
+        block, name = FAMILIES[family]
+        constraint = getattr(getattr(m, block, None), name, None)
+        if constraint is not None and len(constraint):
+            constraints[family] = constraint
+
+    duals = {}
+    for (family, constraint), values in zip(
+            constraints.items(), load(m, list(constraints.values()))):
+        keys = list(constraint.keys())
+        nodes = [k[0] if len(k) == 2 else k[:-1] for k in keys]
+        columns, codes = np.unique([str(n) for n in nodes],
+                                   return_inverse=True)
+        timesteps = np.fromiter((k[-1] for k in keys), dtype=int,
+                                count=len(keys))
+
+        array = np.full((len(timeindex), len(columns)), np.nan)
+        array[timesteps, codes] = values
+
+        duals[family] = pd.DataFrame(array, index=timeindex, columns=columns)
+
+    return duals
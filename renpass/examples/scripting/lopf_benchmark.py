@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+""" Benchmark for the construction of the linear optimal power flow (LOPF)
+constraints on a generated meshed network. The model is created with the
+previous construction of the constraints (one `Constraint.add` per line and
+timestep in a BuildAction) and with the current one, the best time of
+`REPEAT` runs of both is reported.
+
+Usage:
+
+    python lopf_benchmark.py [LINES] [TIMESTEPS] [REPEAT]
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+from datetime import datetime
+import random
+import sys
+
+from pyomo.core.base.block import SimpleBlock
+from pyomo.environ import BuildAction, Constraint, Set, Var
+
+from renpass import facades as fc
+from renpass.components import electrical as elec
+
+from oemof.solph import EnergySystem, Model
+
+import pandas as pd
+
+
+lines = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+timesteps = int(sys.argv[2]) if len(sys.argv) > 2 else 168
+repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+
+class PreviousElectricalLineConstraints(SimpleBlock):
+    """ Previous construction of the LOPF constraints for comparison.
+    """
+
+    CONSTRAINT_GROUP = True
+
+    def _create(self, group=None):
+        if group is None:
+            return None
+
+        m = self.parent_block()
+
+        self.ELECTRICAL_BUSES = Set(initialize=[
+            n for n in m.es.nodes if isinstance(n, elec.ElectricalBus)])
+
+        def _voltage_angle_bounds(block, b, t):
+            return b.v_min, b.v_max
+        self.voltage_angle = Var(self.ELECTRICAL_BUSES, m.TIMESTEPS,
+                                 bounds=_voltage_angle_bounds)
+
+        def _voltage_angle_relation(block):
+            for t in m.TIMESTEPS:
+                for n in group:
+                    if n.input.slack is True:
+                        self.voltage_angle[n.output, t].value = 0
+                        self.voltage_angle[n.output, t].fix()
+                    lhs = m.flow[n.input, n.output, t]
+                    rhs = 1 / n.reactance[t] * (
+                        self.voltage_angle[n.input, t] -
+                        self.voltage_angle[n.output, t])
+                    block.electrical_flow.add((n, t), (lhs == rhs))
+
+        self.electrical_flow = Constraint(group, m.TIMESTEPS, noruleinit=True)
+
+        self.electrical_flow_build = BuildAction(
+            rule=_voltage_angle_relation)
+
+
+def create_energysystem():
+    random.seed(0)
+
+    es = EnergySystem(
+        timeindex=pd.date_range('2018', freq='H', periods=timesteps))
+
+    # a ring of buses with additional random lines (meshing)
+    buses = [elec.ElectricalBus('el' + str(i)) for i in range(lines // 2)]
+    buses[0].slack = True
+
+    for i, b in enumerate(buses):
+        es.add(b)
+        es.add(elec.Line(from_bus=b, to_bus=buses[(i + 1) % len(buses)],
+                         capacity=100,
+                         reactance=random.uniform(0.0001, 0.001)))
+
+    for i in range(lines - len(buses)):
+        b1, b2 = random.sample(buses, 2)
+        es.add(elec.Line(from_bus=b1, to_bus=b2, capacity=100,
+                         reactance=random.uniform(0.0001, 0.001)))
+
+    for i, b in enumerate(buses):
+        if i % 2:
+            es.add(fc.Dispatchable('gen' + str(i), capacity=100, bus=b,
+                                   marginal_cost=random.uniform(10, 50),
+                                   carrier='gas', tech='gt'))
+        else:
+            es.add(fc.Load('load' + str(i), bus=b, amount=50,
+                           profile=[random.random()
+                                    for t in range(timesteps)]))
+
+    return es
+
+
+def model_creation_time(block):
+    """ Returns the best model creation time of `repeat` runs with the LOPF
+    constraints built by `block`.
+    """
+    constraint_group = elec.Line.constraint_group
+    elec.Line.constraint_group = lambda self: block
+    try:
+        times = []
+        for _ in range(repeat):
+            es = create_energysystem()
+            start = datetime.now()
+            Model(es)
+            times.append(datetime.now() - start)
+    finally:
+        elec.Line.constraint_group = constraint_group
+    return min(times)
+
+
+previous = model_creation_time(PreviousElectricalLineConstraints)
+current = model_creation_time(elec.ElectricalLineConstraints)
+
+print('Lines: {}, timesteps: {}, model creation time: {} (previous), {} '
+      '(current), speedup: {:.2f}'.format(
+          lines, timesteps, previous, current, previous / current))
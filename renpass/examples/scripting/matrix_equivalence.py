@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+""" Equivalence check of the matrix backend (:mod:`renpass.matrix`) and the
+pyomo model of oemof for timesteps of two hours. The energy of the cheap
+generator is limited by `summed_max` and the energy of the expensive one by
+`summed_min`, both are weighted by the time increment in the pyomo model. The
+objectives and the energy of every flow of both models have to be equal
+(flows of single timesteps are not unique).
+
+Usage:
+
+    python matrix_equivalence.py [SOLVER]
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+from renpass import facades as fc
+from renpass.matrix import MatrixModel
+
+from oemof.solph import EnergySystem, Model
+from oemof.outputlib import processing
+
+
+solver = sys.argv[1] if len(sys.argv) > 1 else 'cbc'
+
+es = EnergySystem(timeindex=pd.date_range('2018', freq='2h', periods=4))
+
+bus = fc.Bus('bus')
+
+# 30 MWh at most, the load of 58 MWh is covered by the expensive generator
+# otherwise
+cheap = fc.Dispatchable('cheap', bus=bus, carrier='wind', tech='onshore',
+                        capacity=10, marginal_cost=1,
+                        edge_parameters={'summed_max': 3})
+
+# 40 MWh at least
+expensive = fc.Dispatchable('expensive', bus=bus, carrier='gas', tech='gt',
+                            capacity=20, marginal_cost=50,
+                            edge_parameters={'summed_min': 2})
+
+load = fc.Load('load', bus=bus, amount=10, profile=[0.5, 1, 0.8, 0.6])
+
+excess = fc.Excess('excess', bus=bus, marginal_cost=0.1)
+
+es.add(bus, cheap, expensive, load, excess)
+
+m = Model(es)
+m.solve(solver=solver)
+
+mm = MatrixModel(es)
+mm.solve()
+
+assert np.isclose(m.objective(), mm.solution.fun), \
+    "Objectives differ: {} (pyomo) and {} (matrix).".format(
+        m.objective(), mm.solution.fun)
+
+matrix_results = mm.results()['main']
+
+for key, value in processing.results(m).items():
+    energy = (value['sequences']['flow'] * 2).sum()
+    assert np.isclose(
+        energy, (matrix_results[key]['sequences']['flow'] * 2).sum()), \
+        "Energy of flow {} differs.".format(key)
+
+print("Pyomo and matrix model are equal (objective {:.2f}).".format(
+    m.objective()))
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+
+""" Sensitivity of the dispatch example to the marginal cost of the gas
+turbine. The model is built once and only the costs are updated between the
+solves.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+from oemof.solph import EnergySystem, Model
+from oemof.outputlib import processing
+
+from renpass import options, persistent
+
+
+es = EnergySystem.from_datapackage(
+    'renpass/examples/dispatch/datapackage.json',
+    attributemap={},
+    typemap=options.typemap)
+
+m = Model(es)
+
+for cost in [20, 40, 60, 80]:
+    persistent.update(m, {('gas-gt', 'bus1'): {'variable_costs': cost}})
+
+    m.solve(solver='cbc')
+
+    print(cost, processing.meta_results(m)['objective'])
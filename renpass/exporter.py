@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+""" This module contains an exporter writing results in a background thread,
+such that the next model can be built and solved while the results of the
+previous one are still written.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+import logging
+import queue
+import threading
+
+
+class Exporter(object):
+    """ Runs export tasks one after another in a background thread.
+
+    The number of pending tasks is bounded, i.e. :meth:`submit` blocks while
+    `max_pending` tasks are waiting, which limits the number of result
+    snapshots held in memory.
+
+    Examples
+    --------
+    >>> written = []
+    >>> exporter = Exporter(max_pending=1)
+    >>> exporter.submit(written.append, 'results')
+    >>> exporter.close()
+    >>> written
+    ['results']
+    """
+    def __init__(self, max_pending=1):
+        self.tasks = queue.Queue(maxsize=max(int(max_pending), 1))
+        self.error = None
+        self.thread = threading.Thread(target=self._work, daemon=True)
+        self.thread.start()
+
+    def _work(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+            func, args, kwargs = task
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                logging.error('Export failed: {}'.format(e))
+                self.error = self.error or e
+
+    def _raise(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def submit(self, func, *args, **kwargs):
+        """ Submits the task `func(*args, **kwargs)`. Errors of previous tasks
+        are raised.
+        """
+        self._raise()
+        self.tasks.put((func, args, kwargs))
+
+    def close(self):
+        """ Waits until all tasks are done and raises the first error of a
+        task, if any.
+        """
+        self.tasks.put(None)
+        self.thread.join()
+        self._raise()
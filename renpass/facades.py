@@ -6,6 +6,8 @@ application and work with the oemof datapackage - reader functionality
 
 SPDX-License-Identifier: GPL-3.0-or-later
 """
+from numbers import Number
+
 from oemof.network import Node
 from oemof.solph import (Source, Flow, Investment, NonConvex, Sink, Transformer,
                          Bus)
@@ -13,6 +15,24 @@ from oemof.solph.components import GenericStorage, ExtractionTurbineCHP
 from oemof.solph.custom import Link
 from oemof.solph.plumbing import sequence
 
+# sequences of scalar values shared by all facades, see `shared_sequence`
+_SHARED_SEQUENCES = {}
+
+
+def shared_sequence(value):
+    """ Returns :func:`oemof.solph.plumbing.sequence` of `value`, where the
+    sequence of a scalar value is one object shared by all facades instead of
+    a new object for every attribute (e.g. the conversion factor 1 of every
+    input). Shared sequences must not be modified in place, attributes have to
+    be replaced instead.
+    """
+    if isinstance(value, Number) and value == value:
+        key = (type(value), value)
+        if key not in _SHARED_SEQUENCES:
+            _SHARED_SEQUENCES[key] = sequence(value)
+        return _SHARED_SEQUENCES[key]
+    return sequence(value)
+
 
 class Facade(Node):
     """
@@ -23,6 +43,21 @@ class Facade(Node):
         present as keywort arguments or whether they are already present on
         self (which means they have been set by constructors of subclasses) and
         raises an error if he doesn't find them.
+    commitable: boolean
+        If True, the (electrical) output is subject to clustered unit
+        commitment if enabled, see :mod:`renpass.commitment`. Default: False
+    units: int
+        Number of identical units the capacity consists of. Default: 1
+    pmin: numeric
+        Minimal output of an online unit relative to its capacity. Default: 0
+    min_up: int
+        Minimal number of timesteps a unit is online after its start-up.
+        Default: 1
+    min_down: int
+        Minimal number of timesteps a unit is offline after its shut-down.
+        Default: 1
+    start_up_cost: numeric
+        Costs of one start-up of one unit. Default: 0
     """
     def __init__(self, *args, **kwargs):
         """
@@ -34,6 +69,18 @@ class Facade(Node):
 
         self.carrier = kwargs.get('carrier')
 
+        self.commitable = kwargs.get('commitable', False)
+
+        self.units = kwargs.get('units', 1)
+
+        self.pmin = kwargs.get('pmin', 0)
+
+        self.min_up = kwargs.get('min_up', 1)
+
+        self.min_down = kwargs.get('min_down', 1)
+
+        self.start_up_cost = kwargs.get('start_up_cost', 0)
+
         required = kwargs.pop("_facade_requires_", [])
         super().__init__(*args, **kwargs)
         self.subnodes = []
@@ -305,7 +352,8 @@ class ExtractionTurbine(ExtractionTurbineCHP, Facade):
 
         self.capacity = kwargs.get('capacity')
 
-        self.condensing_efficiency = sequence(self.condensing_efficiency)
+        self.condensing_efficiency = shared_sequence(
+            self.condensing_efficiency)
 
         self.marginal_cost = kwargs.get('marginal_cost', 0)
 
@@ -316,9 +364,9 @@ class ExtractionTurbine(ExtractionTurbineCHP, Facade):
         self.heat_bus = kwargs.get('heat_bus')
 
         self.conversion_factors.update({
-            self.carrier: sequence(1),
-            self.electricity_bus: sequence(self.electric_efficiency),
-            self.heat_bus: sequence(self.thermal_efficiency)})
+            self.carrier: shared_sequence(1),
+            self.electricity_bus: shared_sequence(self.electric_efficiency),
+            self.heat_bus: shared_sequence(self.thermal_efficiency)})
 
         self.inputs.update({
             self.carrier: Flow(variable_cost=self.carrier_cost)})
@@ -388,9 +436,9 @@ class BackpressureTurbine(Transformer, Facade):
         self.capacity_cost = kwargs.get('capacity_cost')
 
         self.conversion_factors.update({
-            self.carrier: sequence(1),
-            self.electricity_bus: sequence(self.electric_efficiency),
-            self.heat_bus: sequence(self.thermal_efficiency)})
+            self.carrier: shared_sequence(1),
+            self.electricity_bus: shared_sequence(self.electric_efficiency),
+            self.heat_bus: shared_sequence(self.thermal_efficiency)})
 
         self.inputs.update({
             self.carrier: Flow(variable_costs=self.carrier_cost)})
@@ -443,8 +491,8 @@ class Conversion(Transformer, Facade):
 
 
         self.conversion_factors.update({
-            self.from_bus: sequence(1),
-            self.to_bus: sequence(self.efficiency)})
+            self.from_bus: shared_sequence(1),
+            self.to_bus: shared_sequence(self.efficiency)})
 
         self.inputs.update({
             self.from_bus: Flow(**self.input_edge_parameters)})
@@ -523,12 +571,12 @@ class Storage(GenericStorage, Facade):
 
         self.capacity_cost = kwargs.get('capacity_cost')
 
-        self.loss = sequence(kwargs.get('loss', 0))
+        self.loss = shared_sequence(kwargs.get('loss', 0))
 
-        self.inflow_conversion_factor = sequence(
+        self.inflow_conversion_factor = shared_sequence(
             kwargs.get('efficiency', 1))
 
-        self.outflow_conversion_factor = sequence(
+        self.outflow_conversion_factor = shared_sequence(
             kwargs.get('efficiency', 1))
 
         # make it investment but don't set costs (set below for flow (power))
@@ -622,8 +670,8 @@ class Connection(Link, Facade):
                               investment=investment)})
 
         self.conversion_factors.update({
-            (self.from_bus, self.to_bus): sequence((1 - self.loss)),
-            (self.to_bus, self.from_bus): sequence((1 - self.loss))})
+            (self.from_bus, self.to_bus): shared_sequence((1 - self.loss)),
+            (self.to_bus, self.from_bus): shared_sequence((1 - self.loss))})
 
 
 class Excess(Sink, Facade):
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+
+""" This module contains functions to generate synthetic datapackages of
+arbitrary size, e.g. to benchmark renpass.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# number of elements of every type per bus
+PER_BUS = {
+    'dispatchable': 2,
+    'volatile': 2,
+    'load': 1,
+    'storage': 1}
+
+# fields of the element resources as (name, type) tuples
+FIELDS = {
+    'bus': [('name', 'string'), ('type', 'string'), ('balanced', 'boolean')],
+    'electricalbus': [('name', 'string'), ('type', 'string'),
+                      ('slack', 'boolean')],
+    'dispatchable': [('name', 'string'), ('type', 'string'),
+                     ('carrier', 'string'), ('tech', 'string'),
+                     ('capacity', 'number'), ('bus', 'string'),
+                     ('marginal_cost', 'number')],
+    'shortage': [('name', 'string'), ('type', 'string'),
+                 ('carrier', 'string'), ('tech', 'string'),
+                 ('capacity', 'number'), ('bus', 'string'),
+                 ('marginal_cost', 'number')],
+    'excess': [('name', 'string'), ('type', 'string'), ('bus', 'string'),
+               ('marginal_cost', 'number')],
+    'volatile': [('name', 'string'), ('type', 'string'),
+                 ('carrier', 'string'), ('tech', 'string'),
+                 ('capacity', 'number'), ('bus', 'string'),
+                 ('profile', 'string')],
+    'load': [('name', 'string'), ('type', 'string'), ('amount', 'number'),
+             ('bus', 'string'), ('profile', 'string')],
+    'storage': [('name', 'string'), ('type', 'string'),
+                ('storage_capacity', 'number'), ('capacity', 'number'),
+                ('efficiency', 'number'), ('bus', 'string')],
+    'connection': [('name', 'string'), ('type', 'string'),
+                   ('capacity', 'number'), ('loss', 'number'),
+                   ('from_bus', 'string'), ('to_bus', 'string')],
+    'line': [('name', 'string'), ('type', 'string'), ('capacity', 'number'),
+             ('reactance', 'number'), ('from_bus', 'string'),
+             ('to_bus', 'string')]}
+
+# resources of the sequences referenced by the `profile` field
+PROFILES = {
+    'volatile': 'volatile-profiles',
+    'load': 'load-profiles'}
+
+
+def _edges(buses, meshing, rng):
+    """ Returns a list of (from, to) tuples of a ring through all buses plus
+    `meshing * len(buses)` additional random edges.
+    """
+    n = len(buses)
+    if n < 2:
+        return []
+    edges = {(i, (i + 1) % n) for i in range(n if n > 2 else 1)}
+    for _ in range(int(meshing * n)):
+        i, j = rng.choice(n, 2, replace=False)
+        if (i, j) not in edges and (j, i) not in edges:
+            edges.add((i, j))
+    return [(buses[i], buses[j]) for i, j in sorted(edges)]
+
+
+def _profiles(elements, timesteps, rng):
+    """ Returns a dataframe of synthetic profiles with one column per element.
+    Load profiles sum up to one, volatile profiles are within [0, 1].
+    """
+    hours = np.arange(timesteps)
+    profiles = {}
+    for e in elements:
+        name = e['profile']
+        if e['type'] == 'load':
+            p = (1 + 0.3 * np.sin(2 * np.pi * (hours - 6) / 24) +
+                 0.1 * rng.random(timesteps))
+            profiles[name] = p / p.sum()
+        elif e['carrier'] == 'solar':
+            # solar: daily bell shape with random clouds
+            p = np.clip(np.sin(2 * np.pi * (hours % 24 - 6) / 24), 0, None)
+            profiles[name] = p * rng.uniform(0.3, 1, timesteps)
+        else:
+            # wind: clipped random walk
+            p = 0.4 + np.cumsum(rng.normal(0, 0.05, timesteps))
+            profiles[name] = np.clip(p, 0, 1)
+    return pd.DataFrame(profiles)
+
+
+def _resource(name, path, fields, foreign_keys=None):
+    schema = {
+        'fields': [{'name': f, 'type': t, 'format': 'default'}
+                   for f, t in fields],
+        'missingValues': ['']}
+    if foreign_keys:
+        schema['foreignKeys'] = foreign_keys
+    return {
+        'name': name,
+        'path': path,
+        'profile': 'tabular-data-resource',
+        'format': 'csv',
+        'mediatype': 'text/csv',
+        'encoding': 'utf-8',
+        'schema': schema}
+
+
+def generate(path, buses=10, timesteps=24, meshing=0.5, lopf=False,
+             per_bus=None, start='2030-01-01', seed=0, name=None):
+    """ Generates a synthetic datapackage with `buses` buses connected by a
+    meshed network of connections (or lines if `lopf` is True). Every bus has
+    dispatchable and volatile generators, loads and storages as well as a
+    shortage and excess element to keep the problem feasible.
+
+    Parameters
+    ----------
+    path : str
+        Directory the datapackage is written to
+    buses : int
+        Number of buses
+    timesteps : int
+        Number of (hourly) timesteps
+    meshing : numeric
+        Number of additional random connections / lines per bus on top of a
+        ring through all buses
+    lopf : boolean
+        If True, electrical buses and lines are used instead of buses and
+        connections
+    per_bus : dict
+        Number of elements of every type per bus, default: `PER_BUS`
+    start : str
+        First timestamp of the time index
+    seed : int
+        Seed of the random number generator
+    name : str
+        Name of the datapackage, default: generated from the size
+
+    Returns
+    -------
+    Path of the datapackage metadata file.
+    """
+    rng = np.random.default_rng(seed)
+    per_bus = dict(PER_BUS, **(per_bus or {}))
+    name = name or 'synthetic-{}-buses-{}-timesteps'.format(buses, timesteps)
+
+    bus_names = ['bus' + str(i) for i in range(buses)]
+    elements = {}
+
+    if lopf:
+        elements['bus'] = [
+            {'name': b, 'type': 'electricalbus', 'slack': i == 0}
+            for i, b in enumerate(bus_names)]
+        elements['line'] = [
+            {'name': 'line{}'.format(i), 'type': 'line',
+             'capacity': rng.uniform(50, 500),
+             'reactance': rng.uniform(0.0001, 0.001),
+             'from_bus': a, 'to_bus': b}
+            for i, (a, b) in enumerate(_edges(bus_names, meshing, rng))]
+    else:
+        elements['bus'] = [{'name': b, 'type': 'bus', 'balanced': True}
+                           for b in bus_names]
+        elements['connection'] = [
+            {'name': 'connection{}'.format(i), 'type': 'connection',
+             'capacity': rng.uniform(50, 500), 'loss': 0.02,
+             'from_bus': a, 'to_bus': b}
+            for i, (a, b) in enumerate(_edges(bus_names, meshing, rng))]
+
+    techs = {'dispatchable': [('gas', 'gt'), ('coal', 'st'),
+                              ('lignite', 'st'), ('oil', 'ocgt')],
+             'volatile': [('wind', 'onshore'), ('solar', 'pv')]}
+
+    for kind in ('dispatchable', 'volatile', 'load', 'storage'):
+        elements[kind] = []
+        for b in bus_names:
+            for i in range(per_bus[kind]):
+                e = {'name': '{}-{}{}'.format(b, kind, i), 'type': kind,
+                     'bus': b}
+                if kind == 'dispatchable':
+                    carrier, tech = techs[kind][i % len(techs[kind])]
+                    e.update(carrier=carrier, tech=tech,
+                             capacity=rng.uniform(50, 200),
+                             marginal_cost=rng.uniform(10, 80))
+                elif kind == 'volatile':
+                    carrier, tech = techs[kind][i % len(techs[kind])]
+                    e.update(carrier=carrier, tech=tech,
+                             capacity=rng.uniform(20, 200),
+                             profile=e['name'] + '-profile')
+                elif kind == 'load':
+                    e.update(amount=rng.uniform(50, 150) * timesteps,
+                             profile=e['name'] + '-profile')
+                else:
+                    e.update(capacity=rng.uniform(10, 50),
+                             storage_capacity=rng.uniform(50, 400),
+                             efficiency=0.9)
+                elements[kind].append(e)
+
+    elements['shortage'] = [
+        {'name': b + '-shortage', 'type': 'shortage', 'carrier': 'shortage',
+         'tech': 'shortage', 'capacity': 1e5, 'bus': b,
+         'marginal_cost': 1e4} for b in bus_names]
+    elements['excess'] = [
+        {'name': b + '-excess', 'type': 'excess', 'bus': b,
+         'marginal_cost': 0} for b in bus_names]
+
+    for directory in ('elements', 'sequences'):
+        if not os.path.isdir(os.path.join(path, 'data', directory)):
+            os.makedirs(os.path.join(path, 'data', directory))
+
+    resources = []
+
+    for kind, rows in elements.items():
+        if not rows:
+            continue
+        fields = FIELDS['electricalbus' if lopf and kind == 'bus' else kind]
+        resource_path = 'data/elements/{}.csv'.format(kind)
+        pd.DataFrame(rows, columns=[f for f, _ in fields]).to_csv(
+            os.path.join(path, resource_path), sep=';', index=False)
+
+        foreign_keys = [
+            {'fields': f, 'reference': {'fields': 'name', 'resource': 'bus'}}
+            for f, _ in fields if f in ('bus', 'from_bus', 'to_bus')]
+        if kind in PROFILES:
+            foreign_keys.append({'fields': 'profile',
+                                 'reference': {'resource': PROFILES[kind]}})
+
+        resources.append(
+            _resource(kind, resource_path, fields, foreign_keys))
+
+    timeindex = pd.date_range(start, periods=timesteps,
+                              freq=pd.Timedelta(hours=1))
+
+    for kind, resource in PROFILES.items():
+        names = [e['profile'] for e in elements[kind]]
+        if not names:
+            continue
+        df = _profiles(elements[kind], timesteps, rng)
+        df.index = timeindex.strftime('%Y-%m-%dT%H:%M:%SZ')
+        df.index.name = 'timeindex'
+        resource_path = 'data/sequences/{}.csv'.format(resource)
+        df.to_csv(os.path.join(path, resource_path))
+        resources.append(_resource(
+            resource, resource_path,
+            [('timeindex', 'datetime')] + [(n, 'number') for n in names]))
+
+    descriptor = {'name': name,
+                  'profile': 'tabular-data-package',
+                  'resources': resources}
+
+    descriptor_path = os.path.join(path, 'datapackage.json')
+    with open(descriptor_path, 'w') as f:
+        json.dump(descriptor, f, indent=4)
+
+    return descriptor_path
@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+
+""" This module contains functions to solve dispatch models in a rolling
+horizon, i.e. the time index of the energy system is split into windows that
+are optimized one after another. Storage levels are passed from one window to
+the next one.
+
+Storage levels at the window boundaries:
+
+* The first window starts from the initial level (`initial_capacity`) of a
+  storage. Storages without initial level are cyclic within the first window
+  (the level before the first timestep is the level of the last timestep of
+  the window), as in a monolithic model.
+* Every following window starts from the level of the last kept timestep of
+  the previous window.
+* The level at the end of a window is free, except for the last window, in
+  which the level of the last timestep is fixed to the initial level (if
+  set) as in a monolithic model. Use `--overlap` to avoid that storages are
+  emptied at the end of every window.
+* The objective of a window only includes the costs of the kept timesteps,
+  i.e. the costs of the overlap are not counted.
+
+With unit commitment, every following window starts from the units online in
+the last kept timestep of the previous window, the minimal up and down times
+include the start-ups and shut-downs of the kept timesteps before the window.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+from collections import UserList, defaultdict
+import logging
+
+import pandas as pd
+from pyomo.environ import Constraint
+from pyomo.repn import generate_standard_repn
+
+from oemof.solph import Model
+from oemof.solph.components import GenericStorage
+from oemof.outputlib import processing
+
+from . import commitment, duals, presolve
+
+# attributes of flows and nodes that may hold time dependent sequences
+FLOW_SEQUENCES = ('actual_value', 'variable_costs', 'min', 'max')
+
+NODE_SEQUENCES = ('capacity_loss', 'capacity_min', 'capacity_max',
+                  'inflow_conversion_factor', 'outflow_conversion_factor',
+                  'reactance', 'presolve_injection')
+
+
+def _is_timeseries(value):
+    """ Returns True if `value` is a sequence with one value per timestep,
+    i.e. not a scalar wrapped by :func:`oemof.solph.plumbing.sequence`.
+    """
+    if isinstance(value, (str, dict, UserList)):
+        return False
+    return hasattr(value, '__getitem__') and hasattr(value, '__len__')
+
+
+def sequence_holders(es):
+    """ Yields tuples of (object, attribute, key) for all time dependent
+    sequences of the energy system. `key` is not None for sequences stored in
+    dictionaries (e.g. conversion factors of transformers).
+    """
+    for flow in es.flows().values():
+        for attr in FLOW_SEQUENCES:
+            if _is_timeseries(getattr(flow, attr, None)):
+                yield flow, attr, None
+    for n in es.nodes:
+        for attr in NODE_SEQUENCES:
+            if _is_timeseries(getattr(n, attr, None)):
+                yield n, attr, None
+        for attr in ('conversion_factors',
+                     'conversion_factor_full_condensation'):
+            for k, v in getattr(n, attr, {}).items():
+                if _is_timeseries(v):
+                    yield n, attr, k
+
+
+def replace_sequences(es, func):
+    """ Replaces every time dependent sequence `s` of the energy system by
+    `func(s)` and returns the original sequences, which can be passed to
+    :func:`restore_sequences`.
+    """
+    originals = []
+    for obj, attr, key in list(sequence_holders(es)):
+        if key is None:
+            value = getattr(obj, attr)
+            setattr(obj, attr, func(value))
+        else:
+            value = getattr(obj, attr)[key]
+            getattr(obj, attr)[key] = func(value)
+        originals.append((obj, attr, key, value))
+    return originals
+
+
+def slice_sequences(es, start, end):
+    """ Replaces all time dependent sequences of the energy system by the
+    slice `start:end` and returns the original sequences, which can be passed
+    to :func:`restore_sequences`.
+
+    Parameters
+    ----------
+    es : :class:`oemof.solph.network.EnergySystem` object
+    start : int
+        First timestep (position) of the slice
+    end : int
+        Last timestep (position, exclusive) of the slice
+    """
+    return replace_sequences(es, lambda value: value[start:end])
+
+
+def restore_sequences(originals):
+    """ Restores sequences replaced by :func:`replace_sequences`.
+    """
+    for obj, attr, key, value in originals:
+        if key is None:
+            setattr(obj, attr, value)
+        else:
+            getattr(obj, attr)[key] = value
+
+
+def windows(timesteps, horizon, overlap=0):
+    """ Returns a list of (start, end, keep) tuples, where `start:end` is the
+    range of timesteps that is optimized and `keep` is the number of timesteps
+    (counted from `start`) whose results are kept.
+
+    Parameters
+    ----------
+    timesteps : int
+        Total number of timesteps
+    horizon : int
+        Number of timesteps kept from every window
+    overlap : int
+        Number of additional timesteps optimized at the end of every window
+        which are discarded afterwards (look-ahead)
+    """
+    if horizon < 1:
+        raise ValueError("Horizon must be at least one timestep.")
+    if overlap < 0:
+        raise ValueError("Overlap must not be negative.")
+
+    return [(start,
+             min(start + horizon + overlap, timesteps),
+             min(horizon, timesteps - start))
+            for start in range(0, timesteps, horizon)]
+
+
+def _link_storage_levels(m, levels):
+    """ Replaces the balance of the first timestep of every storage in the
+    model `m` by a balance that starts from the storage level `levels[n]` of
+    the previous window instead of the (cyclic) level of the last timestep.
+    """
+    block = m.GenericStorageBlock
+    t = 0
+
+    def _initial_balance_rule(block, n):
+        expr = 0
+        expr += block.capacity[n, t]
+        expr += - levels[n] * (1 - n.capacity_loss[t])
+        expr += (- m.flow[list(n.inputs)[0], n, t] *
+                 n.inflow_conversion_factor[t]) * m.timeincrement[t]
+        expr += (m.flow[n, list(n.outputs)[0], t] /
+                 n.outflow_conversion_factor[t]) * m.timeincrement[t]
+        return expr == 0
+
+    for n in levels:
+        block.balance[n, t].deactivate()
+
+    block.initial_balance = Constraint(
+        list(levels), rule=_initial_balance_rule)
+
+
+def _release_end_levels(m, storages):
+    """ Unfixes the level of the last timestep of all storages of the model
+    `m`, which oemof fixes to the initial level (`initial_capacity`).
+    """
+    last = m.TIMESTEPS[-1]
+    for n in storages:
+        if getattr(n, 'initial_capacity', None) is not None:
+            m.GenericStorageBlock.capacity[n, last].unfix()
+
+
+def _kept_objective(m, keep):
+    """ Returns the value of the (linear) objective of the solved model `m`
+    without the terms of the timesteps from `keep` on, i.e. without the costs
+    of the overlap of a window. Variables are indexed by the timestep last.
+    """
+    repn = generate_standard_repn(m.objective.expr, quadratic=False)
+
+    objective = repn.constant
+    for coefficient, v in zip(repn.linear_coefs, repn.linear_vars):
+        index = v.index()
+        t = index[-1] if isinstance(index, tuple) else index
+        if isinstance(t, int) and t >= keep:
+            continue
+        objective += coefficient * (v.value or 0)
+    return objective
+
+
+def _meta_results(meta):
+    """ Aggregates the meta results of all windows into one dictionary with the
+    structure of :func:`oemof.outputlib.processing.meta_results`.
+    """
+    return {
+        'objective': sum(r['objective'] for r in meta),
+        'solver': {
+            'Time': sum(float(r['solver']['Time']) for r in meta)},
+        'problem': {
+            'Number of constraints': max(
+                r['problem']['Number of constraints'] for r in meta),
+            'Number of variables': max(
+                r['problem']['Number of variables'] for r in meta)}}
+
+
+def rolling_horizon(es, **arguments):
+    """ Solves the energy system window by window and stores the joined
+    results in `es._results` (`es.results` is overwritten with the solver
+    results by every solve).
+
+    Parameters
+    ----------
+    es : :class:`oemof.solph.network.EnergySystem` object
+        Energy system holding nodes, grouping functions and other important
+        information.
+    **arguments : key word arguments
+        Arguments passed from command line
+
+    Returns
+    -------
+    The solved :class:`oemof.solph.models.Model` of the last window.
+    """
+    if any(f.investment for f in es.flows().values()):
+        raise ValueError(
+            "Rolling horizon is only supported for dispatch models, but the "
+            "energy system contains investment flows.")
+
+    horizon = int(arguments['--horizon'])
+    overlap = int(arguments.get('--overlap') or 0)
+
+    timeindex = es.timeindex
+    storages = [n for n in es.nodes if isinstance(n, GenericStorage)]
+
+    # the first window starts from the initial levels (if set)
+    levels = {n: n.initial_capacity * n.nominal_capacity for n in storages
+              if getattr(n, 'initial_capacity', None) is not None}
+    results = {}
+    dataframes = []
+    meta = []
+    families = duals.families(arguments.get('--duals'))
+    window_duals = defaultdict(list)
+    # state of the unit commitment at the end of the kept timesteps
+    history = None
+
+    _windows = windows(len(timeindex), horizon, overlap)
+
+    for i, (start, end, keep) in enumerate(_windows):
+        logging.info(
+            "Solving window {} of {} (timesteps {} to {}).".format(
+                i + 1, len(_windows), start, end - 1))
+
+        es.timeindex = timeindex[start:end]
+        originals = slice_sequences(es, start, end)
+
+        try:
+            if es.temporal is not None:
+                m = Model(es, objective_weighting=es.temporal['weighting']
+                          [start:end].reset_index(drop=True))
+            else:
+                m = Model(es)
+
+            presolve.add_injections(m)
+
+            if levels:
+                _link_storage_levels(m, levels)
+
+            # the end level is fixed for the last window only
+            if end < len(timeindex):
+                _release_end_levels(m, storages)
+
+            if arguments.get('--unit-commitment', 'off') not in (None, 'off'):
+                commitment.add_unit_commitment(
+                    m, relaxed=arguments['--unit-commitment'] == 'lp',
+                    history=history)
+
+            m.solve(solver=arguments['--solver'],
+                    solve_kwargs=duals.solve_kwargs(families, tee=True))
+        finally:
+            restore_sequences(originals)
+
+        if families:
+            for f, df in duals.extract(m, families).items():
+                window_duals[f].append(df.iloc[:keep])
+
+        meta.append(processing.meta_results(m))
+        if keep < end - start:
+            # costs of the overlap are discarded with its results
+            meta[-1]['objective'] = _kept_objective(m, keep)
+
+        for k, v in processing.results(m).items():
+            sequences = v['sequences'].iloc[:keep]
+            if k in results:
+                results[k]['sequences'].append(sequences)
+            else:
+                results[k] = {'sequences': [sequences],
+                              'scalars': v.get('scalars')}
+
+        if arguments.get('--output-orient') == 'default':
+            df = processing.create_dataframe(m).reset_index()
+            df = df[df['timestep'] < keep]
+            df['timestep'] += start
+            dataframes.append(
+                df.set_index(['oemof_tuple', 'variable_name', 'timestep']))
+
+        levels = {n: m.GenericStorageBlock.capacity[n, keep - 1].value
+                  for n in storages}
+        history = commitment.history(m, keep, history)
+
+    es.timeindex = timeindex
+
+    es._results = {
+        'main': {k: {'sequences': pd.concat(v['sequences']),
+                     'scalars': v['scalars']}
+                 for k, v in results.items()},
+        'meta': _meta_results(meta)}
+
+    if dataframes:
+        es._results['dataframe'] = pd.concat(dataframes)
+
+    if window_duals:
+        es._results['duals'] = {f: pd.concat(v)
+                                for f, v in window_duals.items()}
+
+    return m
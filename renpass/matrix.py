@@ -0,0 +1,433 @@
+# -*- coding: utf-8 -*-
+
+""" This module contains an alternative model backend which assembles the
+linear program of a dispatch model directly as sparse matrices instead of
+pyomo objects.
+
+The backend covers the solph components the facades are built from (buses,
+sources, sinks, transformers, links and generic storages) with flows defined
+by `nominal_value`, `min`, `max`, `actual_value`, `fixed`, `variable_costs`,
+`summed_min` and `summed_max`. Investment, nonconvex flows, extraction
+turbines and LOPF components are not supported.
+
+Variables are ordered block by block: first all flows (one block of
+timesteps per flow), then the storage levels (one block per storage). All
+constraints of one kind are created for all timesteps at once.
+
+The problem is solved with the HiGHS solver shipped with scipy. It can also
+be written to a (free) MPS-file to be solved with other solvers.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+from collections import UserList
+from datetime import datetime
+import logging
+
+import numpy as np
+import pandas as pd
+
+from oemof.solph import Bus, Sink, Source, Transformer
+from oemof.solph.components import GenericStorage, ExtractionTurbineCHP
+from oemof.solph.custom import Link
+
+try:
+    from scipy import sparse
+    from scipy.optimize import linprog
+except ImportError:
+    sparse = None
+
+
+def _array(seq, timesteps, default=np.nan):
+    """ Returns the sequence `seq` as float array with one value per
+    timestep. Missing values (None) are replaced by `default`.
+    """
+    if seq is None:
+        return np.full(timesteps, default)
+    if isinstance(seq, UserList):
+        value = seq.default
+        return np.full(timesteps, default if value is None else value,
+                       dtype=float)
+    a = np.array([default if v is None else v for v in seq[:timesteps]],
+                 dtype=float)
+    if len(a) < timesteps:
+        raise ValueError("Sequence is shorter than the time index.")
+    return a
+
+
+def _timeincrement(timeindex):
+    """ Returns the length of every timestep of `timeindex` in hours, given by
+    its frequency or else by the distance to the next timestep (the last
+    timestep has the length of the previous one).
+    """
+    freq = getattr(timeindex, 'freq', None) or (
+        pd.infer_freq(timeindex) if len(timeindex) > 2 else None)
+    if freq is not None:
+        return np.full(len(timeindex),
+                       pd.Timedelta(pd.tseries.frequencies.to_offset(freq))
+                       / pd.Timedelta(hours=1))
+    if len(timeindex) < 2:
+        return np.ones(len(timeindex))
+    hours = np.diff(timeindex.values) / np.timedelta64(1, 'h')
+    return np.append(hours, hours[-1])
+
+
+class MatrixModel(object):
+    """ Linear program of a dispatch model in sparse matrix form:
+
+        min c'x  s.t.  A_eq x = b_eq,  A_ub x <= b_ub,  lb <= x <= ub
+
+    Parameters
+    ----------
+    es : :class:`oemof.solph.network.EnergySystem` object
+    objective_weighting : array-like (optional)
+        Weighting of the timesteps in the objective function, default is the
+        time increment (as in oemof)
+    timeincrement : array-like (optional)
+        Length of every timestep in hours, default is derived from the time
+        index of the energy system
+    """
+    def __init__(self, es, objective_weighting=None, timeincrement=None):
+        if sparse is None:
+            raise ImportError("The matrix backend requires scipy.")
+
+        self.es = es
+        self.timesteps = len(es.timeindex)
+
+        T = self.timesteps
+        self.timeincrement = (
+            _timeincrement(es.timeindex) if timeincrement is None else
+            np.broadcast_to(np.asarray(timeincrement, dtype=float)[:T], T))
+        self.objective_weighting = (
+            self.timeincrement if objective_weighting is None else
+            np.asarray(objective_weighting, dtype=float)[:T])
+
+        self.flows = list(es.flows().items())
+        self.flow_index = {k: f for f, (k, _) in enumerate(self.flows)}
+        self.buses = [n for n in es.nodes
+                      if isinstance(n, Bus) and getattr(n, 'balanced', True)]
+        self.storages = [n for n in es.nodes if isinstance(n, GenericStorage)]
+        self.storage_index = {n: s for s, n in enumerate(self.storages)}
+
+        self._check()
+
+        self.nflows = len(self.flows) * T
+        self.nvariables = self.nflows + len(self.storages) * T
+
+        self._eq, self._ub = [], []
+        self.b_eq, self.b_ub = [], []
+
+        self.c = np.zeros(self.nvariables)
+        self.lb = np.zeros(self.nvariables)
+        self.ub = np.full(self.nvariables, np.inf)
+
+        self._flow_bounds()
+        self._bus_balance()
+        self._transformers()
+        self._links()
+        self._storages()
+
+        self.A_eq = self._matrix(self._eq)
+        self.A_ub = self._matrix(self._ub)
+        self.b_eq = np.concatenate(self.b_eq) if self.b_eq else np.zeros(0)
+        self.b_ub = np.concatenate(self.b_ub) if self.b_ub else np.zeros(0)
+        del self._eq, self._ub
+
+        self.solution = None
+
+    def _check(self):
+        """ Raises an error for components and flows that are not supported
+        by the matrix backend.
+        """
+        supported = (Bus, Source, Sink, Transformer, Link, GenericStorage)
+        for n in self.es.nodes:
+            if isinstance(n, ExtractionTurbineCHP) or \
+                    not isinstance(n, supported):
+                raise NotImplementedError(
+                    "Component {} of type {} is not supported by the matrix "
+                    "backend.".format(n.label, type(n).__name__))
+            if isinstance(n, GenericStorage) and (
+                    getattr(n, 'investment', None) is not None or
+                    n.nominal_capacity is None):
+                raise NotImplementedError(
+                    "Investment storage {} is not supported by the matrix "
+                    "backend.".format(n.label))
+
+        for (o, i), flow in self.flows:
+            if getattr(flow, 'investment', None) is not None or \
+                    getattr(flow, 'nonconvex', None) is not None:
+                raise NotImplementedError(
+                    ("Investment and nonconvex flow ({}, {}) is not " +
+                     "supported by the matrix backend.").format(o, i))
+
+    def _column(self, o, i):
+        """ Returns the column indices of flow (o, i) for all timesteps.
+        """
+        f = self.flow_index[o, i]
+        return np.arange(f * self.timesteps, (f + 1) * self.timesteps)
+
+    def _level(self, n):
+        """ Returns the column indices of the level of storage n.
+        """
+        start = self.nflows + self.storage_index[n] * self.timesteps
+        return np.arange(start, start + self.timesteps)
+
+    def _add(self, block, bounds, *entries):
+        """ Adds a block of `len(bounds)` rows. `entries` are tuples of
+        (row offsets, column indices, coefficients) relative to the block.
+        """
+        rows = sum(len(b) for b in (self.b_eq if block is self._eq
+                                    else self.b_ub))
+        for r, c, v in entries:
+            block.append((rows + np.asarray(r), np.asarray(c),
+                          np.broadcast_to(v, np.shape(c)).astype(float)))
+        (self.b_eq if block is self._eq else self.b_ub).append(
+            np.asarray(bounds, dtype=float))
+
+    def _matrix(self, entries):
+        nrows = sum(len(b) for b in (self.b_eq if entries is self._eq
+                                     else self.b_ub))
+        if not entries:
+            return sparse.csr_matrix((nrows, self.nvariables))
+        rows, cols, values = (np.concatenate(x) for x in zip(*entries))
+        return sparse.coo_matrix((values, (rows, cols)),
+                                 shape=(nrows, self.nvariables)).tocsr()
+
+    def _flow_bounds(self):
+        T = self.timesteps
+        for (o, i), flow in self.flows:
+            s = self._column(o, i)
+            self.c[s] = np.nan_to_num(
+                _array(flow.variable_costs, T, 0)) * self.objective_weighting
+
+            if getattr(flow, 'bidirectional', False):
+                self.lb[s] = -np.inf
+            if flow.nominal_value is None:
+                continue
+
+            self.ub[s] = _array(flow.max, T, 1) * flow.nominal_value
+            self.lb[s] = _array(flow.min, T, 0) * flow.nominal_value
+            if flow.fixed:
+                fixed = _array(flow.actual_value, T) * flow.nominal_value
+                self.lb[s] = np.where(np.isnan(fixed), self.lb[s], fixed)
+                self.ub[s] = np.where(np.isnan(fixed), self.ub[s], fixed)
+
+            # as oemof, summed flows are weighted by the time increment
+            for attr, sign in (('summed_max', 1), ('summed_min', -1)):
+                value = getattr(flow, attr, None)
+                if value is not None:
+                    self._add(self._ub, [sign * value * flow.nominal_value],
+                              (np.zeros(T, dtype=int), s,
+                               sign * self.timeincrement))
+
+    def _bus_balance(self):
+        T = self.timesteps
+        t = np.arange(T)
+        index = {b: k for k, b in enumerate(self.buses)}
+        entries = []
+        for (o, i), _ in self.flows:
+            if i in index:
+                entries.append((index[i] * T + t, self._column(o, i), 1))
+            if o in index:
+                entries.append((index[o] * T + t, self._column(o, i), -1))
+        self.bus_rows = sum(len(b) for b in self.b_eq)
+        # net injections of flows folded by the presolve are constants
+        self._add(self._eq, np.concatenate([
+            -_array(getattr(b, 'presolve_injection', None), T, 0)
+            for b in self.buses]) if self.buses else [], *entries)
+
+    def _transformers(self):
+        T = self.timesteps
+        t = np.arange(T)
+        rows = 0
+        entries = []
+        for n in self.es.nodes:
+            if not isinstance(n, Transformer):
+                continue
+            cf = {k: _array(v, T, 1) for k, v in n.conversion_factors.items()}
+            for o in n.outputs:
+                for i in n.inputs:
+                    entries.append((rows + t, self._column(i, n),
+                                    cf.get(o, 1)))
+                    entries.append((rows + t, self._column(n, o),
+                                    -cf.get(i, 1)))
+                    rows += T
+        self._add(self._eq, np.zeros(rows), *entries)
+
+    def _links(self):
+        T = self.timesteps
+        t = np.arange(T)
+        rows = 0
+        entries = []
+        for n in self.es.nodes:
+            if not isinstance(n, Link):
+                continue
+            for (i, o), cf in n.conversion_factors.items():
+                entries.append((rows + t, self._column(n, o), 1))
+                entries.append((rows + t, self._column(i, n),
+                                -_array(cf, T, 1)))
+                rows += T
+        self._add(self._eq, np.zeros(rows), *entries)
+
+    def _storages(self):
+        T = self.timesteps
+        t = np.arange(T)
+        ti = self.timeincrement
+        entries = []
+        self.storage_rows = sum(len(b) for b in self.b_eq)
+        for k, n in enumerate(self.storages):
+            level = self._level(n)
+            i, o = list(n.inputs)[0], list(n.outputs)[0]
+
+            self.lb[level] = _array(n.capacity_min, T, 0) * n.nominal_capacity
+            self.ub[level] = _array(n.capacity_max, T, 1) * n.nominal_capacity
+            if getattr(n, 'initial_capacity', None) is not None:
+                self.lb[level[-1]] = self.ub[level[-1]] = \
+                    n.initial_capacity * n.nominal_capacity
+
+            rows = k * T + t
+            entries.extend([
+                (rows, level, 1),
+                # previous level, cyclic for the first timestep
+                (rows, np.roll(level, 1),
+                 -(1 - _array(n.capacity_loss, T, 0))),
+                (rows, self._column(i, n),
+                 -_array(n.inflow_conversion_factor, T, 1) * ti),
+                (rows, self._column(n, o),
+                 1 / _array(n.outflow_conversion_factor, T, 1) * ti)])
+        self._add(self._eq, np.zeros(len(self.storages) * T), *entries)
+
+    def solve(self, **options):
+        """ Solves the linear program with the HiGHS solver of scipy.
+
+        Parameters
+        ----------
+        **options : key word arguments
+            Passed as `options` to :func:`scipy.optimize.linprog`
+        """
+        start = datetime.now()
+
+        self.solution = linprog(
+            self.c,
+            A_ub=self.A_ub if self.A_ub.shape[0] else None,
+            b_ub=self.b_ub if self.A_ub.shape[0] else None,
+            A_eq=self.A_eq, b_eq=self.b_eq,
+            bounds=np.column_stack([self.lb, self.ub]),
+            method='highs', options=options)
+
+        self.solver_time = (datetime.now() - start).total_seconds()
+
+        if self.solution.status != 0:
+            raise ValueError("Optimization failed: {}".format(
+                self.solution.message))
+
+        logging.info("Optimization successful...")
+
+        return self.solution
+
+    def write_mps(self, path):
+        """ Writes the linear program to a free MPS-file.
+        """
+        A = sparse.vstack([self.A_eq, self.A_ub]).tocsc()
+        nrows_eq = self.A_eq.shape[0]
+
+        lines = ['NAME renpass', 'ROWS', ' N obj']
+        lines += [' E r{}'.format(r) for r in range(nrows_eq)]
+        lines += [' L r{}'.format(r) for r in range(nrows_eq, A.shape[0])]
+
+        lines.append('COLUMNS')
+        for j in range(self.nvariables):
+            if self.c[j]:
+                lines.append(' x{} obj {!r}'.format(j, self.c[j]))
+            for k in range(A.indptr[j], A.indptr[j + 1]):
+                lines.append(' x{} r{} {!r}'.format(
+                    j, A.indices[k], A.data[k]))
+
+        lines.append('RHS')
+        b = np.concatenate([self.b_eq, self.b_ub])
+        lines += [' rhs r{} {!r}'.format(r, v)
+                  for r, v in enumerate(b) if v]
+
+        lines.append('BOUNDS')
+        for j, (lb, ub) in enumerate(zip(self.lb, self.ub)):
+            if lb == ub:
+                lines.append(' FX bnd x{} {!r}'.format(j, lb))
+                continue
+            if lb == -np.inf:
+                lines.append(' MI bnd x{}'.format(j))
+            elif lb:
+                lines.append(' LO bnd x{} {!r}'.format(j, lb))
+            if ub != np.inf:
+                lines.append(' UP bnd x{} {!r}'.format(j, ub))
+        lines.append('ENDATA')
+
+        with open(path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def results(self, dataframe=False, duals=()):
+        """ Returns the results of the solved model in the structure of
+        :func:`oemof.outputlib.processing.results` together with meta results.
+
+        Parameters
+        ----------
+        dataframe : boolean
+            If True, a dataframe of all results as returned by
+            :func:`oemof.outputlib.processing.create_dataframe` is added
+            (`dataframe`), e.g. for the default output orientation
+        duals : list
+            Constraint families (see :mod:`renpass.duals`) whose duals are
+            added (`duals`), `bus` and `storage` are supported
+        """
+        if self.solution is None:
+            raise ValueError("Model has not been solved yet.")
+
+        T = self.timesteps
+        x = self.solution.x
+        index = self.es.timeindex
+
+        keys = [k for k, _ in self.flows] + [(n, None) for n in self.storages]
+        # flows and storage levels are consecutive blocks of T variables
+        values = x.reshape(len(keys), T)
+
+        results = {}
+        for k, key in enumerate(keys):
+            results[key] = {
+                'sequences': pd.DataFrame(
+                    {'flow' if k < len(self.flows) else 'capacity':
+                     values[k]}, index=index),
+                'scalars': pd.Series()}
+
+        es_results = {'main': results}
+
+        if dataframe:
+            names = pd.Index(['flow', 'capacity'])
+            es_results['dataframe'] = pd.DataFrame(
+                {'value': values.ravel()},
+                index=pd.MultiIndex(
+                    levels=[pd.Index(keys, dtype=object, tupleize_cols=False),
+                            names, np.arange(T)],
+                    codes=[np.repeat(np.arange(len(keys)), T),
+                           np.repeat((np.arange(len(keys)) >=
+                                      len(self.flows)).astype(int), T),
+                           np.tile(np.arange(T), len(keys))],
+                    names=['oemof_tuple', 'variable_name', 'timestep']))
+
+        marginals = self.solution.eqlin.marginals
+        es_results['duals'] = {}
+        for family, nodes, start in (
+                ('bus', self.buses, getattr(self, 'bus_rows', 0)),
+                ('storage', self.storages, getattr(self, 'storage_rows', 0))):
+            if family in duals and nodes:
+                es_results['duals'][family] = pd.DataFrame(
+                    marginals[start:start + len(nodes) * T].reshape(
+                        len(nodes), T).T,
+                    index=index, columns=[str(n) for n in nodes])
+
+        es_results['meta'] = {
+            'objective': self.solution.fun,
+            'solver': {'Time': self.solver_time},
+            'problem': {
+                'Number of constraints': self.A_eq.shape[0] +
+                                         self.A_ub.shape[0],
+                'Number of variables': self.nvariables}}
+
+        return es_results
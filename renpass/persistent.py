@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+""" This module contains functions to update parameters of an already built
+(and solved) model in place, such that the model can be solved again without
+constructing it from scratch, e.g. for sensitivity analysis.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+import logging
+
+from oemof.solph.plumbing import sequence
+
+# flow attributes that can be updated in place
+ATTRIBUTES = ('variable_costs', 'actual_value', 'nominal_value')
+
+
+def flows_by_label(m):
+    """ Returns a dictionary mapping (str(source), str(target)) tuples to the
+    (source, target) tuples of all flows of the model `m`.
+    """
+    return {(str(o), str(i)): (o, i) for (o, i) in m.flows}
+
+
+def _set_bounds(m, o, i):
+    """ Sets the bounds (and fixed values) of the flow variables of flow
+    `(o, i)` from the flow attributes in the same way as
+    :class:`oemof.solph.models.Model` does while building the model.
+    """
+    flow = m.flows[o, i]
+
+    for t in m.TIMESTEPS:
+        var = m.flow[o, i, t]
+        var.unfix()
+        if (o, i) in m.UNIDIRECTIONAL_FLOWS:
+            var.setlb(0)
+        if flow.nominal_value is not None:
+            var.setub(flow.max[t] * flow.nominal_value)
+            if flow.actual_value[t] is not None:
+                var.value = flow.actual_value[t] * flow.nominal_value
+                if flow.fixed:
+                    var.fix()
+            if not flow.nonconvex:
+                var.setlb(flow.min[t] * flow.nominal_value)
+
+
+def extend_objective(m, expr):
+    """ Adds the expression `expr` to the objective of the model `m`.
+
+    Terms added by this function are kept when the objective is rebuilt by
+    :func:`update`, terms added to `m.objective` directly would be lost.
+    """
+    if not hasattr(m, 'objective_extensions'):
+        m.objective_extensions = []
+    m.objective_extensions.append(expr)
+    m.objective.set_value(m.objective.expr + expr)
+
+
+def update(m, updates):
+    """ Updates flow parameters of the model `m` in place.
+
+    Only bounds of the flow variables and the objective are updated.
+    Parameters which are part of other constraints (e.g. `summed_max`) or
+    investment flows are not affected. The objective is rebuilt from the
+    blocks of the model, terms added with :func:`extend_objective` (e.g.
+    start-up costs of the unit commitment) are added again.
+
+    Parameters
+    ----------
+    m : :class:`oemof.solph.models.Model` object
+    updates : dict
+        Dictionary with (source, target) tuples of nodes or node labels as
+        keys and dictionaries with new values for `variable_costs`,
+        `actual_value` and / or `nominal_value` as values, e.g.
+        `{('wind', 'bus0'): {'actual_value': [0.1, 0.5]}}`
+
+    Examples
+    --------
+    >>> m = compute(es, **arguments)  # doctest: +SKIP
+    >>> update(m, {('gas-gt', 'bus1'): {'variable_costs': 60}})  # doctest: +SKIP
+    >>> m.solve(solver='cbc')  # doctest: +SKIP
+    """
+    labels = flows_by_label(m)
+    objective = False
+
+    for key, values in updates.items():
+        if key not in m.flows:
+            if tuple(map(str, key)) not in labels:
+                raise KeyError(
+                    "Flow {} does not exist in the model.".format(key))
+            key = labels[tuple(map(str, key))]
+
+        o, i = key
+        flow = m.flows[o, i]
+
+        for attr, value in values.items():
+            if attr not in ATTRIBUTES:
+                raise ValueError(
+                    ("Attribute `{}` can not be updated, use one of " +
+                     "{}.").format(attr, ', '.join(ATTRIBUTES)))
+            if attr == 'nominal_value':
+                if flow.investment is not None:
+                    raise ValueError(
+                        ("Can not set `nominal_value` of investment " +
+                         "flow {}.").format(key))
+                flow.nominal_value = value
+            else:
+                setattr(flow, attr, sequence(value))
+
+        if 'variable_costs' in values:
+            objective = True
+
+        if {'actual_value', 'nominal_value'} & set(values):
+            _set_bounds(m, o, i)
+
+    if objective:
+        m._add_objective(update=True)
+        for expr in getattr(m, 'objective_extensions', []):
+            m.objective.set_value(m.objective.expr + expr)
+
+    logging.info("Updated {} flows of the model.".format(len(updates)))
+
+    return m
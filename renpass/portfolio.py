@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+""" This module contains a solver portfolio: the model is written to a
+problem file once, several solvers (or several settings of one solver) solve
+it in parallel processes and the result of the first solver finishing with
+an optimal solution is loaded into the model. The other solvers are killed.
+
+Solvers are given as comma-separated list of specifications of the form
+`name[:option=value[:option=value...]]`, e.g. `cbc,glpk,cbc:threads=4`.
+Solvers stop at their configured gap (e.g. `cbc:ratioGap=0.01` or
+`glpk:mipgap=0.01`) and report an optimal solution.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+import logging
+import multiprocessing
+import os
+import queue
+import shutil
+import signal
+import tempfile
+import time
+
+import pandas as pd
+from pyomo.opt import SolverFactory, TerminationCondition
+
+
+def solvers(value):
+    """ Returns the list of (specification, name, options) tuples of the
+    comma-separated solver specifications `value`.
+    """
+    specs = []
+    for spec in [s.strip() for s in value.split(',') if s.strip()]:
+        name, *options = spec.split(':')
+        try:
+            options = dict(o.split('=', 1) for o in options)
+        except ValueError:
+            raise ValueError(
+                ("Invalid solver specification `{}`, use " +
+                 "name:option=value:...").format(spec))
+        specs.append((spec, name, options))
+
+    if not specs:
+        raise ValueError("No solvers given for the portfolio.")
+
+    return specs
+
+
+def _solve(spec, name, options, filename, suffixes, results):
+    """ Solves the problem file `filename` and puts the specification, the
+    solver results (or error) and the wall time on the `results` queue.
+    """
+    # own process group, such that the solver process can be killed together
+    # with this process
+    if hasattr(os, 'setsid'):
+        os.setsid()
+
+    start = time.time()
+    try:
+        opt = SolverFactory(name)
+        opt.options.update(options)
+        r = opt.solve(filename, suffixes=suffixes)
+        results.put((spec, r, None, time.time() - start))
+    except Exception as e:
+        results.put((spec, None, repr(e), time.time() - start))
+
+
+def _kill(process):
+    if not process.is_alive():
+        return
+    try:
+        # the process group is only killed once the process leads it
+        if hasattr(os, 'killpg') and os.getpgid(process.pid) == process.pid:
+            os.killpg(process.pid, signal.SIGTERM)
+        else:
+            process.terminate()
+    except ProcessLookupError:
+        pass
+    process.join()
+
+
+def race(m, specs, suffixes=(), load_solutions=True):
+    """ Solves the model `m` with the portfolio of solvers `specs` (see
+    :func:`solvers`) and loads the solution of the first solver finishing
+    with an optimal solution into the model. If no solver finds an optimal
+    solution, the result of the first solver finishing is loaded.
+
+    As for :meth:`pyomo.opt.base.solvers.OptSolver.solve`, the solvers
+    return the `suffixes` (e.g. `dual`) and the solution is not loaded if
+    `load_solutions` is False, the results are stored in `m.solver_results`
+    in any case.
+
+    Returns
+    -------
+    :class:`pandas.DataFrame` with the `status`, `termination` condition and
+    wall `time` of every solver and whether it is the `winner`. Solvers that
+    were killed have the status `killed`.
+    """
+    directory = tempfile.mkdtemp(prefix='renpass-portfolio-')
+    filename = os.path.join(directory, 'model.lp')
+
+    try:
+        _, smap_id = m.write(filename, io_options={
+            'symbolic_solver_labels': False})
+
+        results = multiprocessing.Queue()
+        processes = {
+            spec: multiprocessing.Process(
+                target=_solve,
+                args=(spec, name, options, filename, list(suffixes),
+                      results),
+                daemon=True)
+            for spec, name, options in specs}
+        for p in processes.values():
+            p.start()
+
+        record = {spec: {'status': 'killed', 'termination': None,
+                         'time': None, 'winner': False}
+                  for spec in processes}
+
+        winner, first = None, None
+        pending = set(processes)
+        while pending and winner is None:
+            try:
+                spec, r, error, elapsed = results.get(timeout=1)
+            except queue.Empty:
+                # processes crashing without result
+                for spec in [s for s in pending
+                             if not processes[s].is_alive()]:
+                    pending.discard(spec)
+                    record[spec]['status'] = 'crashed'
+                continue
+
+            pending.discard(spec)
+            record[spec]['time'] = elapsed
+
+            if r is None:
+                logging.warning('Solver {} failed: {}'.format(spec, error))
+                record[spec]['status'] = 'error'
+                continue
+
+            condition = r.solver.termination_condition
+            record[spec].update({'status': str(r.solver.status),
+                                 'termination': str(condition)})
+            logging.info('Solver {} finished after {:.1f}s ({}).'.format(
+                spec, elapsed, condition))
+
+            first = first or (spec, r)
+            if condition == TerminationCondition.optimal:
+                winner = (spec, r)
+
+        for p in processes.values():
+            _kill(p)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    winner = winner or first
+    if winner is None:
+        raise ValueError("No solver of the portfolio returned a result.")
+
+    spec, r = winner
+    record[spec]['winner'] = True
+    logging.info('Solver {} won the portfolio.'.format(spec))
+
+    r._smap_id = smap_id
+    if r.solver.termination_condition != TerminationCondition.optimal:
+        logging.warning('No solver of the portfolio found an optimal '
+                        'solution.')
+    elif load_solutions:
+        m.solutions.load_from(r)
+    m.es.results = r
+    m.solver_results = r
+
+    return pd.DataFrame.from_dict(record, orient='index').rename_axis(
+        'solver')
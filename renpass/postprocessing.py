@@ -9,82 +9,115 @@ import os
 
 import pandas as pd
 
+from . import topology
+
+
+def _read(results):
+    """ Returns the component results `results` given as path of a CSV-file
+    or as dataframe with (from, to, type) columns together with the string
+    labels of the three column levels.
+    """
+    if isinstance(results, str):
+        results = pd.read_csv(
+            results, sep=";", header=[0, 1, 2], index_col=0,
+            parse_dates=True)
+
+    levels = [results.columns.get_level_values(i).map(str) for i in range(3)]
+
+    return results, levels
+
+
+def _sum_by(df, mask, keys, labels):
+    """ Returns the sums of the columns of `df` selected by `mask` grouped by
+    `keys` with one column for each of `labels`.
+    """
+    return df.loc[:, mask].T.groupby(keys[mask]).sum().T\
+        .reindex(index=df.index, columns=labels, fill_value=0)
+
+
+def _write(df, results, filename):
+    if isinstance(results, str):
+        df.to_csv(
+            os.path.join(os.path.dirname(results), filename + '.csv'),
+            sep=";", date_format='%Y-%m-%dT%H:%M:%SZ')
+
 
 def storage_net_results(path, label=[]):
-    """ Writes net results for storage components.
+    """ Returns net results for storage components. If the results are read
+    from a CSV-file, they are also written to `storage-processed.csv` next to
+    it.
 
-    path: str
-        Path to storage component results.
+    path: str or pandas.DataFrame
+        Path to storage component results or storage component results with
+        (from, to, type) columns.
     label: list
         List of storage component labels.
     """
+    storage_results, (fr, to, ty) = _read(path)
 
-    storage_results = pd.read_csv(
-        path, sep=";", header=[0, 1, 2], index_col=0, parse_dates=True)
-
-    dataframes = []
+    label = [str(l) for l in label]
+    flow = ty == 'flow'
 
-    for l in label:
+    output = _sum_by(storage_results, flow & fr.isin(label), fr, label)
+    inflow = _sum_by(storage_results, flow & to.isin(label), to, label)
+    level = _sum_by(storage_results, ~flow & fr.isin(label), fr, label)
 
-        grouper = lambda x: (lambda fr, to, ty:
-                            'output' if (fr == l and ty == 'flow') else
-                            'input' if (to == l and ty == 'flow') else
-                            'level' if (fr == l and ty != 'flow') else
-                            None) (*x)
+    net_input = inflow - output
 
-        subset = storage_results.groupby(grouper, axis=1).sum()
-        subset['net_input'] = subset['input'] - subset['output']
-        subset['input'] = subset['net_input'].apply(lambda row: row if row > 0 else 0)
-        subset['output'] = subset['net_input'].apply(lambda row: abs(row) if row < 0 else 0)
-        subset.columns = pd.MultiIndex.from_product([[l], subset.columns])
+    df = pd.concat({'input': net_input.clip(lower=0),
+                    'level': level,
+                    'output': (-net_input).clip(lower=0),
+                    'net_input': net_input}, axis=1)\
+        .swaplevel(axis=1)\
+        .reindex(columns=pd.MultiIndex.from_product(
+            [label, ['input', 'level', 'output', 'net_input']]))
 
-        dataframes.append(subset)
+    _write(df, path, 'storage-processed')
 
-    pd.concat(dataframes, axis=1).to_csv(
-        os.path.join(os.path.dirname(path), 'storage-processed' + '.csv'),
-        sep=";", date_format='%Y-%m-%dT%H:%M:%SZ')
+    return df
 
 
 def connection_net_results(path, hubs=[]):
-    """ Writes net results for connection components.
-
-    path: str
-        Path to connection component results.
-    label: list
+    """ Returns net imports of hubs over connection components. If the results
+    are read from a CSV-file, they are also written to
+    `connection-processed.csv` next to it.
+
+    path: str or pandas.DataFrame
+        Path to connection component results or connection component results
+        with (from, to, type) columns.
+    hubs: list
         List of hub labels.
     """
+    connection_results, (fr, to, ty) = _read(path)
 
-    connection_results = pd.read_csv(
-        path, sep=";", header=[0, 1, 2], index_col=0, parse_dates=True)
+    hubs = [str(h) for h in hubs]
+    flow = ty == 'flow'
 
-    df = pd.DataFrame()
+    ex = _sum_by(connection_results, flow & fr.isin(hubs), fr, hubs)
+    im = _sum_by(connection_results, flow & to.isin(hubs), to, hubs)
 
-    for hub in hubs:
-        ex = connection_results.loc[:, (hub, slice(None), 'flow')].sum(axis=1)
-        im = connection_results.loc[:, (slice(None), hub, 'flow')].sum(axis=1)
+    df = im - ex
+    df.columns = [hub + '-' + 'net-import' for hub in hubs]
 
-        df[hub + '-' + 'net-import'] = im - ex
+    _write(df, path, 'connection-processed')
 
-    df.to_csv(
-        os.path.join(os.path.dirname(path), 'connection-processed' + '.csv'),
-        sep=";", date_format='%Y-%m-%dT%H:%M:%SZ')
+    return df
 
 
 def links(es):
+    """ Returns the (from, to) tuples of all buses linked by a connection.
     """
+    return list(topology.index(es).links)
+
+def _edges(nodes, es=None):
+    """ Returns the (from, to) tuples of the outputs and inputs of the `nodes`
+    by node label. If the energy system `es` of the nodes is given, the
+    tuples are taken from its topology index (see :mod:`renpass.topology`).
     """
-    buses = [n for n in es.nodes if isinstance(n, facades.Connection)]
-    links = list()
-    for b in buses:
-        for i in b.inputs:
-            for o in b.outputs:
-                if o != i:
-                    links.append((i, o))
-    return links
-
-def _edges(nodes):
-    """
-    """
+    if es is not None:
+        edges = topology.index(es).edges
+        return {str(n): edges[n] for n in nodes}
+
     edges = {}
     for n in nodes:
         edges[str(n)] = []
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+
+""" This module contains a presolve stage reducing the size of the model of
+an energy system before it is built:
+
+* Fixed flows of sources and sinks without investment (e.g. of `Volatile`
+  and `Load` facades) are known before solving. They are removed and their
+  sum is stored as net injection (attribute :attr:`INJECTION`) of the bus,
+  which is added as constant to the bus balance by :func:`add_injections`
+  after the model is built. Fixed flows of buses without other flows are
+  kept.
+* Facades whose flows all have a capacity of zero and facades without any
+  flows are removed.
+
+The removed flows (and storage levels) are added to the results again after
+solving, such that results are the same as without presolve.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+from collections import UserList, defaultdict
+import logging
+
+import numpy as np
+import pandas as pd
+
+from oemof.solph import Bus, EnergySystem, Flow, Sink, Source
+from oemof.solph.components import GenericStorage
+
+from . import aggregation, cache, topology
+from .facades import Facade
+
+# attribute of buses holding the net injection of the folded flows
+INJECTION = 'presolve_injection'
+
+
+def _values(seq, timesteps):
+    """ Returns the first `timesteps` values of the sequence as float array.
+    """
+    if isinstance(seq, UserList):
+        return np.full(timesteps, np.nan if seq.default is None
+                       else seq.default, dtype=float)
+    return np.array([np.nan if v is None else v for v in seq[:timesteps]],
+                    dtype=float)
+
+
+def _edges(n):
+    return [(i, n) for i in n.inputs] + [(n, o) for o in n.outputs]
+
+
+def _foldable(n):
+    """ Returns the flow (from, to) of the source or sink `n` if it is a fixed
+    flow without investment from or to a bus, else None.
+    """
+    if isinstance(n, Source) and not n.inputs and len(n.outputs) == 1:
+        edge = (n, list(n.outputs)[0])
+    elif isinstance(n, Sink) and not n.outputs and len(n.inputs) == 1:
+        edge = (list(n.inputs)[0], n)
+    else:
+        return None
+
+    flow = edge[0].outputs[edge[1]]
+    bus = edge[1] if edge[0] is n else edge[0]
+
+    if not isinstance(bus, Bus) or not flow.fixed or \
+            flow.nominal_value is None or \
+            getattr(flow, 'investment', None) is not None or \
+            getattr(flow, 'nonconvex', None) is not None:
+        return None
+
+    return edge
+
+
+def _removable(n):
+    """ Returns True if `n` is a facade without flows or whose flows all have
+    a capacity of zero.
+    """
+    if not isinstance(n, Facade) or isinstance(n, Flow):
+        return False
+    flows = [i.outputs[o] for i, o in _edges(n)]
+    return getattr(n, 'investment', None) is None and \
+        all(f.nominal_value == 0 and
+            getattr(f, 'investment', None) is None for f in flows)
+
+
+def presolve(es):
+    """ Returns a reduced copy of the energy system (see module docstring),
+    the energy system itself is not changed. Information to restore the
+    results of the removed flows is stored in `_presolve` of the returned
+    energy system.
+
+    Parameters
+    ----------
+    es : :class:`oemof.solph.network.EnergySystem` object
+    """
+    # edges of removed nodes are deleted from the remaining nodes of the copy
+    es = cache.copy(es)
+
+    timesteps = len(es.timeindex)
+    weighting = np.ones(timesteps) if es.temporal is None else \
+        es.temporal['weighting'].values[:timesteps]
+
+    removed = [n for n in es.nodes if _removable(n)]
+    removed_ = set(removed)
+
+    folded = {edge: np.zeros(timesteps)
+              for n in removed for edge in _edges(n)}
+
+    foldable = {}
+    for n in es.nodes:
+        edge = None if n in removed_ else _foldable(n)
+        if edge is not None:
+            foldable[n] = edge
+
+    # fixed flows are only folded into the balance of a bus with other flows
+    def _kept(bus):
+        return any(other not in removed_ and other not in foldable
+                   for edge in _edges(bus) for other in edge
+                   if other is not bus)
+
+    offset = 0
+    injections = defaultdict(lambda: np.zeros(timesteps))
+
+    for n, edge in foldable.items():
+        bus = edge[1] if edge[0] is n else edge[0]
+        if not _kept(bus):
+            continue
+
+        flow = edge[0].outputs[edge[1]]
+        values = np.nan_to_num(_values(flow.actual_value, timesteps)) * \
+            flow.nominal_value
+
+        offset += (np.nan_to_num(_values(flow.variable_costs, timesteps)) *
+                   values * weighting).sum()
+
+        if edge[0] is n:
+            injections[bus] += values
+        else:
+            injections[bus] -= values
+
+        removed.append(n)
+        folded[edge] = values
+
+    # remove all edges of removed nodes, such that the remaining nodes do not
+    # refer to them anymore
+    for n in removed:
+        for i, o in _edges(n):
+            del i.outputs[o]
+
+    for bus, values in injections.items():
+        setattr(bus, INJECTION, list(values))
+
+    removed_ = set(removed)
+    reduced = EnergySystem(timeindex=es.timeindex)
+    reduced.temporal = es.temporal
+    reduced.add(*[n for n in es.nodes if n not in removed_])
+
+    for attr in ('_typemap', '_typical_periods'):
+        if hasattr(es, attr):
+            setattr(reduced, attr, getattr(es, attr))
+
+    reduced._presolve = {
+        'folded': folded,
+        'removed': removed,
+        'offset': offset}
+
+    topology.index(reduced)
+
+    logging.info(
+        ("Presolve removed {} of {} nodes ({} flows) and folded fixed flows "
+         "into the balances of {} buses.").format(
+             len(removed), len(es.nodes), len(folded), len(injections)))
+
+    return reduced
+
+
+def add_injections(m):
+    """ Adds the net injections of the flows folded by :func:`presolve` to the
+    balances of the buses of the built model `m` as constants.
+    """
+    buses = [n for n in m.es.nodes
+             if getattr(n, INJECTION, None) is not None]
+    if not buses:
+        return m
+
+    for b in buses:
+        injection = getattr(b, INJECTION)
+        inputs, outputs = list(b.inputs), list(b.outputs)
+        for t in m.TIMESTEPS:
+            m.Bus.balance[b, t].set_value(
+                sum(m.flow[i, b, t] for i in inputs) + injection[t] ==
+                sum(m.flow[b, o, t] for o in outputs))
+
+    return m
+
+
+def restore(es, results, meta=None, dataframe=None):
+    """ Adds the flows removed by :func:`presolve` and the (zero) levels of
+    removed storages to the `results` in place.
+
+    Parameters
+    ----------
+    es : :class:`oemof.solph.network.EnergySystem` object
+        Energy system returned by :func:`presolve`
+    results : dict
+        Results as returned by :func:`oemof.outputlib.processing.results`
+    meta : dict (optional)
+        Meta results whose objective is corrected by the costs of the folded
+        flows
+    dataframe : pandas.DataFrame (optional)
+        Results as returned by
+        :func:`oemof.outputlib.processing.create_dataframe`
+
+    Returns
+    -------
+    The restored dataframe (if given).
+    """
+    info = getattr(es, '_presolve', None)
+    if info is None:
+        return dataframe
+
+    folded = info['folded']
+    storages = [n for n in info['removed'] if isinstance(n, GenericStorage)]
+    timeindex = es.timeindex
+
+    # results of typical periods are mapped to the original time index
+    if getattr(es, '_typical_periods', None) is not None:
+        index = aggregation.positions(es)
+        folded = {edge: np.asarray(values)[index]
+                  for edge, values in folded.items()}
+        timeindex = es._typical_periods['timeindex']
+
+    for edge, values in folded.items():
+        results[edge] = {
+            'sequences': pd.DataFrame({'flow': values}, index=timeindex),
+            'scalars': pd.Series()}
+
+    for n in storages:
+        results[n, None] = {
+            'sequences': pd.DataFrame({'capacity': np.zeros(len(timeindex))},
+                                      index=timeindex),
+            'scalars': pd.Series()}
+
+    if meta is not None:
+        meta['objective'] += info['offset']
+
+    if dataframe is not None:
+        dataframe = pd.concat([dataframe, pd.DataFrame(
+            [(edge, 'flow', t, v)
+             for edge, values in folded.items()
+             for t, v in enumerate(values)] +
+            [((n,), 'capacity', t, 0.0)
+             for n in storages for t in range(len(timeindex))],
+            columns=['oemof_tuple', 'variable_name', 'timestep', 'value'])
+            .set_index(['oemof_tuple', 'variable_name', 'timestep'])])
+
+    return dataframe
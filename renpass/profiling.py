@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+""" This module contains a simple profiler recording wall time, CPU time and
+peak memory usage of the phases of a renpass run.
+
+The peak resident set size of a phase (`peak_rss`) is measured by resetting
+the peak of the process at the start of the phase, which is only supported on
+linux (otherwise it is not recorded). It includes the memory of phases of
+other profilers running at the same time (e.g. results exported in the
+background). `max_rss` and `max_rss_children` are the peaks of the process
+and of its largest terminated child process (e.g. the solver) since the start
+of the process, i.e. they are cumulative over the phases. As resetting the
+peak affects other profilers, it is only done by profilers measuring the
+peak memory of phases (`memory=True`).
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import logging
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    # not available on windows, memory usage is not recorded there
+    resource = None
+
+
+# running peaks of the resident set size of the process (since its start)
+# and of all open phases, phases of several profilers may overlap and the
+# peak of the process is reset at the start of every phase (which also resets
+# `ru_maxrss` of the process on linux)
+_open = {'process': [0]}
+_lock = threading.Lock()
+
+
+def _rusage():
+    """ Returns a tuple of the CPU time (user + system) of the process and its
+    terminated child processes (e.g. the solver) in seconds and the peak
+    resident set size of the process and of its largest child since their
+    start in MB.
+    """
+    if resource is None:
+        return time.process_time(), 0, None, None
+
+    # ru_maxrss is given in kilobytes on linux and in bytes on mac os
+    unit = 1024 ** 2 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return (own.ru_utime + own.ru_stime,
+            children.ru_utime + children.ru_stime,
+            own.ru_maxrss / unit,
+            children.ru_maxrss / unit)
+
+
+def _peak_rss():
+    """ Returns the peak resident set size of the process since the last
+    reset (see :func:`_reset_peak_rss`) in MB or None if it is not available.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    """ Resets the peak resident set size of the process to the current one
+    (linux only). Returns True if the peak was reset.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _update_peaks():
+    """ Updates the running peaks of all open phases with the peak of the
+    process, called before the peak is reset and at the end of a phase.
+    """
+    rss = _peak_rss()
+    if rss is not None:
+        for peak in _open.values():
+            peak[0] = max(peak[0], rss)
+
+
+class Profiler(object):
+    """ Records wall time, CPU time and peak memory usage of named phases
+    (see module docstring for the memory measures).
+
+    Parameters
+    ----------
+    memory : boolean
+        If True, the peak resident set size of every phase is measured, which
+        resets the peak of the process
+
+    Examples
+    --------
+    >>> profiler = Profiler()
+    >>> with profiler.phase('model'):
+    ...     pass
+    >>> [p['phase'] for p in profiler.phases]
+    ['model']
+    """
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.phases = []
+        self.info = {}
+        self.started = datetime.now()
+
+    @contextmanager
+    def phase(self, name):
+        """ Context manager recording the phase `name`.
+        """
+        peak, reset = [0], False
+        if self.memory:
+            with _lock:
+                _update_peaks()
+                reset = _reset_peak_rss()
+                _open[id(peak)] = peak
+
+        wall = time.perf_counter()
+        cpu, cpu_children, _, _ = _rusage()
+
+        try:
+            yield
+        finally:
+            if self.memory:
+                with _lock:
+                    _update_peaks()
+                    del _open[id(peak)]
+
+        wall = time.perf_counter() - wall
+        _cpu, _cpu_children, rss, rss_children = _rusage()
+
+        self.phases.append({
+            'phase': name,
+            'wall_time': wall,
+            'cpu_time': _cpu - cpu,
+            'cpu_time_children': _cpu_children - cpu_children,
+            'peak_rss': peak[0] if reset and peak[0] else None,
+            'max_rss': rss and max(rss, _open['process'][0]),
+            'max_rss_children': rss_children})
+
+        logging.info('{} time: {:.2f}s'.format(name.capitalize(), wall))
+
+    def to_json(self, path):
+        """ Writes all recorded phases and additional information in `info`
+        to the JSON file `path`.
+        """
+        logging.info('Exporting profile to {}'.format(path))
+
+        with open(path, 'w') as f:
+            json.dump({'started': self.started.isoformat(),
+                       'info': self.info,
+                       'phases': self.phases}, f, indent=4, default=str)
@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+
+""" This module contains functions to reduce the electrical network of LOPF
+models (:class:`~renpass.components.electrical.ElectricalBus` and
+:class:`~renpass.components.electrical.Line` objects) for faster screening
+runs:
+
+* Kron reduction eliminates transit buses, i.e. buses that are only
+  connected to lines. Every connected group of transit buses is replaced by
+  equivalent lines between the buses bordering it. The susceptances of the
+  equivalent lines reproduce the power flows of the original network
+  exactly. As thermal limits can not be reduced exactly, the capacity of an
+  equivalent line is the smaller of the total capacities of the lines
+  connecting its two buses to the group.
+* Clustering merges the remaining buses into a target number of zones based
+  on their electrical distance (rows of the pseudo-inverse of the nodal
+  susceptance matrix). Components are connected to the bus representing
+  their zone and lines within a zone are removed.
+
+Lines whose buses are not changed are kept. Parallel lines (e.g. an
+equivalent line parallel to an existing one or lines between two zones) are
+merged into one new line with the summed susceptance and capacity, as oemof
+supports one flow per pair of nodes only. The mapping of the original lines
+to the lines of the reduced network is returned with the mapping of buses.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+from collections import UserList, defaultdict
+import logging
+
+import numpy as np
+
+from oemof.solph import EnergySystem
+
+from . import aggregation, cache, topology
+from .components.electrical import ElectricalBus, Line
+
+
+def _susceptance(line):
+    if line.investment is not None or line.capacity is None:
+        raise ValueError(
+            "Network reduction does not support investment in line {}."
+            .format(line.label))
+    if not isinstance(line.reactance, UserList):
+        raise ValueError(
+            ("Network reduction does not support time dependent reactances " +
+             "of line {}.").format(line.label))
+    return 1 / line.reactance.default
+
+
+def _is_transit(bus):
+    """ Returns True if `bus` is an electrical bus that is only connected to
+    lines and not the slack bus.
+    """
+    return isinstance(bus, ElectricalBus) and not bus.slack and \
+        all(isinstance(i.outputs[bus], Line) for i in bus.inputs) and \
+        all(isinstance(bus.outputs[o], Line) for o in bus.outputs)
+
+
+def _components(buses, lines):
+    """ Returns the connected groups of `buses` with respect to `lines`.
+    """
+    parent = {b: b for b in buses}
+
+    def _find(b):
+        while parent[b] is not b:
+            parent[b] = parent[parent[b]]
+            b = parent[b]
+        return b
+
+    for l in lines:
+        if l.input in parent and l.output in parent:
+            parent[_find(l.input)] = _find(l.output)
+
+    groups = defaultdict(list)
+    for b in buses:
+        groups[_find(b)].append(b)
+    return list(groups.values())
+
+
+def _laplacian(buses, lines):
+    """ Returns the nodal susceptance matrix of the `lines` between `buses`.
+    """
+    index = {b: k for k, b in enumerate(buses)}
+    B = np.zeros((len(buses), len(buses)))
+    for l in lines:
+        i, j, b = index[l.input], index[l.output], _susceptance(l)
+        B[i, i] += b
+        B[j, j] += b
+        B[i, j] -= b
+        B[j, i] -= b
+    return B
+
+
+def kron(lines, transit):
+    """ Eliminates the `transit` buses from the network given by `lines`.
+
+    Returns
+    -------
+    List of (from, to, susceptance, capacity, lines) tuples of the lines of
+    the reduced network, where `lines` are the original lines the line is
+    derived from.
+    """
+    transit = set(transit)
+    reduced = [(l.input, l.output, _susceptance(l), l.capacity, [l])
+               for l in lines
+               if l.input not in transit and l.output not in transit]
+
+    for group in _components(list(transit), lines):
+        members = set(group)
+        incident = [l for l in lines
+                    if l.input in members or l.output in members]
+        border = sorted({b for l in incident for b in (l.input, l.output)
+                         if b not in members}, key=str)
+        if not border:
+            # island without any injection
+            continue
+
+        # B_CC and B_NC of the group C and its border buses N
+        B = _laplacian(group + border, incident)
+        c = len(group)
+        B_NC = B[c:, :c]
+        equivalent = B_NC.dot(np.linalg.solve(B[:c, :c], B_NC.T))
+
+        capacity = defaultdict(float)
+        for l in incident:
+            for b in (l.input, l.output):
+                if b not in members:
+                    capacity[b] += l.capacity
+
+        for i in range(len(border)):
+            for j in range(i + 1, len(border)):
+                if equivalent[i, j] > 1e-12:
+                    a, b = border[i], border[j]
+                    reduced.append((a, b, equivalent[i, j],
+                                    min(capacity[a], capacity[b]), incident))
+
+    return reduced
+
+
+def cluster(buses, lines, zones):
+    """ Clusters the `buses` of the network given by the line tuples `lines`
+    (see :func:`kron`) into `zones` zones.
+
+    Returns
+    -------
+    Dictionary with the bus representing its zone (medoid) for every bus.
+    """
+    B = np.zeros((len(buses), len(buses)))
+    index = {b: k for k, b in enumerate(buses)}
+    for a, b, susceptance, *_ in lines:
+        i, j = index[a], index[b]
+        B[i, i] += susceptance
+        B[j, j] += susceptance
+        B[i, j] -= susceptance
+        B[j, i] -= susceptance
+
+    medoids, labels = aggregation.kmedoids(np.linalg.pinv(B), zones)
+
+    return {b: buses[medoids[labels[k]]] for k, b in enumerate(buses)}
+
+
+def _rewire(n, old, new):
+    """ Connects the inputs and outputs of node `n` from bus `old` to bus
+    `new`.
+    """
+    if old in n.outputs:
+        flow = n.outputs[old]
+        del n.outputs[old]
+        n.outputs[new] = flow
+    if old in n.inputs:
+        flow = old.outputs[n]
+        del old.outputs[n]
+        new.outputs[n] = flow
+    for attr in ('bus', 'from_bus', 'to_bus'):
+        if getattr(n, attr, None) is old:
+            setattr(n, attr, new)
+
+
+def _merge(reduced):
+    """ Merges parallel lines of the reduced network given by the line tuples
+    `reduced` (see :func:`kron`) into one line with the summed susceptance
+    and capacity, lines within one bus are dropped.
+    """
+    merged = {}
+    for a, b, susceptance, capacity, lines in reduced:
+        if a is b:
+            continue
+        key = frozenset((a, b))
+        if key in merged:
+            _a, _b, _susceptance, _capacity, _lines = merged[key]
+            merged[key] = (_a, _b, _susceptance + susceptance,
+                           _capacity + capacity, _lines + lines)
+        else:
+            merged[key] = (a, b, susceptance, capacity, list(lines))
+    return list(merged.values())
+
+
+def reduce(es, zones=None):
+    """ Returns a copy of the energy system with a reduced electrical network
+    (see module docstring), a mapping of the labels of the original buses to
+    the labels of the buses of the reduced network and a list of (line,
+    reduced line) label tuples for the original lines. Eliminated transit
+    buses and lines without a reduced line are mapped to None.
+
+    Parameters
+    ----------
+    es : :class:`oemof.solph.network.EnergySystem` object
+    zones : int (optional)
+        If set, the buses are clustered into `zones` zones after the Kron
+        reduction
+    """
+    # copy.deepcopy only copies the arguments the nodes were created with
+    es = cache.copy(es)
+
+    lines = [n for n in es.nodes if isinstance(n, Line)]
+    buses = [n for n in es.nodes if isinstance(n, ElectricalBus)]
+    transit = [b for b in buses if _is_transit(b)]
+    kept = [b for b in buses if b not in set(transit)]
+
+    reduced = kron(lines, transit)
+    mapping = {b: b for b in kept}
+
+    if zones:
+        mapping = cluster(kept, reduced, int(zones))
+        for b in kept:
+            if b.slack:
+                mapping[b].slack = True
+
+        reduced = [(mapping[a], mapping[b], s, c, l)
+                   for a, b, s, c, l in reduced]
+
+    reduced = _merge(reduced)
+
+    # lines whose buses are not changed are kept, all other lines are
+    # replaced by the lines of the reduced network added below
+    unchanged = {l[0] for a, b, _, _, l in reduced
+                 if len(l) == 1 and (a, b) == (l[0].input, l[0].output)}
+    for l in lines:
+        if l not in unchanged:
+            del l.input.outputs[l.output]
+
+    removed = (set(lines) - unchanged) | set(transit) | \
+        {b for b in kept if mapping[b] is not b}
+
+    nodes = [n for n in es.nodes if n not in removed]
+    for n in nodes:
+        for old in [b for b in list(n.inputs) + list(n.outputs)
+                    if b in mapping and mapping[b] is not b]:
+            _rewire(n, old, mapping[old])
+
+    line_mapping = []
+    for a, b, susceptance, capacity, original in reduced:
+        if len(original) == 1 and original[0] in unchanged:
+            line = original[0]
+        else:
+            line = Line(label='line-{}-{}'.format(a, b), from_bus=a,
+                        to_bus=b, reactance=1 / susceptance,
+                        capacity=capacity)
+            a.outputs[b] = line
+            nodes.append(line)
+        # lines incident to a transit group may be part of several
+        # equivalent lines
+        line_mapping.extend((str(l), str(line)) for l in set(original))
+
+    mapped = {l for l, _ in line_mapping}
+    line_mapping.extend((str(l), None) for l in lines if str(l) not in mapped)
+    line_mapping.sort(key=lambda row: (row[0], str(row[1])))
+
+    result = EnergySystem(timeindex=es.timeindex)
+    result.temporal = es.temporal
+    result.add(*nodes)
+    for attr in ('_typemap', '_typical_periods'):
+        if hasattr(es, attr):
+            setattr(result, attr, getattr(es, attr))
+
+    topology.index(result)
+
+    logging.info(
+        ("Network reduction: {} buses and {} lines reduced to {} buses " +
+         "and {} lines.").format(
+             len(buses), len(lines), len(set(mapping.values())),
+             len([n for n in nodes if isinstance(n, Line)])))
+
+    labels = {str(b): str(mapping[b]) for b in kept}
+    labels.update({str(b): None for b in transit})
+
+    return result, labels, line_mapping
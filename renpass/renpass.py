@@ -2,7 +2,7 @@
 """ renpass
 
 Usage:
-  renpass [options] DATAPACKAGE
+  renpass [options] DATAPACKAGE...
   renpass -h | --help | --version
 
 Examples:
@@ -11,7 +11,10 @@ Examples:
 
 Arguments:
 
-  DATAPACKAGE                valid datapackage with input data
+  DATAPACKAGE                valid datapackage with input data. If several
+                             datapackages are given, results of one
+                             datapackage are written while the next one is
+                             solved
 
 Options:
 
@@ -20,28 +23,97 @@ Options:
      --output-directory=DIR  Directory to write results to. [default: results]
      --output-orient=ORIENT  Bus- or component-oriented results. [default: component]
      --version               Show version.
-     --results=RESULTS       How should results be saved [default: datapackage]
+     --results=RESULTS       How should results be saved, datapackage (CSV),
+                             parquet or feather [default: datapackage]
+     --float32               If set, float results are written with single
+                             precision
   -s --safe                  If argument --safe is set, results will not be
                              overwritten
   -d --debug                 If set debug mode is turned on
      --t_start=T_START       Start timestep of simulation [default: 0]
      --t_end=T_END           End timestep of simulation, default is last
                              timestep of datapackage timeindex [default: -1]
+     --portfolio=SOLVERS     Comma-separated solvers (name:option=value:...)
+                             solving the model in parallel, the result of
+                             the first optimal solver is used, e.g.
+                             cbc,glpk,cbc:threads=4
+     --horizon=HORIZON       Number of timesteps of one rolling horizon
+                             window. If set, the time index is split into
+                             windows that are solved one after another
+     --overlap=OVERLAP       Number of additional timesteps solved at the end
+                             of every rolling horizon window [default: 0]
+     --cache=DIR             Directory to cache energy systems created from
+                             datapackages (with aggregated time index and
+                             reduced network) in. The cache is invalidated if
+                             any resource file of the datapackage, renpass or
+                             one of these options changes
+     --typical-periods=N     Number of typical periods the time index is
+                             aggregated to before the model is built
+     --period-length=LENGTH  Number of timesteps of one typical period
+                             [default: 24]
+     --aggregation-method=METHOD
+                             Clustering method for typical periods, kmedoids
+                             or kmeans [default: kmedoids]
+     --backend=BACKEND       Model backend, pyomo or matrix. The matrix
+                             backend builds dispatch models as sparse
+                             matrices and solves them with HiGHS (scipy)
+                             [default: pyomo]
+     --benders=SLICES        If set, investment models are solved by Benders
+                             decomposition with one dispatch subproblem per
+                             time slice
+     --benders-gap=GAP       Relative optimality gap of the Benders
+                             decomposition [default: 0.0001]
+     --benders-iterations=N  Maximum number of Benders iterations
+                             [default: 100]
+  -j --workers=WORKERS       Number of worker processes solving subproblems,
+                             default is the number of cores
+     --warmstart-from=DIR    Results directory of a previous run whose values
+                             are passed to the solver as initial solution
+     --duals=FAMILIES        Comma-separated constraint families whose duals
+                             are written to duals/, any of bus (prices), line
+                             and storage. If not set, no duals are received
+     --unit-commitment=MODE  Clustered unit commitment of commitable facades,
+                             off, mip or lp (relaxation) [default: off]
+     --presolve              If set, fixed flows of sources and sinks are
+                             folded into constants of the bus balances and
+                             facades without capacity are removed before
+                             the model is built
+     --reduce-network        If set, transit buses of LOPF models are
+                             eliminated by Kron reduction
+     --zones=ZONES           Number of zones the buses of LOPF models are
+                             clustered into (implies --reduce-network)
+     --checkpoint            If set, the solution is written to
+                             checkpoint.pkl in the output directory right
+                             after solving
+     --resume=CHECKPOINT     Write the results of a checkpoint instead of
+                             solving the model. The energy system is created
+                             with the given options, which have to be the
+                             options of the checkpointed run
+     --export-queue=N        Maximum number of results waiting to be written
+                             while the next datapackage is solved
+                             [default: 1]
+     --profile               If set, wall time, CPU time and peak memory of
+                             every phase are written to profile.json
 """
 
-from datetime import datetime
 from itertools import chain
+import json
 import logging
 import os
 
-from datapackage import Package
 import pandas as pd
 
+from pyomo.opt import SolverFactory
+
 from oemof.tools import logger
-from oemof.solph import Model, EnergySystem, Bus
+from oemof.solph import Model
 from oemof.outputlib import processing, views
 
-from . import facades, options
+from . import (aggregation, benders, binary, cache, checkpoint, commitment,
+               duals, facades, horizon, matrix, options, portfolio, presolve,
+               reduction, topology, warmstart)
+from .exporter import Exporter
+from .profiling import Profiler
 
 try:
     from docopt import docopt
@@ -50,41 +122,112 @@ except ImportError:
 
 ###############################################################################
 
+# arguments the cached energy system is created with (besides the time
+# window), see :func:`create_energysystem`
+CACHED_ARGUMENTS = ('--typical-periods', '--period-length',
+                    '--aggregation-method', '--reduce-network', '--zones')
+
+# file extensions of the supported result formats
+RESULT_FORMATS = {
+    'datapackage': '.csv',
+    'parquet': '.parquet',
+    'feather': '.feather'}
 
-def stopwatch():
-    if not hasattr(stopwatch, 'now'):
-        stopwatch.now = datetime.now()
-        return None
-    last = stopwatch.now
-    stopwatch.now = datetime.now()
-    return str(stopwatch.now-last)[0:-4]
 
-def create_energysystem(datapackage, **arguments):
+def create_energysystem(datapackage, profiler=None, **arguments):
     """Creates the energysystem.
 
     Parameters
     ----------
     datapackage: str
         path to datapackage metadata file in JSON format
+    profiler: :class:`renpass.profiling.Profiler` (optional)
+        Profiler recording the phases of the run
     **arguments : key word arguments
         Arguments passed from command line
     """
+    profiler = profiler or Profiler()
+
+    with profiler.phase('energy system creation'):
+        es, cache_path = None, None
+
+        # only the rows of the time window are read from the sequences
+        window = {'t_start': int(arguments['--t_start']),
+                  't_end': int(arguments['--t_end'])}
+
+        if arguments.get('--cache'):
+            cache_path = cache.path(
+                datapackage, arguments['--cache'], typemap=options.typemap,
+                **dict(window, **{a: arguments.get(a)
+                                  for a in CACHED_ARGUMENTS}))
+            es = cache.load(cache_path)
+
+        cached = es is not None
+
+        if not cached:
+            es = binary.from_datapackage(
+                datapackage,
+                attributemap={},
+                typemap=options.typemap,
+                **window)
+
+        es._typemap = options.typemap
+
+        topology.index(es)
+
+        if arguments.get('--typical-periods') and not cached:
+            aggregation.aggregate(
+                es, int(arguments['--typical-periods']),
+                length=int(arguments.get('--period-length') or 24),
+                method=arguments.get('--aggregation-method') or 'kmedoids')
+
+    if (arguments.get('--reduce-network') or arguments.get('--zones')) and \
+            not cached:
+        with profiler.phase('network reduction'):
+            es, mapping, line_mapping = reduction.reduce(
+                es, zones=arguments.get('--zones'))
+            es._bus_mapping = mapping
+            es._line_mapping = line_mapping
+
+    if cache_path and not cached:
+        cache.dump(es, cache_path)
+
+    # the presolved energy system is not cached, as the removed nodes are
+    # only referenced by it
+    if arguments.get('--presolve'):
+        with profiler.phase('presolve'):
+            es = presolve.presolve(es)
+
+    return es
+
 
-    es = EnergySystem.from_datapackage(
-        arguments['DATAPACKAGE'],
-        attributemap={},
-        typemap=options.typemap)
+def build_model(es, **arguments):
+    """ Creates the (pyomo) optimization model of the energy system with
+    storage linking of typical periods, unit commitment and duals as given by
+    the arguments.
 
-    es._typemap = options.typemap
+    Parameters
+    ----------
+    es : :class:`oemof.solph.network.EnergySystem` object
+    **arguments : key word arguments
+        Arguments passed from command line
+    """
+    if es.temporal is not None:
+        m = Model(es, objective_weighting=es.temporal['weighting'])
+    else:
+        m = Model(es)
 
-    end = es.timeindex.get_loc(es.timeindex[int(arguments['--t_end'])]) + 1
+    presolve.add_injections(m)
 
-    es.timeindex = es.timeindex[int(arguments['--t_start']):end]
+    aggregation.link_storages(m)
 
-    return es
+    unit_commitment = arguments.get('--unit-commitment') or 'off'
+    if unit_commitment != 'off':
+        commitment.add_unit_commitment(m, relaxed=unit_commitment == 'lp')
 
+    return m
 
-def compute(es=None, **arguments):
+def compute(es=None, profiler=None, **arguments):
     """Creates the optimization model, solves it and writes back results to
     energy system object
 
@@ -93,81 +236,294 @@ def compute(es=None, **arguments):
     es : :class:`oemof.solph.network.EnergySystem` object
         Energy system holding nodes, grouping functions and other important
         information.
+    profiler: :class:`renpass.profiling.Profiler` (optional)
+        Profiler recording the phases of the run
     **arguments : key word arguments
         Arguments passed from command line
     """
+    profiler = profiler or Profiler()
+
+    if arguments.get('--warmstart-from') and (
+            arguments.get('--horizon') or arguments.get('--benders') or
+            arguments.get('--backend', 'pyomo') != 'pyomo'):
+        logging.warning('Warm start is only supported for monolithic models '
+                        'of the pyomo backend and is ignored.')
+
+    if arguments.get('--portfolio') and (
+            arguments.get('--horizon') or arguments.get('--benders') or
+            arguments.get('--backend', 'pyomo') != 'pyomo'):
+        logging.warning('Solver portfolios are only supported for monolithic '
+                        'models of the pyomo backend and are ignored.')
+    elif arguments.get('--portfolio') and arguments.get('--warmstart-from'):
+        logging.warning('Warm start is not supported for solver portfolios '
+                        'and is ignored.')
+
+    unit_commitment = arguments.get('--unit-commitment') or 'off'
+    if unit_commitment not in commitment.MODES:
+        raise ValueError("Unknown unit commitment mode `{}`, use one of {}."
+                         .format(unit_commitment, ', '.join(commitment.MODES)))
+    if unit_commitment != 'off' and (
+            arguments.get('--benders') or
+            arguments.get('--backend', 'pyomo') != 'pyomo'):
+        raise ValueError("Unit commitment is only supported for models of "
+                         "the pyomo backend without Benders decomposition.")
+
+    if arguments.get('--horizon'):
+        if getattr(es, '_typical_periods', None):
+            raise ValueError("Rolling horizon can not be combined with "
+                             "typical periods.")
+        if arguments.get('--backend', 'pyomo') != 'pyomo':
+            raise ValueError("Rolling horizon requires the pyomo backend.")
+
+        with profiler.phase('rolling horizon'):
+            m = horizon.rolling_horizon(es, **arguments)
+
+        return m
+
+    if arguments.get('--benders'):
+        if getattr(es, '_typical_periods', None):
+            raise ValueError("Benders decomposition can not be combined with "
+                             "typical periods.")
+        if arguments.get('--backend', 'pyomo') != 'pyomo':
+            raise ValueError("Benders decomposition requires the pyomo "
+                             "backend.")
+
+        with profiler.phase('benders decomposition'):
+            m = benders.decompose(es, **arguments)
+
+        return m
+
+    if arguments.get('--backend', 'pyomo') == 'matrix':
+        return _compute_matrix(es, profiler, **arguments)
+
+    with profiler.phase('model creation'):
+        m = build_model(es, **arguments)
+
+    families = duals.families(arguments.get('--duals'))
+
+    solve_kwargs = duals.solve_kwargs(families, tee=True)
+
+    if arguments.get('--warmstart-from') and not arguments.get('--portfolio'):
+        with profiler.phase('warm start'):
+            warmstart.apply(m, *warmstart.read(arguments['--warmstart-from']))
+        if SolverFactory(arguments['--solver']).warm_start_capable():
+            solve_kwargs['warmstart'] = True
+        else:
+            logging.warning('Solver {} does not support warm starts.'.format(
+                arguments['--solver']))
 
-    if es.temporal is not None:
-        m = Model(es, objective_weighting=es.temporal['weighting'])
-    else:
-        m = Model(es)
+    if arguments['--debug']:
+        filename  = 'renpass_model.lp'
+        logging.info('Writing lp-file to {}.'.format(filename))
+        with profiler.phase('lp-file writing'):
+            m.write(filename,
+                    io_options={'symbolic_solver_labels': True})
+
+    # includes writing the problem file passed to the solver
+    with profiler.phase('optimization'):
+        if arguments.get('--portfolio'):
+            es._portfolio = portfolio.race(
+                m, portfolio.solvers(arguments['--portfolio']),
+                **duals.solve_kwargs(families))
+        else:
+            m.solve(solver=arguments['--solver'], solve_kwargs=solve_kwargs)
+
+    if families:
+        with profiler.phase('dual extraction'):
+            es._results = {'duals': duals.extract(m, families)}
+
+    return m
+
+def _compute_matrix(es, profiler, **arguments):
+    """ Builds and solves the model of the energy system with the matrix
+    backend, results are stored in `es._results`.
+    """
+    if getattr(es, '_typical_periods', None):
+        raise ValueError("The matrix backend can not be combined with "
+                         "typical periods.")
 
-    logging.info('Model creation time: ' + stopwatch())
+    if arguments['--solver'] != 'highs':
+        logging.info('The matrix backend solves with HiGHS, solver {} is '
+                     'ignored.'.format(arguments['--solver']))
 
-    m.receive_duals()
+    with profiler.phase('model creation'):
+        if es.temporal is not None:
+            m = matrix.MatrixModel(
+                es, objective_weighting=es.temporal['weighting'])
+        else:
+            m = matrix.MatrixModel(es)
 
     if arguments['--debug']:
-        filename  = 'renpass_model.lp'
-        logging.info('Writing lp-file to {}.'.format(filename))
-        m.write(filename,
-                io_options={'symbolic_solver_labels': True})
+        filename = 'renpass_model.mps'
+        logging.info('Writing mps-file to {}.'.format(filename))
+        with profiler.phase('mps-file writing'):
+            m.write_mps(filename)
 
-    m.solve(solver=arguments['--solver'], solve_kwargs={'tee': True})
+    with profiler.phase('optimization'):
+        m.solve()
 
-    logging.info('Optimization time: ' + stopwatch())
+    # the dataframe of all results is only needed for the default orientation
+    es._results = m.results(
+        dataframe=arguments['--output-orient'] == 'default',
+        duals=duals.families(arguments.get('--duals')))
 
     return m
 
-def component_results(es, results, path, model):
+def export(df, path, fmt='datapackage', float32=False, **kwargs):
+    """ Writes a dataframe or series of results to `path` (without file
+    extension) in the format `fmt`.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame or pandas.Series
+    path : str
+        path of the file to write without extension
+    fmt : str
+        One of `datapackage` (semicolon-separated CSV), `parquet` or
+        `feather`. Columnar formats require `pyarrow`.
+    float32 : boolean
+        If True, float values are written with single precision
+    **kwargs : key word arguments
+        Passed to :meth:`pandas.DataFrame.to_csv` for CSV files
+    """
+    if fmt not in RESULT_FORMATS:
+        raise ValueError("Unknown results format `{}`, use one of {}."
+                         .format(fmt, ', '.join(RESULT_FORMATS)))
+
+    if float32:
+        if isinstance(df, pd.Series):
+            if df.dtype == 'float64':
+                df = df.astype('float32')
+        else:
+            df = df.astype({c: 'float32' for c, t in df.dtypes.items()
+                            if t == 'float64'})
+
+    if fmt == 'datapackage':
+        df.to_csv(path + RESULT_FORMATS[fmt], sep=";", **kwargs)
+        return
+
+    # columnar formats require string labels
+    if isinstance(df, pd.Series):
+        df = df.to_frame(name='value')
+    df = df.copy()
+    df.columns = _string_labels(df.columns)
+    if df.index.dtype == object:
+        df.index = _string_labels(df.index)
+
+    if fmt == 'parquet':
+        df.to_parquet(path + RESULT_FORMATS[fmt])
+    else:
+        # feather supports neither multiindex columns nor an index
+        if isinstance(df.columns, pd.MultiIndex):
+            df.columns = [str(c) for c in df.columns]
+        df.reset_index().to_feather(path + RESULT_FORMATS[fmt])
+
+
+def _string_labels(index):
+    """ Returns a copy of the (multi)index with all labels converted to
+    strings, e.g. nodes to their labels. Missing labels become empty strings
+    as in CSV files.
+    """
+    def _str(l):
+        return '' if l is None or l != l else str(l)
+
+    if isinstance(index, pd.MultiIndex):
+        return pd.MultiIndex.from_tuples(
+            [tuple(_str(l) for l in i) for i in index], names=index.names)
+    return pd.Index([_str(l) for l in index], name=index.name)
+
+
+def _makedirs(path):
+    if not os.path.exists(path):
+        os.makedirs(path)
+    return path
+
+
+def component_results(es, results, path, model, **kwargs):
     """ Writes results aggregated by component type
     """
-    for k,v in es._typemap.items():
-
-        if type(k) == str:
-            _seq_by_type = [
-                views.node(results, n, multiindex=True)['sequences']
-                for n in es.nodes if isinstance(n, v) and not isinstance(n, Bus)]
-            if _seq_by_type:
-                seq_by_type =  pd.concat(_seq_by_type, axis=1)
-                type_path = os.path.join(path, 'sequences')
-                if not os.path.exists(type_path):
-                    os.makedirs(type_path)
-                seq_by_type.to_csv(
-                    os.path.join(type_path, str(k) + '.csv'), sep=";")
-
-            _sca_by_type = [
-                views.node(results, n, multiindex=True).get('scalars')
-                for n in es.nodes if isinstance(n, v) and not isinstance(n, Bus)]
-
-            if [x for x in _sca_by_type if x is not None]:
-                sca_by_type =  pd.concat(_sca_by_type)
-                type_path = os.path.join(path, 'scalars')
-                if not os.path.exists(type_path):
-                    os.makedirs(type_path)
-                sca_by_type.to_csv(
-                    os.path.join(type_path, str(k) + '.csv'), header=True,
-                                 sep=";")
-
-def bus_results(es, results, path, model):
+    node_views = {}
+    node_results = topology.results_by_node(results)
+
+    for k, nodes in topology.index(es).nodes_by_type.items():
+        for n in nodes:
+            if n not in node_views:
+                node_views[n] = views.node(node_results[n], n,
+                                           multiindex=True)
+
+        _seq_by_type = [node_views[n]['sequences'] for n in nodes]
+        if _seq_by_type:
+            export(pd.concat(_seq_by_type, axis=1),
+                   os.path.join(_makedirs(os.path.join(path, 'sequences')),
+                                str(k)), **kwargs)
+
+        _sca_by_type = [node_views[n].get('scalars') for n in nodes]
+        if [x for x in _sca_by_type if x is not None]:
+            export(pd.concat(_sca_by_type),
+                   os.path.join(_makedirs(os.path.join(path, 'scalars')),
+                                str(k)), header=True, **kwargs)
+
+def bus_results(es, results, path, model, **kwargs):
     """ Writes results aggregated for every bus of the energy system
     """
-    buses = [b for b in es.nodes if isinstance(b, Bus)]
+    buses = topology.index(es).buses
+    if buses:
+        type_path = _makedirs(os.path.join(path, 'sequences'))
+        node_results = topology.results_by_node(results)
     for b in buses:
-        bus_sequences = pd.concat([
-            views.node(results, b, multiindex=True)['sequences']], axis=1)
-        type_path = os.path.join(path, 'sequences')
-        if not os.path.exists(type_path):
-            os.makedirs(type_path)
-        bus_sequences.to_csv(
-            os.path.join(type_path, str(b) + '.csv'), sep=";")
-
-def default_results(es, results, path, model):
+        export(views.node(node_results[b], b, multiindex=True)['sequences'],
+               os.path.join(type_path, str(b)), **kwargs)
+
+def default_results(es, results, path, model, **kwargs):
     """ Write multiindex dataframe with all results from the solved `model`
     """
-    processing.create_dataframe(model).to_csv(
-        os.path.join(path, 'results.csv'), sep=";")
+    df = getattr(es, '_results', {}).get('dataframe')
+    if df is None:
+        df = processing.create_dataframe(model)
+    export(df, os.path.join(path, 'results'), **kwargs)
+
+def _modelname(p):
+    """ Returns the name of the model of the datapackage `p`, given as
+    datapackage.Package instance or as its descriptor (dictionary).
+    """
+    return getattr(p, 'descriptor', p)['name'].replace(' ', '_')
+
+def output_directory(p, **arguments):
+    """ Returns the directory results of the datapackage `p` are written to.
+    """
+    # get the model name for processing and storing results from input dpkg
+    return os.path.join(arguments['--output-directory'], _modelname(p))
+
+def process_results(es, m, **arguments):
+    """ Processes the results of the solved model `m` into `es._results`,
+    such that the model is not needed anymore when the results are written.
+    Results that are processed already (e.g. joined results of a rolling
+    horizon optimization or results restored from a checkpoint) are kept.
+
+    Returns
+    -------
+    `es._results`, a dictionary with the `main` and `meta` results, the
+    `dataframe` of all results for the default output orientation and the
+    `duals` of selected constraint families (if any)
+    """
+    es._results = es_results = dict(getattr(es, '_results', {}))
+
+    if not es_results.get('meta'):
+        es_results['meta'] = processing.meta_results(m)
 
-def write_results(es, m, p, **arguments):
+    # results of typical periods are mapped to the original time index
+    if not es_results.get('main'):
+        es_results['main'] = aggregation.expand_results(
+            m, processing.results(m))
+
+    if arguments['--output-orient'] == 'default' and \
+            es_results.get('dataframe') is None:
+        es_results['dataframe'] = aggregation.expand_dataframe(
+            m, processing.create_dataframe(m))
+
+    return es_results
+
+def write_results(es, m, p, profiler=None, exporter=None, **arguments):
     """Write results to CSV-files
 
     Parameters
@@ -177,21 +533,38 @@ def write_results(es, m, p, **arguments):
         information.
     m : A solved :class:'oemof.solph.models.Model' object for dispatch or
      investment optimization
-    p: datapackage.Package instance of the input datapackage
+    p: datapackage.Package instance of the input datapackage or its
+     descriptor (dictionary)
+    profiler: :class:`renpass.profiling.Profiler` (optional)
+        Profiler recording the phases of the run
+    exporter: :class:`renpass.exporter.Exporter` (optional)
+        If given, results are processed right away but written in the
+        background by the exporter
     **arguments : key word arguments
         Arguments passed from command line
     """
+    profiler = profiler or Profiler()
 
-    # get the model name for processing and storing results from input dpkg
-    modelname = p.descriptor['name'].replace(' ', '_')
+    modelname = _modelname(p)
 
-    output_base_directory = os.path.join(
-        arguments['--output-directory'], modelname)
+    output_base_directory = output_directory(p, **arguments)
 
     if not os.path.isdir(output_base_directory):
         os.makedirs(output_base_directory)
 
-    meta_results = processing.meta_results(m)
+    with profiler.phase('result processing'):
+        es_results = process_results(es, m, **arguments)
+
+        meta_results = es_results['meta']
+        results = es_results['main']
+
+        # add flows removed by the presolve
+        dataframe = presolve.restore(es, results, meta_results,
+                                     es_results.get('dataframe'))
+        if dataframe is not None:
+            es_results['dataframe'] = dataframe
+
+    profiler.info['solver_time'] = meta_results['solver']['Time']
 
     meta_results_path = os.path.join(output_base_directory, 'problem.csv')
 
@@ -209,38 +582,158 @@ def write_results(es, m, p, **arguments):
             modelname: meta_results['problem']['Number of variables']}})\
                 .to_csv(meta_results_path)
 
-    results = processing.results(m)
+    solver = arguments['--solver']
+
+    # solvers of the portfolio of this model and the winners of all models
+    if getattr(es, '_portfolio', None) is not None:
+        es._portfolio.to_csv(
+            os.path.join(output_base_directory, 'portfolio.csv'))
+        solver = es._portfolio.index[es._portfolio['winner']][0]
+
+        winners_path = os.path.join(arguments['--output-directory'],
+                                    'portfolio-winners.csv')
+        pd.DataFrame({
+            'winner': {modelname: solver},
+            'time': {modelname: es._portfolio.loc[solver, 'time']},
+            'portfolio': {modelname: arguments['--portfolio']}})\
+                .rename_axis('model').to_csv(
+                    winners_path, mode='a',
+                    header=not os.path.exists(winners_path))
+
+    # buses of the original network and the buses they are reduced to
+    if getattr(es, '_bus_mapping', None) is not None:
+        pd.Series(es._bus_mapping, name='reduced_bus').rename_axis('bus')\
+            .to_csv(os.path.join(output_base_directory, 'bus-mapping.csv'),
+                    header=True)
+
+    # lines of the original network and the lines they are reduced to
+    if getattr(es, '_line_mapping', None) is not None:
+        pd.DataFrame(es._line_mapping, columns=['line', 'reduced_line'])\
+            .to_csv(os.path.join(output_base_directory, 'line-mapping.csv'),
+                    index=False)
+
+    # original periods and the typical periods representing them
+    if getattr(es, '_typical_periods', None) is not None:
+        info = es._typical_periods
+        pd.DataFrame({
+            'start': info['timeindex'][::info['length']],
+            'typical_period': info['order']}).rename_axis('period')\
+            .to_csv(os.path.join(output_base_directory, 'periods.csv'))
+
+    if arguments.get('--profile'):
+        profiler.info.update({
+            'datapackage': os.path.abspath(arguments['DATAPACKAGE']),
+            'solver': solver,
+            'timesteps': len(es.timeindex),
+            'nodes': len(es.nodes)})
+
+    if exporter is None:
+        _export_results(es, results, output_base_directory, profiler,
+                        **arguments)
+    else:
+        exporter.submit(_export_results, es, results, output_base_directory,
+                        profiler, **arguments)
+
+    return True
 
+def _export_results(es, results, path, profiler, **arguments):
+    """ Writes the processed results of the energy system and the profile of
+    the run to `path`.
+    """
     _write_results = {
         'default': default_results,
         'component': component_results,
         'bus': bus_results} \
         [arguments['--output-orient']]
 
-    logging.info('Exporting results to {}'.format(
-        os.path.abspath(output_base_directory)))
+    logging.info('Exporting results to {}'.format(os.path.abspath(path)))
 
-    _write_results(es, results, path=output_base_directory, model=m)
+    with profiler.phase('export'):
+        _write_results(es, results, path=path, model=None,
+                       fmt=arguments['--results'],
+                       float32=arguments.get('--float32', False))
 
-    return True
+        for family, df in es._results.get('duals', {}).items():
+            export(df, os.path.join(_makedirs(os.path.join(path, 'duals')),
+                                    family),
+                   fmt=arguments['--results'],
+                   float32=arguments.get('--float32', False))
 
-def main(**arguments):
-    """
-    """
-    logging.info('Starting renpass!')
+    if arguments.get('--profile'):
+        profiler.to_json(os.path.join(path, 'profile.json'))
 
-    stopwatch()
+def run(exporter=None, **arguments):
+    """ Runs renpass for the datapackage `arguments['DATAPACKAGE']`.
 
-    p = Package(arguments['DATAPACKAGE'])
+    Parameters
+    ----------
+    exporter: :class:`renpass.exporter.Exporter` (optional)
+        If given, results are written in the background by the exporter
+    **arguments : key word arguments
+        Arguments passed from command line
+    """
+    # the peak memory of phases is only measured for the profile
+    profiler = Profiler(memory=bool(arguments.get('--profile')))
+
+    # only the descriptor is read, the resources are read while creating the
+    # energy system (if it is not restored from the cache)
+    with profiler.phase('datapackage reading'):
+        with open(arguments['DATAPACKAGE']) as f:
+            p = json.load(f)
 
     # create energy system and pass nodes
-    es = create_energysystem(arguments['DATAPACKAGE'], **arguments)
+    es = create_energysystem(arguments['DATAPACKAGE'], profiler=profiler,
+                             **arguments)
+
+    if arguments.get('--resume'):
+        # the solution is restored instead of solving the model again, duals
+        # are part of the checkpoint
+        options = dict(arguments, **{'--duals': None})
+        with profiler.phase('checkpoint restoring'):
+            m = checkpoint.load(arguments['--resume'], es,
+                                arguments['DATAPACKAGE'],
+                                orient=arguments['--output-orient'],
+                                build=lambda: build_model(es, **options))
+    else:
+        # create optimization model and solve it
+        m = compute(es=es, profiler=profiler, **arguments)
 
-    # create optimization model and solve it
-    m = compute(es=es, **arguments)
+        # the solution is written before any of it is processed
+        if arguments.get('--checkpoint'):
+            with profiler.phase('checkpoint writing'):
+                checkpoint.save(
+                    es, m, os.path.join(output_directory(p, **arguments),
+                                        'checkpoint.pkl'),
+                    arguments['DATAPACKAGE'])
 
     # write results in output directory
-    write_results(es, m=m, p=p, **arguments)
+    write_results(es, m=m, p=p, profiler=profiler, exporter=exporter,
+                  **arguments)
+
+def main(**arguments):
+    """
+    """
+    logging.info('Starting renpass!')
+
+    datapackages = arguments['DATAPACKAGE']
+    if isinstance(datapackages, str):
+        datapackages = [datapackages]
+
+    if arguments.get('--resume') and len(datapackages) > 1:
+        raise ValueError("A checkpoint can only be resumed for one "
+                         "datapackage.")
+
+    # results of one datapackage are written while the next one is solved
+    exporter = None
+    if len(datapackages) > 1:
+        exporter = Exporter(max_pending=arguments.get('--export-queue') or 1)
+
+    try:
+        for datapackage in datapackages:
+            run(exporter=exporter, **dict(arguments, DATAPACKAGE=datapackage))
+    finally:
+        if exporter is not None:
+            exporter.close()
 
     logging.info('Done! \n Check the results')
 
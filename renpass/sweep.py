@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+""" renpass-sweep
+
+Runs renpass for a number of scenarios derived from one base datapackage in
+parallel worker processes.
+
+Usage:
+  renpass-sweep [options] DATAPACKAGE SCENARIOS
+  renpass-sweep -h | --help | --version
+
+Examples:
+
+  renpass-sweep -j 4 path/to/datapackage.json path/to/scenarios.csv
+
+Arguments:
+
+  DATAPACKAGE                valid datapackage with input data
+  SCENARIOS                  CSV-file with the columns `scenario`, `resource`,
+                             `name`, `field` and `value`. For element
+                             resources the `field` of the element `name` is
+                             set to `value`. For (CSV or binary) sequences
+                             resources the column `name` is multiplied with
+                             `value`, the `field` is ignored. Scenario names
+                             are used as directory names.
+
+Options:
+
+  -h --help                  Show this screen and exit.
+  -o --solver=SOLVER         Solver to be used. [default: cbc]
+  -j --workers=WORKERS       Number of worker processes, default is the number
+                             of cores
+     --output-directory=DIR  Directory to write results to. [default: results]
+     --output-orient=ORIENT  Bus- or component-oriented results. [default: component]
+     --version               Show version.
+  -d --debug                 If set debug mode is turned on
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from oemof.tools import logger
+
+from . import binary, renpass
+
+try:
+    from docopt import docopt
+except ImportError:
+    print("Unable to load docopt. Is docopt installed?")
+
+###############################################################################
+
+
+def _delimiter(path):
+    """ Returns the delimiter of the CSV-file `path` (`;` or `,`).
+    """
+    with open(path) as f:
+        header = f.readline()
+    return ';' if ';' in header else ','
+
+
+def check_scenarios(scenarios):
+    """ Raises a ValueError if a name of the `scenarios` can not be used as
+    name of a directory (only letters, digits, spaces, `_`, `-` and `.` are
+    allowed) or if two scenarios would write to the same result directory.
+    """
+    invalid = [s for s in scenarios
+               if not isinstance(s, str) or not re.match(r'^[\w .-]+$', s) or
+               s.strip('. ') == '']
+    if invalid:
+        raise ValueError(
+            ("Invalid scenario names {}, use letters, digits, spaces, `_`, " +
+             "`-` and `.` only.").format(', '.join(map(repr, invalid))))
+
+    directories = [s.replace(' ', '_') for s in scenarios]
+    duplicates = sorted({s for s, d in zip(scenarios, directories)
+                         if directories.count(d) > 1})
+    if duplicates:
+        raise ValueError(
+            "Scenarios {} write to the same result directory.".format(
+                ', '.join(map(repr, duplicates))))
+
+
+def _scale_binary(base, resource, rows):
+    """ Scales the columns of the binary sequences `resource` of the
+    datapackage in the directory `base` by the values of the override `rows`
+    in place.
+    """
+    array, columns = binary.load(base, resource)
+    # copy the memory-mapped array, such that the file can be overwritten
+    array = np.array(array, order='F')
+
+    for _, row in rows.iterrows():
+        if row['name'] not in columns:
+            raise ValueError(
+                "Column `{}` does not exist in resource {}.".format(
+                    row['name'], resource['name']))
+        array[:, columns.index(row['name'])] *= float(row['value'])
+
+    np.save(os.path.join(base, resource['path']), array)
+
+
+def apply_overrides(descriptor_path, overrides):
+    """ Applies parameter overrides to the resources of a datapackage in place.
+
+    Parameters
+    ----------
+    descriptor_path: str
+        path to datapackage metadata file in JSON format
+    overrides: pandas.DataFrame
+        Overrides with the columns `resource`, `name`, `field` and `value`
+    """
+    with open(descriptor_path) as f:
+        descriptor = json.load(f)
+
+    base = os.path.dirname(descriptor_path)
+    resources = {r['name']: r for r in descriptor['resources']}
+
+    for resource, rows in overrides.groupby('resource'):
+        if resource not in resources:
+            raise ValueError(
+                "Resource `{}` does not exist in datapackage {}.".format(
+                    resource, descriptor_path))
+
+        if binary.is_binary(resources[resource]):
+            _scale_binary(base, resources[resource], rows)
+            continue
+
+        path = os.path.join(base, resources[resource]['path'])
+        sequences = binary.is_sequences(resources[resource])
+        sep = _delimiter(path)
+
+        if sequences:
+            df = pd.read_csv(path, sep=sep, index_col=0)
+            for _, row in rows.iterrows():
+                if row['name'] not in df.columns:
+                    raise ValueError(
+                        "Column `{}` does not exist in resource {}.".format(
+                            row['name'], resource))
+                df[row['name']] = df[row['name']] * float(row['value'])
+        else:
+            df = pd.read_csv(path, sep=sep, dtype=str,
+                             keep_default_na=False)
+            for _, row in rows.iterrows():
+                if row['name'] not in df['name'].values:
+                    raise ValueError(
+                        "Element `{}` does not exist in resource {}.".format(
+                            row['name'], resource))
+                if row['field'] not in df.columns:
+                    raise ValueError(
+                        "Field `{}` does not exist in resource {}.".format(
+                            row['field'], resource))
+                df.loc[df['name'] == row['name'], row['field']] = \
+                    str(row['value'])
+
+        df.to_csv(path, sep=sep, index=sequences)
+
+
+def run_scenario(scenario, overrides, **arguments):
+    """ Creates a copy of the base datapackage, applies the `overrides` and
+    runs renpass on it. Results are written to a directory named after the
+    scenario.
+
+    Parameters
+    ----------
+    scenario: str
+        Name of the scenario
+    overrides: pandas.DataFrame
+        Overrides of the scenario, see :func:`apply_overrides`
+    **arguments : key word arguments
+        Arguments passed from command line
+    """
+    check_scenarios([scenario])
+
+    base = os.path.dirname(os.path.abspath(arguments['DATAPACKAGE']))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, scenario)
+        shutil.copytree(base, directory)
+
+        descriptor_path = os.path.join(
+            directory, os.path.basename(arguments['DATAPACKAGE']))
+
+        with open(descriptor_path) as f:
+            descriptor = json.load(f)
+        descriptor['name'] = scenario
+        with open(descriptor_path, 'w') as f:
+            json.dump(descriptor, f, indent=4)
+
+        apply_overrides(descriptor_path, overrides)
+
+        # parse with the renpass interface to get all default arguments
+        argv = ['--solver', arguments['--solver'],
+                '--output-directory', arguments['--output-directory'],
+                '--output-orient', arguments['--output-orient'],
+                descriptor_path]
+        if arguments['--debug']:
+            argv.insert(0, '--debug')
+
+        renpass.main(**docopt(renpass.__doc__, argv=argv))
+
+    return scenario
+
+
+def summary(scenarios, path):
+    """ Collects the `problem.csv` files of all scenarios in one dataframe
+    indexed by scenario.
+    """
+    problems = []
+    for s in scenarios:
+        problem_path = os.path.join(
+            path, s.replace(' ', '_'), 'problem.csv')
+        if os.path.exists(problem_path):
+            problems.append(pd.read_csv(problem_path, index_col=0))
+
+    if not problems:
+        return pd.DataFrame()
+
+    return pd.concat(problems)
+
+
+def main(**arguments):
+    """
+    """
+    logging.info('Starting renpass sweep!')
+
+    overrides = pd.read_csv(arguments['SCENARIOS'],
+                            sep=_delimiter(arguments['SCENARIOS']),
+                            dtype={'scenario': str})
+
+    scenarios = list(overrides['scenario'].unique())
+    check_scenarios(scenarios)
+
+    workers = arguments['--workers']
+    workers = int(workers) if workers else os.cpu_count()
+
+    logging.info('Running {} scenarios with {} workers.'.format(
+        len(scenarios), workers))
+
+    failed = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                run_scenario, s, overrides[overrides['scenario'] == s],
+                **arguments): s
+            for s in scenarios}
+
+        for future in as_completed(futures):
+            try:
+                logging.info('Finished scenario {}.'.format(future.result()))
+            except Exception as e:
+                logging.error('Scenario {} failed: {}'.format(
+                    futures[future], e))
+                failed.append(futures[future])
+
+    if not os.path.isdir(arguments['--output-directory']):
+        os.makedirs(arguments['--output-directory'])
+
+    summary_path = os.path.join(arguments['--output-directory'], 'summary.csv')
+
+    logging.info('Exporting scenario summary to {}'.format(
+        os.path.abspath(summary_path)))
+
+    summary([s for s in scenarios if s not in failed],
+            arguments['--output-directory']).to_csv(summary_path)
+
+    if failed:
+        logging.warning('Failed scenarios: {}'.format(', '.join(failed)))
+
+    logging.info('Done! \n Check the results')
+
+    return
+
+###############################################################################
+
+if __name__ == '__main__':
+    arguments = docopt(__doc__, version='renpass v0.3.1')
+
+    logger.define_logging()
+
+    main(**arguments)
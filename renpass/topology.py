@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+""" This module contains an index of the topology of an energy system (nodes
+by type, flows by bus, links of connections) which is built in one pass over
+the nodes and cached on the energy system, such that functions looking up
+nodes or flows do not have to scan all nodes again.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+from collections import defaultdict
+
+from oemof.solph import Bus
+
+from . import facades
+
+
+class Topology(object):
+    """ Topology index of an energy system.
+
+    Attributes
+    ----------
+    nodes_by_type : dict
+        Lists of nodes by key of the typemap of the energy system. Nodes are
+        part of every group whose class they are an instance of, buses are
+        not grouped.
+    buses : list
+        All buses of the energy system
+    flows_by_bus : dict
+        Dictionary with `inputs` and `outputs` of every bus as lists of
+        (from, to) tuples
+    edges : dict
+        List of (from, to) tuples of the outputs and inputs of every node
+    links : list
+        (from, to) tuples of buses linked by a connection
+    """
+    def __init__(self, es):
+        typemap = getattr(es, '_typemap', {})
+
+        self.nodes = len(es.nodes)
+        self.nodes_by_type = {k: [] for k in typemap if type(k) == str}
+        self.buses = []
+        self.flows_by_bus = defaultdict(lambda: {'inputs': [], 'outputs': []})
+        self.edges = {}
+        self.links = []
+
+        # nodes removed by the presolve are still part of the results
+        nodes = list(es.nodes)
+        presolved = getattr(es, '_presolve', None)
+        if presolved:
+            nodes += presolved['removed']
+
+        keys = {}
+        for n in nodes:
+            if type(n) not in keys:
+                keys[type(n)] = [
+                    k for k in self.nodes_by_type
+                    if isinstance(n, typemap[k]) and not isinstance(n, Bus)]
+            for k in keys[type(n)]:
+                self.nodes_by_type[k].append(n)
+
+            if isinstance(n, Bus):
+                self.buses.append(n)
+
+            self.edges[n] = [(n, o) for o in n.outputs] + \
+                            [(i, n) for i in n.inputs]
+
+            for o in n.outputs:
+                if isinstance(o, Bus):
+                    self.flows_by_bus[o]['inputs'].append((n, o))
+                if isinstance(n, Bus):
+                    self.flows_by_bus[n]['outputs'].append((n, o))
+
+            if isinstance(n, facades.Connection):
+                self.links.extend(
+                    (i, o) for i in n.inputs for o in n.outputs if o != i)
+
+        self.flows_by_bus = dict(self.flows_by_bus)
+
+
+def index(es):
+    """ Returns the topology index of the energy system. The index is built on
+    the first call and cached on the energy system; it is rebuilt if nodes
+    were added since.
+    """
+    topology = getattr(es, '_topology', None)
+    if topology is None or topology.nodes != len(es.nodes):
+        topology = es._topology = Topology(es)
+    return topology
+
+
+def results_by_node(results):
+    """ Groups the results (as returned by
+    :func:`oemof.outputlib.processing.results`) by node in one pass, such that
+    :func:`oemof.outputlib.views.node` only has to filter the results of one
+    node.
+
+    Returns
+    -------
+    Dictionary with a dictionary of all results whose key contains the node
+    for every node.
+    """
+    grouped = defaultdict(dict)
+    for key, value in results.items():
+        for n in set(key):
+            if n is not None:
+                grouped[n][key] = value
+    return grouped
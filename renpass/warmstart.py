@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+""" This module contains functions to warm start a model with the results of
+a previous renpass run, i.e. flow values, storage levels and investments are
+read from a results directory and set as initial values of the variables of
+the model with the same labels and timestamps.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+import ast
+import glob
+import logging
+import os
+
+import pandas as pd
+
+
+def _label(label):
+    """ Returns None for missing labels (missing labels of CSV-files are
+    read as `nan` or `Unnamed: ...`).
+    """
+    if label is None or label != label or str(label) in ('', 'nan') or \
+            str(label).startswith('Unnamed:'):
+        return None
+    return str(label)
+
+
+def _read(path, scalars=False):
+    """ Reads a sequences or scalars result file of any result format and
+    returns a dataframe with (from, to, variable) columns.
+    """
+    if path.endswith('.csv'):
+        if scalars:
+            return pd.read_csv(path, sep=';', index_col=[0, 1, 2]).T
+        df = pd.read_csv(path, sep=';', header=[0, 1, 2], index_col=0)
+    elif path.endswith('.parquet'):
+        df = pd.read_parquet(path)
+        if scalars:
+            return df.T
+    else:
+        df = pd.read_feather(path)
+        if scalars:
+            return df.set_index(list(df.columns[:3])).T
+        df = df.set_index(df.columns[0])
+        df.columns = pd.MultiIndex.from_tuples(
+            [ast.literal_eval(c) for c in df.columns])
+    df.index = pd.to_datetime(df.index)
+    return df
+
+
+def read(directory):
+    """ Reads the results of a previous run from the component or bus
+    oriented results `directory`.
+
+    Returns
+    -------
+    Tuple of a dictionary with a series of values by timestamp for every
+    (from, to, variable) key of the sequences and a dictionary with a value
+    for every (from, to, variable) key of the scalars.
+    """
+    if not os.path.isdir(os.path.join(directory, 'sequences')):
+        raise ValueError(
+            ("No sequences found in {}, warm start requires component or " +
+             "bus oriented results.").format(directory))
+
+    sequences, scalars = {}, {}
+
+    for path in sorted(glob.glob(os.path.join(directory, 'sequences', '*'))):
+        df = _read(path)
+        for column in df.columns:
+            key = tuple(_label(l) for l in column)
+            sequences[key] = df[column]
+
+    for path in sorted(glob.glob(os.path.join(directory, 'scalars', '*'))):
+        df = _read(path, scalars=True)
+        for column in df.columns:
+            key = tuple(_label(l) for l in column)
+            scalars[key] = float(df[column].iloc[0])
+
+    return sequences, scalars
+
+
+def _variables(m):
+    """ Yields tuples of ((from, to, variable), pyomo variable, index, indexed)
+    for all flow, storage level and investment variables of the model, where
+    `indexed` is True for variables additionally indexed by timestep.
+    """
+    for o, i in m.FLOWS:
+        yield (str(o), str(i), 'flow'), m.flow, (o, i), True
+
+    for name, storages in (('GenericStorageBlock', 'STORAGES'),
+                           ('GenericInvestmentStorageBlock',
+                            'INVESTSTORAGES')):
+        block = getattr(m, name, None)
+        if block is None or not hasattr(block, storages):
+            continue
+        for n in getattr(block, storages):
+            yield (str(n), None, 'capacity'), block.capacity, (n,), True
+            if hasattr(block, 'invest'):
+                yield (str(n), None, 'invest'), block.invest, n, False
+
+    block = getattr(m, 'InvestmentFlow', None)
+    if block is not None and hasattr(block, 'INVESTFLOWS'):
+        for o, i in block.INVESTFLOWS:
+            yield (str(o), str(i), 'invest'), block.invest, (o, i), False
+
+
+def apply(m, sequences, scalars):
+    """ Sets the values of a previous run (see :func:`read`) as initial values
+    of the variables of the model `m`. Values of labels, variables and
+    timestamps that do not exist in the model are skipped, fixed variables
+    (e.g. flows of volatile sources and loads) keep their fixed values.
+
+    Returns
+    -------
+    Tuple of the number of variables set and the number of variables
+    considered (flows, storage levels and investments).
+    """
+    timeindex = m.es.timeindex
+    timesteps = list(m.TIMESTEPS)
+
+    reused, total = 0, 0
+
+    for key, variable, index, indexed in _variables(m):
+        if not indexed:
+            total += 1
+            if key in scalars and not variable[index].fixed:
+                variable[index].value = scalars[key]
+                reused += 1
+            continue
+
+        total += len(timesteps)
+        series = sequences.get(key)
+        if series is None:
+            continue
+        index_ = series.index
+        if timeindex.tz is not None and index_.tz is None:
+            index_ = index_.tz_localize(timeindex.tz)
+        positions = timeindex.get_indexer(index_)
+        for position, value in zip(positions, series.values):
+            if position >= 0 and value == value:
+                v = variable[index + (timesteps[position],)]
+                if not v.fixed:
+                    v.value = value
+                    reused += 1
+
+    logging.info(
+        "Warm start: reused {} of {} values ({:.1%}).".format(
+            reused, total, reused / total if total else 0))
+
+    return reused, total
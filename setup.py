@@ -11,7 +11,9 @@ setup(name='renpass',
       description='renpass',
       url='https://github.com/znes/renpass',
       long_description=read('README.md'),
-      scripts=['bin/renpass'],
+      scripts=['bin/renpass', 'bin/renpass-sweep',
+               'bin/renpass-benchmark', 'bin/renpass-convert',
+               'bin/renpass-diff'],
       packages=find_packages(),
       package_data={'oemof': [
           os.path.join('tools', 'default_files', '*.ini')]},